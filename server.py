@@ -1,6 +1,227 @@
 import argparse
+import email.utils
 import os
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import re
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FileCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_size=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self._size = 0
+        self._entries: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, etag):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(path)
+            return entry[1]
+
+    def put(self, path, etag, data):
+        if len(data) > self.max_file_size:
+            return
+        with self._lock:
+            old_entry = self._entries.pop(path, None)
+            if old_entry is not None:
+                self._size -= len(old_entry[1])
+            self._entries[path] = (etag, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+# Precompressed siblings written by the build; the order breaks ties between
+# encodings the client accepts equally.
+PRECOMPRESSED_ENCODINGS = (("zstd", ".zst"), ("gzip", ".gz"))
+# Static files renamed by the build to include a hash of their content
+# (index.0123456789.css), and the downscaled variants of such images
+# (photo.0123456789-480w.png), never change under the same URL. Only the
+# extensions the build fingerprints (assets.FINGERPRINT_EXTENSIONS) count:
+# a page named release.2024010112.html is not immutable.
+FINGERPRINTED_PATH = re.compile(
+    r"\.[0-9a-f]{10}(-\d+w)?\.(css|js|png|jpg|jpeg|gif|svg|webp|avif|woff|woff2)$"
+)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class CachingRequestHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive; every response below sets its length.
+    protocol_version = "HTTP/1.1"
+    file_cache = FileCache()
+
+    def do_GET(self):
+        self._serve_file(send_body=True)
+
+    def do_HEAD(self):
+        self._serve_file(send_body=False)
+
+    def _serve_file(self, send_body):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = self._index_file(path)
+            if path is None:
+                # Redirects and directory listings are left to the base class.
+                return super().do_GET() if send_body else super().do_HEAD()
+
+        content_type = self.guess_type(path)
+        path, encoding = self._negotiate_encoding(path)
+        try:
+            file = open(path, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        with file:
+            stat = os.fstat(file.fileno())
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            if self._not_modified(etag, stat.st_mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self._send_validators(etag, stat.st_mtime)
+                self.end_headers()
+                return
+
+            byte_range = self._byte_range(etag, stat.st_size)
+            if byte_range == "unsatisfiable":
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{stat.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            if byte_range is None:
+                start, end = 0, stat.st_size - 1
+                self.send_response(HTTPStatus.OK)
+            else:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{stat.st_size}")
+            length = end - start + 1
+            self.send_header("Content-Type", content_type)
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self._send_validators(etag, stat.st_mtime)
+            self.end_headers()
+
+            if send_body and length > 0:
+                self._send_body(path, file, etag, stat.st_size, start, length)
+
+    def _index_file(self, dir_path):
+        if not self.path.split("?", 1)[0].endswith("/"):
+            return None
+        for index in ("index.html", "index.htm"):
+            index_path = os.path.join(dir_path, index)
+            if os.path.isfile(index_path):
+                return index_path
+        return None
+
+    def _negotiate_encoding(self, path):
+        accepted = {}
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            coding, _, params = item.strip().partition(";")
+            quality = 1.0
+            for param in params.split(";"):
+                name, _, value = param.strip().partition("=")
+                if name == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            accepted[coding.strip().lower()] = quality
+
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            # A leftover compressed copy must not keep a removed file alive.
+            return path, None
+        best = None
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            quality = accepted.get(encoding, accepted.get("*", 0.0))
+            if quality <= 0 or (best is not None and quality <= best[0]):
+                continue
+            try:
+                compressed_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            # Older than the file itself: written before it last changed.
+            if compressed_stat.st_mtime_ns >= mtime_ns:
+                best = quality, path + suffix, encoding
+        # The plain file goes out when it is all the client accepts, or when
+        # it asks for it over every available encoding.
+        if best is None or best[0] < accepted.get("identity", 0.0):
+            return path, None
+        return best[1], best[2]
+
+    def _send_validators(self, etag, mtime):
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(mtime))
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if FINGERPRINTED_PATH.search(url_path):
+            self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since.timestamp()
+
+    def _byte_range(self, etag, size):
+        range_header = self.headers.get("Range")
+        if range_header is None or not range_header.startswith("bytes="):
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range is not None and if_range.strip() != etag:
+            return None
+
+        ranges = range_header.removeprefix("bytes=").strip()
+        if "," in ranges:
+            # Multipart responses are not supported; the full file is valid.
+            return None
+        first, _, last = ranges.partition("-")
+        try:
+            if first == "":
+                suffix_length = int(last)
+                if suffix_length == 0:
+                    return "unsatisfiable"
+                start, end = max(size - suffix_length, 0), size - 1
+            else:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+        except ValueError:
+            return None
+        if start >= size or start > end:
+            return "unsatisfiable"
+        return start, end
+
+    def _send_body(self, path, file, etag, size, start, length):
+        data = self.file_cache.get(path, etag)
+        if data is None and size <= self.file_cache.max_file_size:
+            data = file.read()
+            self.file_cache.put(path, etag, data)
+        if data is not None:
+            self.wfile.write(data[start : start + length])
+            return
+        # Large files go straight from the page cache to the socket.
+        self.connection.sendfile(file, offset=start, count=length)
 
 
 def run(
@@ -23,6 +244,26 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Serve concurrently with caching, conditional and range requests",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        help="Size of the in-memory file cache in MB (production mode)",
+        default=64,
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    if args.production:
+        CachingRequestHandler.file_cache = FileCache(args.cache_size * 1024 * 1024)
+        run(
+            server_class=ThreadingHTTPServer,
+            handler_class=CachingRequestHandler,
+            port=args.port,
+            directory=args.dir,
+        )
+    else:
+        run(port=args.port, directory=args.dir)
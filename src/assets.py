@@ -0,0 +1,342 @@
+import hashlib
+import os
+import re
+import shutil
+from collections.abc import Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from os import link, makedirs, remove, replace, rmdir, sep, stat, utime, walk
+from os.path import dirname, isfile, join, relpath, splitext
+
+from compress import remove_compressed
+from manifest import Manifest, ManifestEntry, file_hash
+from minify import minify_css
+
+# Files referenced from pages by URL; HTML and files browsers request by a
+# fixed name (favicon.ico, robots.txt) keep their names.
+FINGERPRINT_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".svg",
+    ".webp",
+    ".avif",
+    ".woff",
+    ".woff2",
+)
+FINGERPRINT_LENGTH = 10
+_URL_ATTRIBUTE_PATTERN = re.compile(r"""\b(href|src)=(["'])(.*?)\2""")
+
+
+@dataclass
+class SyncStats:
+    copied: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    # Output path, source size and written size of each minified file.
+    minified: list[tuple[str, int, int]] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.copied} copied, {self.unchanged} unchanged, "
+            f"{self.removed} removed"
+        )
+
+
+def sync_assets(
+    static_dir: str,
+    public_dir: str,
+    manifest: Manifest,
+    *,
+    hardlink: bool = False,
+    verify_hash: bool = False,
+    fingerprint: bool = False,
+    minify: bool = False,
+    jobs: int | None = None,
+) -> SyncStats:
+    sources = []
+    for dir_path, dir_names, file_names in walk(static_dir):
+        dir_names.sort()
+        sources.extend(join(dir_path, file_name) for file_name in sorted(file_names))
+    stats = sync_asset_paths(
+        sources,
+        static_dir,
+        public_dir,
+        manifest,
+        hardlink=hardlink,
+        verify_hash=verify_hash,
+        fingerprint=fingerprint,
+        minify=minify,
+        jobs=jobs,
+    )
+
+    current_sources = set(sources)
+    prefix = static_dir.rstrip("/") + "/"
+    stale_sources = [
+        source
+        for source in manifest.entries
+        if source.startswith(prefix) and source not in current_sources
+    ]
+    for source in stale_sources:
+        stats.removed += len(manifest.remove(source))
+    return stats
+
+
+def sync_asset_paths(
+    sources: list[str],
+    static_dir: str,
+    public_dir: str,
+    manifest: Manifest,
+    *,
+    hardlink: bool = False,
+    verify_hash: bool = False,
+    fingerprint: bool = False,
+    minify: bool = False,
+    jobs: int | None = None,
+) -> SyncStats:
+    # Comparing and copying mostly wait on the file system, so threads are
+    # enough; the manifest is only touched from this thread.
+    stats = SyncStats()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                _sync_asset,
+                source,
+                asset_output_path(source, static_dir, public_dir),
+                manifest.entries.get(source),
+                hardlink,
+                verify_hash,
+                fingerprint,
+                minify,
+            )
+            for source in sources
+        ]
+        for source, future in zip(sources, futures):
+            previous_entry = manifest.entries.get(source)
+            entry, copied, sizes = future.result()
+            manifest.record(source, entry)
+            if sizes is not None:
+                stats.minified.append((entry.output_path, *sizes))
+            if copied:
+                stats.copied += 1
+            else:
+                stats.unchanged += 1
+            if previous_entry and previous_entry.output_path != entry.output_path:
+                # The content, and with it the fingerprinted name, changed.
+                with suppress(FileNotFoundError):
+                    remove(previous_entry.output_path)
+                    stats.removed += 1
+    return stats
+
+
+def asset_output_path(source: str, static_dir: str, public_dir: str) -> str:
+    return join(public_dir, relpath(source, static_dir))
+
+
+def fingerprinted_path(path: str, content_hash: str) -> str:
+    root, extension = splitext(path)
+    return f"{root}.{content_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def asset_url_map(
+    manifest: Manifest, static_dir: str, public_dir: str
+) -> dict[str, str]:
+    # Site URL of each fingerprinted static file -> the URL it is served at.
+    prefix = static_dir.rstrip("/") + "/"
+    asset_urls = {}
+    for source, entry in manifest.entries.items():
+        if not source.startswith(prefix):
+            continue
+        plain_path = asset_output_path(source, static_dir, public_dir)
+        if entry.output_path != plain_path:
+            asset_urls[_site_url(plain_path, public_dir)] = _site_url(
+                entry.output_path, public_dir
+            )
+    return asset_urls
+
+
+def rewrite_asset_urls(html: str, asset_urls: Mapping[str, str]) -> str:
+    # Rewrites href and src attributes, e.g. in the template source.
+    def rewrite(match: re.Match) -> str:
+        attribute, quote, url = match.groups()
+        return f"{attribute}={quote}{fingerprinted_url(url, asset_urls)}{quote}"
+
+    return _URL_ATTRIBUTE_PATTERN.sub(rewrite, html)
+
+
+def fingerprinted_url(url: str, asset_urls: Mapping[str, str]) -> str:
+    # Only site-absolute URLs are rewritten; a query or fragment is kept.
+    path = url_path(url)
+    if path not in asset_urls:
+        return url
+    return asset_urls[path] + url[len(path) :]
+
+
+def url_path(url: str) -> str:
+    # The URL without its query and fragment.
+    end = len(url)
+    for separator in "?#":
+        if separator in url:
+            end = min(end, url.index(separator))
+    return url[:end]
+
+
+_active_asset_urls: Mapping[str, str] = {}
+
+
+def asset_url(url: str) -> str:
+    if not _active_asset_urls:
+        return url
+    return fingerprinted_url(url, _active_asset_urls)
+
+
+@contextmanager
+def rewriting_asset_urls(asset_urls: Mapping[str, str]) -> Iterator[None]:
+    global _active_asset_urls
+    previous = _active_asset_urls
+    _active_asset_urls = asset_urls
+    try:
+        yield
+    finally:
+        _active_asset_urls = previous
+
+
+def prune_outputs(public_dir: str, keep: set[str]) -> list[str]:
+    removed = []
+    for dir_path, _, file_names in walk(public_dir, topdown=False):
+        for file_name in file_names:
+            path = join(dir_path, file_name)
+            if path not in keep:
+                remove(path)
+                removed.append(path)
+        if dir_path != public_dir:
+            with suppress(OSError):
+                rmdir(dir_path)
+    return removed
+
+
+def _site_url(output_path: str, public_dir: str) -> str:
+    return "/" + relpath(output_path, public_dir).replace(sep, "/")
+
+
+def _sync_asset(
+    source: str,
+    output_path: str,
+    previous_entry: ManifestEntry | None,
+    hardlink: bool,
+    verify_hash: bool,
+    fingerprint: bool,
+    minify: bool,
+) -> tuple[ManifestEntry, bool, tuple[int, int] | None]:
+    # Returns the entry, whether the output was written and, for minified
+    # files, the source and output sizes.
+    source_stat = stat(source)
+    if verify_hash:
+        signature = file_hash(source)
+    else:
+        signature = f"{source_stat.st_size}:{source_stat.st_mtime_ns}"
+    minified = minify and output_path.endswith(".css")
+    content = None
+    if minified:
+        # Part of the signature so that toggling --minify rewrites the file.
+        signature = f"{signature}:minified"
+    if fingerprint and output_path.endswith(FINGERPRINT_EXTENSIONS):
+        if (
+            previous_entry is not None
+            and previous_entry.source_hash == signature
+            and previous_entry.output_path != output_path
+        ):
+            # Unchanged since the last fingerprinted build: no need to hash.
+            output_path = previous_entry.output_path
+        elif minified:
+            # Named after what is served, not after the source.
+            content = _minified_css(source)
+            content_hash = hashlib.sha256(content).hexdigest()
+            output_path = fingerprinted_path(output_path, content_hash)
+        else:
+            content_hash = signature if verify_hash else file_hash(source)
+            output_path = fingerprinted_path(output_path, content_hash)
+    entry = ManifestEntry(source_hash=signature, output_path=output_path)
+    if minified:
+        # The output differs from the source, so only the manifest can tell
+        # whether it is current.
+        if previous_entry == entry and isfile(output_path):
+            return entry, False, None
+        if content is None:
+            content = _minified_css(source)
+        makedirs(dirname(output_path), exist_ok=True)
+        # Never written in place: the previous output may be a hardlink to
+        # the source.
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, mode="wb") as file:
+            file.write(content)
+        replace(tmp_path, output_path)
+        remove_compressed(output_path)
+        return entry, True, (source_stat.st_size, len(content))
+    if _is_unchanged(source_stat, output_path, signature, verify_hash):
+        return entry, False, None
+
+    makedirs(dirname(output_path), exist_ok=True)
+    # Replacing instead of writing in place keeps a hardlinked output from
+    # writing through to the source, and readers never see a partial file.
+    tmp_path = f"{output_path}.tmp"
+    with suppress(FileNotFoundError):
+        remove(tmp_path)
+    if not (hardlink and _try_link(source, tmp_path)):
+        _copy_file(source, tmp_path)
+        utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    replace(tmp_path, output_path)
+    remove_compressed(output_path)
+    return entry, True, None
+
+
+def _is_unchanged(
+    source_stat: os.stat_result, output_path: str, signature: str, verify_hash: bool
+) -> bool:
+    try:
+        output_stat = stat(output_path)
+    except FileNotFoundError:
+        return False
+    if output_stat.st_size != source_stat.st_size:
+        return False
+    if verify_hash:
+        return file_hash(output_path) == signature
+    # Copies get the source's mtime and hardlinks share it.
+    return output_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+
+def _minified_css(source: str) -> bytes:
+    with open(source) as file:
+        return minify_css(file.read()).encode()
+
+
+def _try_link(source: str, destination: str) -> bool:
+    try:
+        link(source, destination)
+    except OSError:
+        # Different file systems or no hardlink support: copy instead.
+        return False
+    return True
+
+
+def _copy_file(source: str, destination: str):
+    with open(source, mode="rb") as source_file:
+        with open(destination, mode="wb") as destination_file:
+            try:
+                # The kernel copies (or reflinks) without a round trip
+                # through user space.
+                while os.copy_file_range(
+                    source_file.fileno(), destination_file.fileno(), 1 << 30
+                ):
+                    pass
+            except (AttributeError, OSError):
+                # Not Linux, or a file system that can't copy ranges.
+                source_file.seek(0)
+                destination_file.seek(0)
+                destination_file.truncate()
+                shutil.copyfileobj(source_file, destination_file)
+    shutil.copymode(source, destination)
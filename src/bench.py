@@ -0,0 +1,227 @@
+import argparse
+import io
+import json
+import subprocess
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from os import makedirs
+from os.path import dirname, join
+from tempfile import TemporaryDirectory
+
+from corpus import CorpusSettings, generate_corpus
+from htmlnode import HTMLNode, LeafNode
+from main import BuildContext, generate_pages_recursive
+from manifest import Manifest
+from render_cache import RenderCache
+from textnode import TextNode, TextTypes
+from utils import (
+    BlockTypes,
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_text_nodes,
+)
+
+RESULTS_DIR = ".cache/bench"
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+SENTENCE = (
+    "Plain words with **bold text** and *italic text*, some `inline code`, "
+    "an ![image](/images/rivendell.png) and a [link](https://boot.dev). "
+)
+
+
+def main():
+    args = parse_args()
+    settings = CorpusSettings(
+        pages=args.pages,
+        blocks_per_page=args.blocks_per_page,
+        inline_density=args.inline_density,
+        nesting_depth=args.nesting_depth,
+        images_per_page=args.images_per_page,
+        seed=args.seed,
+    )
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    results = run_benchmarks(settings, args.repeat, args.jobs)
+    for name, seconds in results.items():
+        print(f"{name:<40} {seconds * 1000:>12.3f} ms")
+    memory = measure_memory(settings)
+    for name, size in memory.items():
+        print(f"{name:<40} {size:>12,} B")
+
+    output_path = args.output or join(RESULTS_DIR, f"{_revision()}.json")
+    makedirs(dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, mode="w") as file:
+        json.dump(
+            {"settings": vars(settings), "results": results, "memory": memory},
+            file,
+            indent=2,
+        )
+    print(f"Results written to {output_path}")
+
+    if baseline is not None:
+        print(f"Compared with {args.compare}:")
+        current = results | memory
+        previous = baseline["results"] | baseline.get("memory", {})
+        for name, value in current.items():
+            if name in previous:
+                change = (value - previous[name]) / previous[name] * 100
+                print(f"{name:<40} {change:>+11.1f} %")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Static site generator benchmarks")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks-per-page", type=int, default=30)
+    parser.add_argument("--inline-density", type=float, default=0.2)
+    parser.add_argument("--nesting-depth", type=int, default=2)
+    parser.add_argument("--images-per-page", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+    parser.add_argument("--jobs", type=int, default=4, help="Workers for --jobs run")
+    parser.add_argument("--output", help=f"Results file (default: {RESULTS_DIR})")
+    parser.add_argument("--compare", metavar="PATH", help="Earlier results file")
+    return parser.parse_args()
+
+
+def run_benchmarks(
+    settings: CorpusSettings, repeat: int, jobs: int
+) -> dict[str, float]:
+    results = {}
+    with TemporaryDirectory() as tmp_dir:
+        content_dir = join(tmp_dir, "content")
+        template_path = join(tmp_dir, "template.html")
+        with open(template_path, mode="w") as file:
+            file.write(TEMPLATE)
+
+        pages = _read_corpus(content_dir, settings)
+        blocks = [block for page in pages for block in markdown_to_blocks(page)]
+        texts = [
+            block
+            for block in blocks
+            if block_to_block_type(block) == BlockTypes.paragraph
+        ]
+        trees = [markdown_to_html_node(page) for page in pages]
+        paragraph = SENTENCE * 1000
+
+        stages: dict[str, Callable[[], object]] = {
+            "markdown_to_blocks": lambda: [markdown_to_blocks(p) for p in pages],
+            "block_to_block_type": lambda: [block_to_block_type(b) for b in blocks],
+            "text_to_text_nodes": lambda: [text_to_text_nodes(t) for t in texts],
+            "split_pipeline": lambda: [split_pipeline(t) for t in texts],
+            "text_to_text_nodes_long_paragraph": lambda: text_to_text_nodes(paragraph),
+            "split_pipeline_long_paragraph": lambda: split_pipeline(paragraph),
+            "markdown_to_html_node": lambda: [markdown_to_html_node(p) for p in pages],
+            "to_html": lambda: [tree.to_html() for tree in trees],
+            "leaf_node_construction": lambda: [
+                LeafNode(tag="b", value=t) for t in texts for _ in range(10)
+            ],
+            "build_serial": lambda: _build(tmp_dir, template_path, 1),
+            "build_parallel": lambda: _build(tmp_dir, template_path, jobs),
+            "build_render_cache": lambda: _build(
+                tmp_dir, template_path, 1, RenderCache()
+            ),
+        }
+        for name, stage in stages.items():
+            results[name] = min(timeit.repeat(stage, number=1, repeat=repeat))
+    return results
+
+
+def measure_memory(settings: CorpusSettings) -> dict[str, int]:
+    with TemporaryDirectory() as tmp_dir:
+        pages = _read_corpus(join(tmp_dir, "content"), settings)
+    texts = [
+        block
+        for page in pages
+        for block in markdown_to_blocks(page)
+        if block_to_block_type(block) == BlockTypes.paragraph
+    ]
+
+    tracemalloc.start()
+    try:
+        trees = [markdown_to_html_node(page) for page in pages]
+        tree_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.clear_traces()
+        text_nodes = [node for text in texts for node in text_to_text_nodes(text)]
+        text_node_bytes, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    html_nodes = sum(_count_nodes(tree) for tree in trees)
+    return {
+        "html_tree_bytes": tree_bytes,
+        "html_tree_bytes_per_node": tree_bytes // html_nodes,
+        "text_node_bytes_per_node": text_node_bytes // max(len(text_nodes), 1),
+    }
+
+
+def _count_nodes(node: HTMLNode) -> int:
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+
+def _read_corpus(content_dir: str, settings: CorpusSettings) -> list[str]:
+    pages = []
+    for path in generate_corpus(content_dir, settings):
+        with open(path) as file:
+            pages.append(file.read())
+    return pages
+
+
+def split_pipeline(text) -> list[TextNode]:
+    # The inline parser text_to_text_nodes replaced, kept as a baseline.
+    node = TextNode(text=text, text_type=TextTypes.text)
+    nodes = split_nodes_delimiter([node], "`", TextTypes.code)
+    nodes = split_nodes_delimiter(nodes, "**", TextTypes.bold)
+    nodes = split_nodes_delimiter(nodes, "*", TextTypes.italic)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def _build(
+    tmp_dir: str,
+    template_path: str,
+    jobs: int,
+    render_cache: RenderCache | None = None,
+):
+    with redirect_stdout(io.StringIO()):
+        errors = generate_pages_recursive(
+            join(tmp_dir, "content"),
+            template_path,
+            join(tmp_dir, "public"),
+            Manifest(),
+            BuildContext(jobs=jobs, render_cache=render_cache),
+        )
+    if errors:
+        raise Exception(f"Benchmark build failed: {errors[0]}")
+
+
+def _revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "working-tree"
+
+
+if __name__ == "__main__":
+    main()
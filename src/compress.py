@@ -0,0 +1,232 @@
+import gzip
+import hashlib
+import json
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from os import makedirs, remove, replace, stat, stat_result, walk
+from os.path import basename, dirname, isfile, join, splitext
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".xml", ".json")
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the output identical between builds of the same input.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _zstd(data: bytes) -> bytes:
+    return zstd.compress(data, level=19)
+
+
+# Suffixes are what server.py looks for when negotiating Accept-Encoding.
+ENCODERS = {".gz": _gzip}
+if zstd is not None:
+    ENCODERS[".zst"] = _zstd
+# Every suffix a build may have written, including ones this Python cannot
+# write: those files go stale all the same.
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+# Size, mtime and content hash of the file a compressed file was made from.
+SourceSignature = tuple[int, int, str]
+
+
+class CompressedIndex:
+    # Compressed path -> signature of its source when it was compressed.
+    # Outputs keep their source's mtime, and cp -p, rsync or tar can replace
+    # one with an older file, so comparing mtimes cannot tell whether a
+    # compressed file is current.
+    def __init__(self, sources: dict[str, SourceSignature] | None = None):
+        self.sources = sources if sources is not None else {}
+
+    @classmethod
+    def load(cls, path: str) -> "CompressedIndex":
+        try:
+            with open(path) as file:
+                raw_sources = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+        sources = {
+            compressed_path: (size, mtime_ns, digest)
+            for compressed_path, (size, mtime_ns, digest) in raw_sources.items()
+        }
+        return cls(sources)
+
+    def save(self, path: str):
+        makedirs(dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as file:
+            json.dump(self.sources, file, indent=2, sort_keys=True)
+        replace(tmp_path, path)
+
+    def is_current(
+        self, compressed_path: str, path: str, path_stat: stat_result
+    ) -> bool:
+        signature = self.sources.get(compressed_path)
+        if signature is None:
+            return False
+        size, mtime_ns, digest = signature
+        if size != path_stat.st_size:
+            return False
+        if mtime_ns == path_stat.st_mtime_ns:
+            return True
+        # Touched or replaced: only the content can tell.
+        if _file_hash(path) != digest:
+            return False
+        self.sources[compressed_path] = (size, path_stat.st_mtime_ns, digest)
+        return True
+
+
+def remove_compressed(path: str):
+    # Called whenever an output is rewritten or removed, so that a compressed
+    # copy of its previous content is never served.
+    for suffix in COMPRESSED_SUFFIXES:
+        _remove(path + suffix)
+
+
+def compress_public(
+    public_dir: str,
+    index: CompressedIndex,
+    threshold: int = 1024,
+    jobs: int | None = None,
+    compress: bool = True,
+) -> list[str]:
+    # Without compress, nothing is written, but compressed files whose source
+    # is gone or changed are still removed.
+    pending = []
+    seen = set()
+    for dir_path, _, file_names in walk(public_dir):
+        names = set(file_names)
+        for file_name in file_names:
+            path = join(dir_path, file_name)
+            source_name, suffix = splitext(file_name)
+            if suffix in COMPRESSED_SUFFIXES and source_name.endswith(
+                COMPRESSIBLE_EXTENSIONS
+            ):
+                if source_name not in names:
+                    _remove(path)
+                continue
+            if not file_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            seen |= _check_compressed(
+                path,
+                stat(path),
+                lambda compressed_path: basename(compressed_path) in names,
+                index,
+                threshold,
+                compress,
+                pending,
+            )
+
+    compressed = _compress_pending(pending, index, jobs)
+    seen.update(compressed)
+    for compressed_path in list(index.sources):
+        if compressed_path not in seen:
+            del index.sources[compressed_path]
+    return compressed
+
+
+def compress_outputs(
+    paths: Iterable[str],
+    index: CompressedIndex,
+    threshold: int = 1024,
+    jobs: int | None = None,
+    compress: bool = True,
+) -> list[str]:
+    # compress_public for just these outputs, the ones a rebuild wrote or
+    # removed, instead of every file under public_dir.
+    pending = []
+    for path in sorted(set(paths)):
+        if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        try:
+            source_stat = stat(path)
+        except FileNotFoundError:
+            remove_compressed(path)
+            kept = set()
+        else:
+            kept = _check_compressed(
+                path, source_stat, isfile, index, threshold, compress, pending
+            )
+        for suffix in COMPRESSED_SUFFIXES:
+            if path + suffix not in kept:
+                index.sources.pop(path + suffix, None)
+    return _compress_pending(pending, index, jobs)
+
+
+def _check_compressed(
+    path: str,
+    source_stat: stat_result,
+    exists: Callable[[str], bool],
+    index: CompressedIndex,
+    threshold: int,
+    compress: bool,
+    pending: list[tuple[str, str, stat_result]],
+) -> set[str]:
+    # Removes the compressed copies of path that must go and queues the ones
+    # to write in pending. Returns the ones that are current.
+    current_paths = set()
+    for suffix in COMPRESSED_SUFFIXES:
+        compressed_path = path + suffix
+        current = exists(compressed_path) and index.is_current(
+            compressed_path, path, source_stat
+        )
+        if compress and suffix in ENCODERS:
+            if source_stat.st_size < threshold:
+                _remove(compressed_path)
+            elif not current:
+                pending.append((path, suffix, source_stat))
+            else:
+                current_paths.add(compressed_path)
+        elif current:
+            current_paths.add(compressed_path)
+        else:
+            _remove(compressed_path)
+    return current_paths
+
+
+def _compress_pending(
+    pending: list[tuple[str, str, stat_result]],
+    index: CompressedIndex,
+    jobs: int | None,
+) -> list[str]:
+    # zlib and zstd release the GIL while compressing, so threads are enough.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_compress_file, *item) for item in pending]
+        compressed = []
+        for future in futures:
+            compressed_path, signature = future.result()
+            index.sources[compressed_path] = signature
+            compressed.append(compressed_path)
+    return compressed
+
+
+def _remove(path: str):
+    with suppress(FileNotFoundError):
+        remove(path)
+
+
+def _file_hash(path: str) -> str:
+    with open(path, mode="rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def _compress_file(
+    path: str, suffix: str, source_stat: stat_result
+) -> tuple[str, SourceSignature]:
+    with open(path, mode="rb") as file:
+        data = file.read()
+    compressed_path = path + suffix
+    tmp_path = f"{compressed_path}.tmp"
+    with open(tmp_path, mode="wb") as file:
+        file.write(ENCODERS[suffix](data))
+    replace(tmp_path, compressed_path)
+    # Read after the stat: if the file changed in between, its mtime no
+    # longer matches and the next build compares the content.
+    digest = hashlib.sha256(data).hexdigest()
+    return compressed_path, (len(data), source_stat.st_mtime_ns, digest)
@@ -0,0 +1,140 @@
+import random
+from os import makedirs
+from os.path import join
+
+WORDS = (
+    "ring hobbit shire elf dwarf wizard mountain river forest tower road "
+    "journey fellowship shadow light king return quest map song tale"
+).split()
+
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 6,
+    "heading": 2,
+    "code": 1,
+    "quote": 1,
+    "unordered_list": 1,
+    "ordered_list": 1,
+}
+
+
+class CorpusSettings:
+    def __init__(
+        self,
+        *,
+        pages: int = 100,
+        blocks_per_page: int = 30,
+        block_mix: dict[str, int] | None = None,
+        inline_density: float = 0.2,
+        nesting_depth: int = 2,
+        images_per_page: int = 2,
+        seed: int = 0,
+    ):
+        self.pages = pages
+        self.blocks_per_page = blocks_per_page
+        self.block_mix = block_mix if block_mix is not None else DEFAULT_BLOCK_MIX
+        self.inline_density = inline_density
+        self.nesting_depth = nesting_depth
+        self.images_per_page = images_per_page
+        self.seed = seed
+
+
+def generate_corpus(content_dir: str, settings: CorpusSettings) -> list[str]:
+    rng = random.Random(settings.seed)
+    paths = []
+    for page_number in range(settings.pages):
+        depth = rng.randint(0, settings.nesting_depth)
+        sections = [f"section{rng.randrange(4)}" for _ in range(depth)]
+        dir_path = join(content_dir, *sections)
+        makedirs(dir_path, exist_ok=True)
+
+        path = join(dir_path, f"page{page_number}.md")
+        with open(path, mode="w") as file:
+            file.write(generate_markdown(rng, settings))
+        paths.append(path)
+    return paths
+
+
+def generate_markdown(rng: random.Random, settings: CorpusSettings) -> str:
+    block_types = list(settings.block_mix)
+    weights = list(settings.block_mix.values())
+    blocks = [f"# {_sentence(rng, 4).title()}"]
+    image_blocks = set(
+        rng.sample(
+            range(settings.blocks_per_page),
+            min(settings.images_per_page, settings.blocks_per_page),
+        )
+    )
+    for index in range(settings.blocks_per_page):
+        block_type = rng.choices(block_types, weights)[0]
+        blocks.append(_BLOCK_GENERATORS[block_type](rng, settings))
+        if index in image_blocks:
+            image = f"![{_word(rng)}](/images/{_word(rng)}.png)"
+            blocks.append(f"{_inline_text(rng, settings, 6)} {image}")
+    return "\n\n".join(blocks) + "\n"
+
+
+def _word(rng: random.Random) -> str:
+    return rng.choice(WORDS)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(_word(rng) for _ in range(words))
+
+
+def _inline_text(rng: random.Random, settings: CorpusSettings, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        word = _word(rng)
+        if rng.random() < settings.inline_density:
+            match rng.randrange(5):
+                case 0:
+                    word = f"**{word}**"
+                case 1:
+                    word = f"*{word}*"
+                case 2:
+                    word = f"`{word}`"
+                case 3:
+                    word = f"[{word}](/{_word(rng)})"
+                case 4:
+                    word = f"[{word}](https://example.com/{_word(rng)})"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def _paragraph(rng: random.Random, settings: CorpusSettings) -> str:
+    lines = [_inline_text(rng, settings, 12) for _ in range(rng.randint(1, 4))]
+    return "\n".join(lines)
+
+
+def _heading(rng: random.Random, settings: CorpusSettings) -> str:
+    return f"{'#' * rng.randint(2, 6)} {_inline_text(rng, settings, 4)}"
+
+
+def _code(rng: random.Random, settings: CorpusSettings) -> str:
+    lines = [f"{_word(rng)} = {rng.randrange(100)}" for _ in range(rng.randint(2, 8))]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+def _quote(rng: random.Random, settings: CorpusSettings) -> str:
+    lines = [_inline_text(rng, settings, 8) for _ in range(rng.randint(1, 3))]
+    return "\n".join(f"> {line}" for line in lines)
+
+
+def _unordered_list(rng: random.Random, settings: CorpusSettings) -> str:
+    lines = [_inline_text(rng, settings, 6) for _ in range(rng.randint(2, 6))]
+    return "\n".join(f"* {line}" for line in lines)
+
+
+def _ordered_list(rng: random.Random, settings: CorpusSettings) -> str:
+    lines = [_inline_text(rng, settings, 6) for _ in range(rng.randint(2, 6))]
+    return "\n".join(f"{index}. {line}" for index, line in enumerate(lines, 1))
+
+
+_BLOCK_GENERATORS = {
+    "paragraph": _paragraph,
+    "heading": _heading,
+    "code": _code,
+    "quote": _quote,
+    "unordered_list": _unordered_list,
+    "ordered_list": _ordered_list,
+}
@@ -0,0 +1,59 @@
+import json
+from collections.abc import Iterable
+from os import makedirs, replace
+from os.path import dirname
+
+
+class DependencyGraph:
+    def __init__(self, inputs: dict[str, list[str]] | None = None):
+        # Output path -> the inputs it was built from, plus the reverse
+        # index so dirty queries only touch the changed inputs' dependents.
+        self._inputs: dict[str, list[str]] = {}
+        self._dependents: dict[str, set[str]] = {}
+        for output, output_inputs in (inputs or {}).items():
+            self.record(output, output_inputs)
+
+    @classmethod
+    def load(cls, path: str) -> "DependencyGraph":
+        try:
+            with open(path) as file:
+                raw_inputs = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+        return cls(raw_inputs)
+
+    def save(self, path: str):
+        makedirs(dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as file:
+            json.dump(self._inputs, file, indent=2, sort_keys=True)
+        replace(tmp_path, path)
+
+    @property
+    def outputs(self) -> list[str]:
+        return list(self._inputs)
+
+    def inputs(self, output: str) -> list[str]:
+        return self._inputs.get(output, [])
+
+    def dependents(self, input_path: str) -> set[str]:
+        return self._dependents.get(input_path, set())
+
+    def record(self, output: str, inputs: Iterable[str]):
+        self.remove(output)
+        self._inputs[output] = list(dict.fromkeys(inputs))
+        for input_path in self._inputs[output]:
+            self._dependents.setdefault(input_path, set()).add(output)
+
+    def remove(self, output: str):
+        for input_path in self._inputs.pop(output, []):
+            dependents = self._dependents[input_path]
+            dependents.discard(output)
+            if not dependents:
+                del self._dependents[input_path]
+
+    def dirty(self, changed_paths: Iterable[str]) -> set[str]:
+        dirty_outputs = set()
+        for path in changed_paths:
+            dirty_outputs |= self.dependents(path)
+        return dirty_outputs
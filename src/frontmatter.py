@@ -0,0 +1,70 @@
+import re
+from typing import TextIO
+
+# A small YAML subset: "key: value" lines between two "---" lines. Values
+# are strings (optionally quoted), integers, true/false, inline lists
+# ("[a, b]") or block lists of "- item" lines under an empty key.
+FrontMatterValue = str | int | bool | list[str]
+
+_DELIMITER = "---"
+_KEY_PATTERN = re.compile(r"([A-Za-z_][\w-]*):(?:\s+(.*))?$")
+
+
+def read_front_matter(file: TextIO) -> dict[str, FrontMatterValue]:
+    # Leaves the file positioned at the start of the markdown body. readline
+    # is used instead of iterating so that tell and seek keep working.
+    start = file.tell()
+    if file.readline().rstrip("\n").rstrip() != _DELIMITER:
+        file.seek(start)
+        return {}
+
+    lines = []
+    while True:
+        line = file.readline()
+        if line == "":
+            raise ValueError("Front matter is not closed with ---")
+        line = line.rstrip("\n")
+        if line.rstrip() == _DELIMITER:
+            return parse_front_matter(lines)
+        lines.append(line)
+
+
+def parse_front_matter(lines: list[str]) -> dict[str, FrontMatterValue]:
+    metadata: dict[str, FrontMatterValue] = {}
+    list_items: list[str] | None = None
+    for line in lines:
+        stripped = line.strip()
+        if stripped == "" or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and list_items is not None:
+            list_items.append(_unquote(stripped[2:].strip()))
+            continue
+
+        match = _KEY_PATTERN.match(stripped)
+        if match is None:
+            raise ValueError(f"Invalid front matter line: {line}")
+        key, value = match.group(1), (match.group(2) or "").strip()
+        if value == "":
+            list_items = []
+            metadata[key] = list_items
+        else:
+            metadata[key] = _parse_value(value)
+            list_items = None
+    return metadata
+
+
+def _parse_value(value: str) -> FrontMatterValue:
+    if value.startswith("[") and value.endswith("]"):
+        items = value[1:-1].split(",")
+        return [_unquote(item.strip()) for item in items if item.strip()]
+    if value in ("true", "false"):
+        return value == "true"
+    if re.fullmatch(r"-?\d+", value):
+        return int(value)
+    return _unquote(value)
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
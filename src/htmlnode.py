@@ -1,7 +1,66 @@
-from typing import Self
+from collections.abc import Iterator
+from contextlib import suppress
+from functools import lru_cache
+from html import escape
+from sys import intern
+from typing import Self, TextIO
+
+
+class Props(dict):
+    # Node attributes that keep their formatted attribute string, formatted
+    # once on first use and dropped by anything that changes them. Nodes
+    # sharing one Props share the string.
+    __slots__ = ("_attributes",)
+
+    def attributes(self) -> str:
+        try:
+            return self._attributes
+        except AttributeError:
+            self._attributes = _format_attributes(self)
+            return self._attributes
+
+    def _changed(self):
+        with suppress(AttributeError):
+            del self._attributes
+
+    # Every method that changes the dict drops the string first.
+    def __setitem__(self, key, value):
+        self._changed()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._changed()
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self._changed()
+        return super().__ior__(other)
+
+    def clear(self):
+        self._changed()
+        super().clear()
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._changed()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._changed()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._changed()
+        super().update(*args, **kwargs)
 
 
 class HTMLNode:
+    # Large pages build millions of nodes; slots drop the per-instance dict.
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         *,
@@ -10,21 +69,26 @@ class HTMLNode:
         children: list[Self] | None = None,
         props: dict | None = None,
     ):
-        self.tag = tag
+        # Interned so the formatting caches below compare tags by identity.
+        self.tag = intern(tag) if tag else tag
         self.value = value
         self.children = children
         self.props = props
 
     def to_html(self):
+        return "".join(iter_html(self))
+
+    def html_parts(self) -> tuple[str, list[Self] | None, str]:
         raise NotImplementedError()
 
     def props_to_html(self):
-        output = ""
-        if self.props is not None:
-            for key, value in self.props.items():
-                output += f'{key}="{value}" '
-            output = output[:-1]
-        return output
+        if not self.props:
+            return ""
+        if isinstance(self.props, Props):
+            return self.props.attributes()
+        # Any other mapping may change without notice, so it is formatted
+        # each time, from the shared attribute cache below.
+        return _format_attributes(self.props)
 
     def __repr__(self) -> str:
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
@@ -39,26 +103,32 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self, *, tag: str | None = None, value: str, props: dict | None = None
     ):
-        super().__init__(tag=tag, value=value, props=props)
+        # Set directly rather than through HTMLNode.__init__: leaves are by
+        # far the most common node.
+        self.tag = intern(tag) if tag else tag
+        self.value = value
+        self.children = None
+        self.props = props
 
-    def to_html(self):
+    def html_parts(self) -> tuple[str, None, str]:
         if self.value is None:
             raise ValueError("A leaf node requires a value")
 
         if self.tag is None:
-            return self.value
+            return self.value, None, ""
 
-        props = self.props_to_html()
-        if props != "":
-            return f"<{self.tag} {self.props_to_html()}>{self.value}</{self.tag}>"
-        else:
-            return f"<{self.tag}>{self.value}</{self.tag}>"
+        start_tag = _start_tag(self.tag, self.props_to_html())
+        return f"{start_tag}{self.value}{_end_tag(self.tag)}", None, ""
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         *,
@@ -68,18 +138,56 @@ class ParentNode(HTMLNode):
     ):
         super().__init__(tag=tag, children=children, props=props)
 
-    def to_html(self):
+    def html_parts(self) -> tuple[str, list[HTMLNode], str]:
         if self.tag is None or self.tag == "":
             raise ValueError("Need to provide a tag")
         if self.children is None:
             raise ValueError("Need to provide children")
 
-        output = f"<{self.tag}"
-        props = self.props_to_html()
-        if props != "":
-            output += f" {self.props_to_html()}"
-        output += ">"
-        for child in self.children:
-            output += child.to_html()
-        output += f"</{self.tag}>"
-        return output
+        start_tag = _start_tag(self.tag, self.props_to_html())
+        return start_tag, self.children, _end_tag(self.tag)
+
+
+# Links and images repeat the same URLs across a site, so formatted
+# attributes and tags are shared instead of rebuilt for every node.
+def _format_attributes(props: dict) -> str:
+    return " ".join(_format_attribute(key, str(value)) for key, value in props.items())
+
+
+@lru_cache(maxsize=4096)
+def _format_attribute(key: str, value: str) -> str:
+    return f'{key}="{escape(value)}"'
+
+
+@lru_cache(maxsize=4096)
+def _start_tag(tag: str, attributes: str) -> str:
+    if attributes:
+        return f"<{tag} {attributes}>"
+    return f"<{tag}>"
+
+
+@lru_cache(maxsize=256)
+def _end_tag(tag: str) -> str:
+    return f"</{tag}>"
+
+
+def iter_html(node: HTMLNode) -> Iterator[str]:
+    # Walks the tree with an explicit stack so deep trees do not hit the
+    # recursion limit; closing tags are pushed as plain strings.
+    stack: list[HTMLNode | str] = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+            continue
+
+        opening, children, closing = item.html_parts()
+        yield opening
+        if closing:
+            stack.append(closing)
+        if children:
+            stack.extend(reversed(children))
+
+
+def write_html(node: HTMLNode, file: TextIO):
+    file.writelines(iter_html(node))
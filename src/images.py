@@ -0,0 +1,488 @@
+import json
+import struct
+import zlib
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager, suppress
+from dataclasses import asdict, dataclass, field
+from os import makedirs, remove, replace, sep
+from os.path import dirname, isfile, relpath, splitext
+from typing import BinaryIO
+
+from manifest import Manifest
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Bytes per pixel of the 8-bit PNG color types: gray, RGB, palette,
+# gray with alpha and RGBA.
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# Chunks a downscaled copy keeps: the palette and its transparency.
+_PNG_KEPT_CHUNKS = (b"PLTE", b"tRNS")
+# Start of frame markers, which hold the dimensions; C4, C8 and CC are
+# other segments in the same range.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length: TEM, the restart markers and SOI.
+_JPEG_STANDALONE_MARKERS = frozenset((0x01, *range(0xD0, 0xD9)))
+
+
+@dataclass(frozen=True)
+class ImageEntry:
+    # The asset's manifest signature when the entry was made.
+    signature: str
+    output_path: str
+    width: int
+    height: int
+    # Requested variant widths and the variants actually written.
+    widths: list[int] = field(default_factory=list)
+    variants: dict[int, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    width: int
+    height: int
+    # Variant width -> site URL, narrowest first.
+    variants: dict[int, str] = field(default_factory=dict)
+
+
+@dataclass
+class ImageStats:
+    processed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.processed} processed, {self.unchanged} unchanged, "
+            f"{self.removed} removed"
+        )
+
+
+class ImageIndex:
+    def __init__(self, images: dict[str, ImageEntry] | None = None):
+        # Static image source -> its dimensions and downscaled variants.
+        self.images = images if images is not None else {}
+
+    @classmethod
+    def load(cls, path: str) -> "ImageIndex":
+        try:
+            with open(path) as file:
+                raw_images = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+        images = {}
+        for source, raw_entry in raw_images.items():
+            variants = raw_entry.pop("variants", {})
+            images[source] = ImageEntry(
+                **raw_entry,
+                variants={int(width): path for width, path in variants.items()},
+            )
+        return cls(images)
+
+    def save(self, path: str):
+        makedirs(dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        raw_images = {source: asdict(entry) for source, entry in self.images.items()}
+        with open(tmp_path, mode="w") as file:
+            json.dump(raw_images, file, indent=2, sort_keys=True)
+        replace(tmp_path, path)
+
+    def outputs(self) -> set[str]:
+        return {
+            path for entry in self.images.values() for path in entry.variants.values()
+        }
+
+    def by_url(self, public_dir: str) -> dict[str, ImageInfo]:
+        return {
+            _site_url(entry.output_path, public_dir): ImageInfo(
+                entry.width,
+                entry.height,
+                {
+                    width: _site_url(path, public_dir)
+                    for width, path in sorted(entry.variants.items())
+                },
+            )
+            for entry in self.images.values()
+        }
+
+
+def image_size(path: str) -> tuple[int, int] | None:
+    # Width and height from the file header, without decoding the image.
+    with open(path, mode="rb") as file:
+        header = file.read(24)
+        if header.startswith(_PNG_SIGNATURE) and header[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", header[16:24])
+            return width, height
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            width, height = struct.unpack("<HH", header[6:10])
+            return width, height
+        if header[:2] == b"\xff\xd8":
+            file.seek(2)
+            return _jpeg_size(file)
+    return None
+
+
+def variant_path(output_path: str, width: int) -> str:
+    root, extension = splitext(output_path)
+    return f"{root}-{width}w{extension}"
+
+
+def process_images(
+    manifest: Manifest,
+    static_dir: str,
+    public_dir: str,
+    image_index: ImageIndex,
+    widths: list[int],
+    jobs: int = 1,
+) -> ImageStats:
+    # Reads the dimensions of every synced static image and writes the
+    # downscaled PNG variants. Images whose asset signature and requested
+    # widths are unchanged are skipped without opening them.
+    stats = ImageStats()
+    prefix = static_dir.rstrip("/") + "/"
+    widths = sorted(set(widths))
+    pending = []
+    current_sources = set()
+    for source, asset_entry in sorted(manifest.entries.items()):
+        if not source.startswith(prefix) or not _is_image(source):
+            continue
+        current_sources.add(source)
+        entry = image_index.images.get(source)
+        if (
+            entry is not None
+            and entry.signature == asset_entry.source_hash
+            and entry.output_path == asset_entry.output_path
+            and entry.widths == widths
+            and all(isfile(path) for path in entry.variants.values())
+        ):
+            stats.unchanged += 1
+            continue
+        size = image_size(source)
+        if size is None:
+            continue
+        variant_widths = [width for width in widths if width < size[0]]
+        if not source.lower().endswith(".png"):
+            # Only PNG can be decoded here; other formats get dimensions only.
+            variant_widths = []
+        pending.append((source, asset_entry, size, variant_widths))
+
+    with _executor(jobs, any(variants for *_, variants in pending)) as submit:
+        futures = [
+            submit(write_png_variants, source, asset_entry.output_path, variant_widths)
+            for source, asset_entry, _, variant_widths in pending
+        ]
+        for (source, asset_entry, size, _), future in zip(pending, futures):
+            variants = future.result()
+            previous = image_index.images.get(source)
+            if previous is not None:
+                stats.removed += _remove_variants(previous, set(variants.values()))
+            image_index.images[source] = ImageEntry(
+                asset_entry.source_hash,
+                asset_entry.output_path,
+                *size,
+                widths,
+                variants,
+            )
+            stats.processed += 1
+
+    for source in list(image_index.images):
+        if source.startswith(prefix) and source not in current_sources:
+            stats.removed += _remove_variants(image_index.images.pop(source), set())
+    return stats
+
+
+def write_png_variants(
+    source: str, output_path: str, widths: list[int]
+) -> dict[int, str]:
+    # Runs in a worker process; decoding is pure Python and CPU bound.
+    if not widths:
+        return {}
+    image = _read_png(source)
+    if image is None:
+        return {}
+    variants = {}
+    for width in widths:
+        path = variant_path(output_path, width)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="wb") as file:
+            file.write(_encode_png(_downscale(image, width)))
+        replace(tmp_path, path)
+        variants[width] = path
+    return variants
+
+
+@dataclass(frozen=True)
+class ImageOptions:
+    # The first images of a page, likely above the fold, load eagerly.
+    eager: int = 1
+    # The sizes attribute sent with srcset: the image's rendered width.
+    sizes: str = "100vw"
+
+
+_active_images: Mapping[str, ImageInfo] = {}
+_active_options = ImageOptions()
+# None outside of a page, where images are left to load eagerly.
+_eager_remaining: int | None = None
+
+
+def image_attributes(url: str) -> dict[str, str]:
+    # Attributes for the next <img> of the page being rendered, besides src
+    # and alt.
+    global _eager_remaining
+    attributes = {}
+    info = _active_images.get(url)
+    if info is not None:
+        # Lets the browser reserve the space before the image loads.
+        attributes["width"] = str(info.width)
+        attributes["height"] = str(info.height)
+        if info.variants:
+            candidates = [*info.variants.items(), (info.width, url)]
+            attributes["srcset"] = ", ".join(
+                f"{variant_url} {width}w" for width, variant_url in candidates
+            )
+            attributes["sizes"] = _active_options.sizes
+    if _eager_remaining == 0:
+        attributes["loading"] = "lazy"
+        attributes["decoding"] = "async"
+    elif _eager_remaining is not None:
+        _eager_remaining -= 1
+    return attributes
+
+
+def skip_images(count: int):
+    # For images whose HTML came from a cache instead of image_attributes.
+    global _eager_remaining
+    if _eager_remaining is not None:
+        _eager_remaining = max(_eager_remaining - count, 0)
+
+
+def image_render_context(urls: Iterable[str]) -> str:
+    # Everything besides the markdown that image_attributes depends on for
+    # the images at these URLs; other images don't matter.
+    infos = [_active_images.get(url) for url in urls]
+    return f"{infos}:{_active_options.sizes}:{_eager_remaining}"
+
+
+@contextmanager
+def using_images(
+    images: Mapping[str, ImageInfo], options: ImageOptions | None = None
+) -> Iterator[None]:
+    # Entered once per page, which starts the count of eager images over.
+    global _active_images, _active_options, _eager_remaining
+    previous = _active_images, _active_options, _eager_remaining
+    _active_images = images
+    _active_options = options if options is not None else ImageOptions()
+    _eager_remaining = _active_options.eager
+    try:
+        yield
+    finally:
+        _active_images, _active_options, _eager_remaining = previous
+
+
+@dataclass
+class _Png:
+    width: int
+    height: int
+    color_type: int
+    rows: list[bytes]
+    chunks: list[tuple[bytes, bytes]]
+
+    @property
+    def channels(self) -> int:
+        return _PNG_CHANNELS[self.color_type]
+
+
+def _is_image(path: str) -> bool:
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _site_url(output_path: str, public_dir: str) -> str:
+    return "/" + relpath(output_path, public_dir).replace(sep, "/")
+
+
+def _remove_variants(entry: ImageEntry, keep: set[str]) -> int:
+    removed = 0
+    for path in entry.variants.values():
+        if path not in keep:
+            with suppress(FileNotFoundError):
+                remove(path)
+                removed += 1
+    return removed
+
+
+@contextmanager
+def _executor(jobs: int, needed: bool) -> Iterator:
+    # Variants are rendered in worker processes; everything else, and any
+    # build with a single job, runs inline.
+    if jobs == 1 or not needed:
+        yield _run_inline
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield executor.submit
+
+
+def _run_inline(function, *args) -> Future:
+    future = Future()
+    future.set_result(function(*args))
+    return future
+
+
+def _jpeg_size(file: BinaryIO) -> tuple[int, int] | None:
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:
+            # Markers may be padded with any number of fill bytes.
+            fill = file.read(1)
+            if not fill:
+                return None
+            code = fill[0]
+        if code in _JPEG_STANDALONE_MARKERS:
+            continue
+        if code in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header.
+            return None
+        length_bytes = file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        (length,) = struct.unpack(">H", length_bytes)
+        if code in _JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        file.seek(length - 2, 1)
+
+
+def _read_png(path: str) -> _Png | None:
+    # Decodes non-interlaced 8-bit PNGs; anything else returns None.
+    with open(path, mode="rb") as file:
+        data = file.read()
+    if not data.startswith(_PNG_SIGNATURE):
+        return None
+    position = len(_PNG_SIGNATURE)
+    header = None
+    chunks = []
+    compressed = []
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position : position + 8])
+        chunk = data[position + 8 : position + 8 + length]
+        position += length + 12
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"IDAT":
+            compressed.append(chunk)
+        elif chunk_type in _PNG_KEPT_CHUNKS:
+            chunks.append((chunk_type, chunk))
+        elif chunk_type == b"IEND":
+            break
+    if header is None:
+        return None
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if bit_depth != 8 or color_type not in _PNG_CHANNELS or interlace != 0:
+        return None
+    try:
+        raw = zlib.decompress(b"".join(compressed))
+        rows = _unfilter(raw, width, height, _PNG_CHANNELS[color_type])
+    except (zlib.error, ValueError):
+        return None
+    return _Png(width, height, color_type, rows, chunks)
+
+
+def _unfilter(raw: bytes, width: int, height: int, channels: int) -> list[bytes]:
+    stride = width * channels
+    if len(raw) < height * (stride + 1):
+        raise ValueError("PNG image data is truncated")
+    rows = []
+    previous = bytes(stride)
+    position = 0
+    for _ in range(height):
+        filter_type = raw[position]
+        line = bytearray(raw[position + 1 : position + 1 + stride])
+        position += stride + 1
+        if filter_type == 1:
+            for i in range(channels, stride):
+                line[i] = (line[i] + line[i - channels]) & 0xFF
+        elif filter_type == 2:
+            line = bytearray((a + b) & 0xFF for a, b in zip(line, previous))
+        elif filter_type == 3:
+            for i in range(channels):
+                line[i] = (line[i] + (previous[i] >> 1)) & 0xFF
+            for i in range(channels, stride):
+                line[i] = (line[i] + ((line[i - channels] + previous[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(stride):
+                left = line[i - channels] if i >= channels else 0
+                up = previous[i]
+                up_left = previous[i - channels] if i >= channels else 0
+                estimate = left + up - up_left
+                left_distance = abs(estimate - left)
+                up_distance = abs(estimate - up)
+                up_left_distance = abs(estimate - up_left)
+                if left_distance <= up_distance and left_distance <= up_left_distance:
+                    predictor = left
+                elif up_distance <= up_left_distance:
+                    predictor = up
+                else:
+                    predictor = up_left
+                line[i] = (line[i] + predictor) & 0xFF
+        elif filter_type != 0:
+            raise ValueError(f"Unknown PNG filter type {filter_type}")
+        rows.append(bytes(line))
+        previous = line
+    return rows
+
+
+def _downscale(image: _Png, width: int) -> _Png:
+    # Averages the source pixels under each target pixel (a box filter).
+    # Palette indices can't be averaged, so those take the nearest pixel.
+    height = max(1, round(image.height * width / image.width))
+    channels = image.channels
+    columns = [_span(x, width, image.width) for x in range(width)]
+    rows = []
+    for y in range(height):
+        top, bottom = _span(y, height, image.height)
+        if image.color_type == 3:
+            source_row = image.rows[top]
+            rows.append(bytes(source_row[left] for left, _ in columns))
+            continue
+        sums = [sum(column) for column in zip(*image.rows[top:bottom])]
+        row = bytearray()
+        for left, right in columns:
+            count = (right - left) * (bottom - top)
+            end = right * channels
+            for channel in range(channels):
+                total = sum(sums[left * channels + channel : end : channels])
+                row.append((total + count // 2) // count)
+        rows.append(bytes(row))
+    return _Png(width, height, image.color_type, rows, image.chunks)
+
+
+def _span(index: int, size: int, source_size: int) -> tuple[int, int]:
+    start = index * source_size // size
+    end = max((index + 1) * source_size // size, start + 1)
+    return start, end
+
+
+def _encode_png(image: _Png) -> bytes:
+    header = struct.pack(
+        ">IIBBBBB", image.width, image.height, 8, image.color_type, 0, 0, 0
+    )
+    raw = b"".join(b"\x00" + row for row in image.rows)
+    chunks = [
+        (b"IHDR", header),
+        *image.chunks,
+        (b"IDAT", zlib.compress(raw, 9)),
+        (b"IEND", b""),
+    ]
+    return _PNG_SIGNATURE + b"".join(
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+        for chunk_type, data in chunks
+    )
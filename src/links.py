@@ -0,0 +1,190 @@
+import json
+import posixpath
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from os import makedirs, replace, sep
+from os.path import dirname, normpath, relpath
+from urllib.parse import unquote, urlsplit
+
+# (kind, url) with kind "link" or "image", as found while parsing a page.
+Link = tuple[str, str]
+
+
+@dataclass(frozen=True)
+class BrokenLink:
+    source: str
+    kind: str
+    url: str
+
+
+class LinkIndex:
+    def __init__(self, pages: dict[str, tuple[str, list[Link]]] | None = None):
+        # Source path -> (output path, outbound links). Change pages through
+        # record and retain, which keep the inbound map in step.
+        self.pages = pages if pages is not None else {}
+        # Output path a link can be served from -> the sources linking there.
+        # Built by the first linking_to call, for its public_dir.
+        self._inbound: dict[str, set[str]] | None = None
+        self._public_dir = ""
+
+    @classmethod
+    def load(cls, path: str) -> "LinkIndex":
+        try:
+            with open(path) as file:
+                raw_pages = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+        pages = {
+            source: (output_path, [(kind, url) for kind, url in links])
+            for source, (output_path, links) in raw_pages.items()
+        }
+        return cls(pages)
+
+    def save(self, path: str):
+        makedirs(dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as file:
+            json.dump(self.pages, file, indent=2, sort_keys=True)
+        replace(tmp_path, path)
+
+    def record(self, source: str, output_path: str, links: list[Link]):
+        self._remove_inbound(source)
+        self.pages[source] = (output_path, links)
+        self._add_inbound(source)
+
+    def retain(self, sources: Iterable[str]):
+        # Pages skipped by an incremental build keep their links from the
+        # build that rendered them; pages that are gone are dropped.
+        sources = set(sources)
+        for source in list(self.pages):
+            if source not in sources:
+                self._remove_inbound(source)
+                del self.pages[source]
+
+    def outbound(self, source: str) -> list[Link]:
+        return self.pages.get(source, ("", []))[1]
+
+    def inbound(self, public_dir: str) -> dict[str, list[str]]:
+        inbound = {}
+        for source, (output_path, links) in self.pages.items():
+            for _, url in links:
+                target = resolve_link(url, output_path, public_dir)
+                if target is not None:
+                    inbound.setdefault(target, []).append(source)
+        return inbound
+
+    def linking_to(self, output_paths: Iterable[str], public_dir: str) -> set[str]:
+        # The pages with a link that one of these outputs would serve, found
+        # without resolving every link of the site again.
+        if self._inbound is None or public_dir != self._public_dir:
+            self._inbound = {}
+            self._public_dir = public_dir
+            for source in self.pages:
+                self._add_inbound(source)
+        sources = set()
+        for path in output_paths:
+            sources |= self._inbound.get(normpath(path), set())
+        return sources
+
+    def check(
+        self,
+        outputs: Iterable[str],
+        public_dir: str,
+        sources: Iterable[str] | None = None,
+    ) -> list[BrokenLink]:
+        # Checked against the outputs the build knows about (pages and
+        # static files) rather than by crawling public/ again. With sources,
+        # only the links of those pages are checked.
+        output_paths = {normal_path(path) for path in outputs}
+        if sources is None:
+            sources = self.pages
+        broken = []
+        for source in sorted(source for source in sources if source in self.pages):
+            output_path, links = self.pages[source]
+            for kind, url in links:
+                target = resolve_link(url, output_path, public_dir)
+                if target is None:
+                    continue
+                candidates = link_output_paths(target, public_dir)
+                if not any(path in output_paths for path in candidates):
+                    broken.append(BrokenLink(source, kind, url))
+        return broken
+
+    def _add_inbound(self, source: str):
+        if self._inbound is None or source not in self.pages:
+            return
+        for path in self._link_output_paths(source):
+            self._inbound.setdefault(path, set()).add(source)
+
+    def _remove_inbound(self, source: str):
+        if self._inbound is None or source not in self.pages:
+            return
+        for path in self._link_output_paths(source):
+            linking_sources = self._inbound[path]
+            linking_sources.discard(source)
+            if not linking_sources:
+                del self._inbound[path]
+
+    def _link_output_paths(self, source: str) -> set[str]:
+        output_path, links = self.pages[source]
+        paths = set()
+        for _, url in links:
+            target = resolve_link(url, output_path, self._public_dir)
+            if target is not None:
+                paths.update(link_output_paths(target, self._public_dir))
+        return paths
+
+
+def resolve_link(url: str, page_output_path: str, public_dir: str) -> str | None:
+    # Returns the site path an internal URL points at, or None for external
+    # URLs and links within the page itself.
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    page_path = "/" + relpath(page_output_path, public_dir).replace(sep, "/")
+    path = unquote(parts.path)
+    target = posixpath.normpath(posixpath.join(posixpath.dirname(page_path), path))
+    if path.endswith("/") and target != "/":
+        target += "/"
+    return target
+
+
+@lru_cache(maxsize=65536)
+def normal_path(path: str) -> str:
+    # normpath for output paths, which are the same from one check to the
+    # next; the watch loop normalizes every output of the site each change.
+    return normpath(path)
+
+
+def link_output_paths(target: str, public_dir: str) -> list[str]:
+    # The files a site path can be served from, most specific first.
+    path = normpath(public_dir + target)
+    if target.endswith("/"):
+        return [normpath(f"{path}/index.html")]
+    return [path, normpath(f"{path}/index.html")]
+
+
+_active_links: list[Link] | None = None
+
+
+def record_link(kind: str, url: str):
+    if _active_links is not None:
+        _active_links.append((kind, url))
+
+
+def record_links(links: Iterable[Link]):
+    if _active_links is not None:
+        _active_links.extend(links)
+
+
+@contextmanager
+def collecting_links(links: list[Link]) -> Iterator[list[Link]]:
+    global _active_links
+    previous_links = _active_links
+    _active_links = links
+    try:
+        yield links
+    finally:
+        _active_links = previous_links
@@ -0,0 +1,269 @@
+import hashlib
+import heapq
+from collections.abc import Callable, Iterator
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from html import escape
+from os import makedirs, remove, replace, sep
+from os.path import basename, dirname, isfile, join, relpath, splitext
+from typing import TextIO
+from xml.sax.saxutils import escape as xml_escape
+
+from compress import remove_compressed
+from frontmatter import FrontMatterValue
+from manifest import Manifest, ManifestEntry
+from metadata import MetadataIndex, PageMetadata
+from template import Template
+
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+# The most URLs and uncompressed bytes the sitemap protocol allows in one file.
+SITEMAP_MAX_URLS = 50_000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+
+def output_url(output_path: str, public_dir: str) -> str:
+    url = "/" + relpath(output_path, public_dir).replace(sep, "/")
+    if url.endswith("/index.html"):
+        return url.removesuffix("index.html")
+    return url
+
+
+def write_section_indexes(
+    metadata_index: MetadataIndex,
+    public_dir: str,
+    content_dir: str,
+    template: Template,
+    manifest: Manifest,
+) -> list[str]:
+    # Every output directory without an index page of its own gets one that
+    # lists its pages and subdirectories. Each is recorded in the manifest
+    # under its content directory with a trailing slash.
+    pages_by_dir: dict[str, list[PageMetadata]] = {}
+    subdirs_by_dir: dict[str, set[str]] = {}
+    index_dirs = set()
+    for metadata in metadata_index.pages.values():
+        output_dir = dirname(str(metadata["output_path"]))
+        if basename(str(metadata["output_path"])) == "index.html":
+            index_dirs.add(output_dir)
+        pages_by_dir.setdefault(output_dir, []).append(metadata)
+        while relpath(output_dir, public_dir) != ".":
+            parent_dir = dirname(output_dir)
+            subdirs_by_dir.setdefault(parent_dir, set()).add(output_dir)
+            pages_by_dir.setdefault(parent_dir, [])
+            output_dir = parent_dir
+
+    written = []
+    listing_sources = set()
+    for output_dir in sorted(pages_by_dir.keys() - index_dirs):
+        relative_dir = relpath(output_dir, public_dir)
+        title = "Index" if relative_dir == "." else basename(output_dir)
+        items = [
+            (f"{basename(subdir)}/", output_url(join(subdir, "index.html"), public_dir))
+            for subdir in sorted(subdirs_by_dir.get(output_dir, ()))
+        ]
+        items.extend(
+            (str(page["title"]), output_url(str(page["output_path"]), public_dir))
+            for page in _newest_first(pages_by_dir[output_dir])
+        )
+        listing = "".join(
+            f'<li><a href="{escape(url)}">{escape(text)}</a></li>'
+            for text, url in items
+        )
+        content = f'<ul class="section-index">{listing}</ul>'
+
+        source = content_dir
+        if relative_dir != ".":
+            source = join(content_dir, relative_dir, "")
+        output_path = join(output_dir, "index.html")
+        entry = ManifestEntry(
+            source_hash=hashlib.sha256(f"{title}\0{content}".encode()).hexdigest(),
+            output_path=output_path,
+            template_hash=template.digest,
+        )
+        if not manifest.is_fresh(source, entry):
+            _write_atomically(
+                output_path,
+                lambda file: template.write(file, {"Title": title, "Content": content}),
+            )
+            written.append(output_path)
+        manifest.record(source, entry)
+        listing_sources.add(source)
+
+    stale_listings = [
+        source
+        for source in manifest.entries
+        if source.startswith(content_dir)
+        and source.endswith("/")
+        and source not in listing_sources
+    ]
+    manifest.remove_entries(stale_listings)
+    return written
+
+
+def write_sitemap(
+    path: str,
+    metadata_index: MetadataIndex,
+    outputs: list[str],
+    public_dir: str,
+    base_url: str,
+    max_urls: int = SITEMAP_MAX_URLS,
+    max_bytes: int = SITEMAP_MAX_BYTES,
+) -> list[str]:
+    # Streamed one <url> at a time, so the document is never held in memory.
+    # URLs past the protocol's limits for one file go to sitemap-1.xml,
+    # sitemap-2.xml... and path becomes the sitemap index listing them.
+    # Returns those parts, or nothing when path holds every URL itself.
+    lastmods = {
+        str(metadata["output_path"]): str(metadata["date"])
+        for metadata in metadata_index.pages.values()
+        if "date" in metadata
+    }
+    urls = (
+        _sitemap_url(
+            _absolute_url(base_url, output_path, public_dir), lastmods.get(output_path)
+        )
+        for output_path in sorted(outputs)
+    )
+    url = next(urls, None)
+    header = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+    )
+    footer = "</urlset>\n"
+
+    def write_part(file: TextIO):
+        nonlocal url
+        file.write(header)
+        size = len(header.encode()) + len(footer.encode())
+        count = 0
+        while url is not None and count < max_urls:
+            url_size = len(url.encode())
+            if count and size + url_size > max_bytes:
+                break
+            file.write(url)
+            size += url_size
+            count += 1
+            url = next(urls, None)
+        file.write(footer)
+
+    def write_index(file: TextIO):
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write(f'<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n')
+        for part_path in part_paths:
+            location = xml_escape(_absolute_url(base_url, part_path, public_dir))
+            file.write(f"<sitemap><loc>{location}</loc></sitemap>\n")
+        file.write("</sitemapindex>\n")
+
+    root, extension = splitext(path)
+    part_paths: list[str] = []
+    while not part_paths or url is not None:
+        part_path = f"{root}-{len(part_paths) + 1}{extension}"
+        _write_atomically(part_path, write_part)
+        part_paths.append(part_path)
+    if len(part_paths) == 1:
+        # Everything fits in one file: no index needed.
+        replace(part_paths[0], path)
+        remove_compressed(path)
+        part_paths = []
+    else:
+        _write_atomically(path, write_index)
+
+    # Parts left over from a build with more pages.
+    stale_index = max(len(part_paths), 1) + 1
+    while isfile(stale_path := f"{root}-{stale_index}{extension}"):
+        remove(stale_path)
+        remove_compressed(stale_path)
+        stale_index += 1
+    return part_paths
+
+
+def write_feed(
+    path: str,
+    metadata_index: MetadataIndex,
+    public_dir: str,
+    base_url: str,
+    title: str,
+    limit: int = 20,
+):
+    items = heapq.nlargest(limit, _dated_pages(metadata_index))
+
+    def write(file: TextIO):
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write('<rss version="2.0"><channel>\n')
+        file.write(f"<title>{xml_escape(title)}</title>\n")
+        file.write(f"<link>{xml_escape(base_url.rstrip('/') + '/')}</link>\n")
+        file.write(f"<description>{xml_escape(title)}</description>\n")
+        for published, _, page in items:
+            link = xml_escape(
+                _absolute_url(base_url, str(page["output_path"]), public_dir)
+            )
+            file.write("<item>")
+            file.write(f"<title>{xml_escape(str(page['title']))}</title>")
+            file.write(f"<link>{link}</link><guid>{link}</guid>")
+            file.write(f"<pubDate>{format_datetime(published)}</pubDate>")
+            if "description" in page:
+                description = xml_escape(str(page["description"]))
+                file.write(f"<description>{description}</description>")
+            file.write("</item>\n")
+        file.write("</channel></rss>\n")
+
+    _write_atomically(path, write)
+
+
+def _dated_pages(
+    metadata_index: MetadataIndex,
+) -> Iterator[tuple[datetime, str, PageMetadata]]:
+    for source, metadata in metadata_index.pages.items():
+        published = _parse_date(metadata.get("date"))
+        if published is not None:
+            yield published, source, metadata
+
+
+def _newest_first(pages: list[PageMetadata]) -> list[PageMetadata]:
+    # Dated pages newest first, then the undated ones by title.
+    dated = sorted(
+        (page for page in pages if "date" in page),
+        key=lambda page: str(page["date"]),
+        reverse=True,
+    )
+    undated = sorted(
+        (page for page in pages if "date" not in page),
+        key=lambda page: str(page["title"]),
+    )
+    return dated + undated
+
+
+def _parse_date(value: FrontMatterValue | None) -> datetime | None:
+    if value is None:
+        return None
+    try:
+        published = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published
+
+
+def _sitemap_url(location: str, lastmod: str | None) -> str:
+    url = f"<url><loc>{xml_escape(location)}</loc>"
+    if lastmod is not None:
+        url += f"<lastmod>{xml_escape(lastmod)}</lastmod>"
+    return url + "</url>\n"
+
+
+def _absolute_url(base_url: str, output_path: str, public_dir: str) -> str:
+    return base_url.rstrip("/") + output_url(output_path, public_dir)
+
+
+def _write_atomically(path: str, write: Callable[[TextIO], None]):
+    makedirs(dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, mode="w") as file:
+            write(file)
+    except BaseException:
+        remove(tmp_path)
+        raise
+    replace(tmp_path, path)
+    remove_compressed(path)
@@ -1,50 +1,1042 @@
-import shutil
-from contextlib import suppress
-from os import listdir, makedirs, mkdir
-from os.path import dirname, isfile, join
+import argparse
+import hashlib
+import json
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from os import cpu_count, makedirs, sep, walk
+from os.path import dirname, getsize, isfile, join, relpath
 
+from assets import (
+    asset_url_map,
+    prune_outputs,
+    rewriting_asset_urls,
+    SyncStats,
+    sync_asset_paths,
+    sync_assets,
+    url_path,
+)
+from compress import CompressedIndex, compress_outputs, compress_public
+from depgraph import DependencyGraph
+from images import (
+    ImageIndex,
+    ImageInfo,
+    ImageOptions,
+    process_images,
+    using_images,
+)
+from links import (
+    Link,
+    LinkIndex,
+    collecting_links,
+    link_output_paths,
+    normal_path,
+    resolve_link,
+)
+from listings import write_feed, write_section_indexes, write_sitemap
+from manifest import Manifest, ManifestEntry, file_hash
+from metadata import MetadataIndex, PageMetadata
+from minify import MinifyStats, format_savings, minifying
+from page_cache import CachedPage, PageCache
+from profiler import BuildProfile, PhaseTotals, Profiler, phase, profiling
+from render_cache import CachedBlock, CacheKey, RenderCache
+from template import Template, load_template, template_dependencies
 from utils import generate_page
+from watch import InotifyWatcher, PollingWatcher, create_watcher, watch_changes
+
+CONTENT_DIR = "content/"
+STATIC_DIR = "static"
+TEMPLATE_PATH = "template.html"
+PUBLIC_DIR = "public/"
+MANIFEST_PATH = ".cache/manifest.json"
+PROFILE_PATH = ".cache/profile.json"
+LINKS_PATH = ".cache/links.json"
+DEPENDENCIES_PATH = ".cache/dependencies.json"
+METADATA_PATH = ".cache/metadata.json"
+IMAGES_PATH = ".cache/images.json"
+COMPRESSED_PATH = ".cache/compressed.json"
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "rss.xml"
+
+
+@dataclass
+class BuildContext:
+    # Per-build settings and the indexes pages are recorded in, passed through
+    # every stage of a build instead of one parameter each.
+    jobs: int = 1
+    render_cache: RenderCache | None = None
+    build_profile: BuildProfile | None = None
+    link_index: LinkIndex | None = None
+    metadata_index: MetadataIndex | None = None
+    dependency_graph: DependencyGraph | None = None
+    image_index: ImageIndex | None = None
+    image_options: ImageOptions = field(default_factory=ImageOptions)
+    image_widths: list[int] = field(default_factory=list)
+    minify: bool = False
+    page_cache: PageCache | None = None
+    link_assets: bool = False
+    verify_assets: bool = False
+    fingerprint: bool = False
 
 
 def main():
-    with suppress(FileNotFoundError):
-        shutil.rmtree("public")
-    mkdir("public")
-    copy_to_public("static")
-    generate_pages_recursive("content/", "template.html", "public/")
-
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    items = listdir(dir_path_content)
-
-    for item in items:
-        content_path = join(dir_path_content, item)
-        if isfile(content_path):
-            if content_path[-3:] == ".md":
-                output_path = join(
-                    "public", content_path.replace("content/", "")
-                ).replace(".md", ".html")
-                output_dir = dirname(output_path)
-                makedirs(output_dir, exist_ok=True)
-                generate_page(content_path, template_path, output_path)
+    args = parse_args()
+
+    incremental = args.incremental or args.watch
+    manifest = Manifest.load(MANIFEST_PATH) if incremental else Manifest()
+    link_index = LinkIndex.load(LINKS_PATH) if incremental else LinkIndex()
+    metadata_index = MetadataIndex()
+    if incremental:
+        metadata_index = MetadataIndex.load(METADATA_PATH)
+    dependency_graph = DependencyGraph.load(DEPENDENCIES_PATH)
+    # Kept across clean builds too: variants of unchanged images stay valid.
+    image_index = ImageIndex.load(IMAGES_PATH)
+    makedirs(PUBLIC_DIR, exist_ok=True)
+
+    render_cache = None
+    if args.render_cache_size > 0:
+        render_cache = RenderCache(args.render_cache_size)
+        if args.render_cache:
+            render_cache.load(args.render_cache)
+
+    page_cache = None
+    if args.page_cache:
+        page_cache = PageCache(args.page_cache, args.page_cache_size * 1024 * 1024)
+
+    build_profile = BuildProfile() if args.profile else None
+    context = BuildContext(
+        jobs=args.jobs,
+        render_cache=render_cache,
+        build_profile=build_profile,
+        link_index=link_index,
+        metadata_index=metadata_index,
+        dependency_graph=dependency_graph,
+        image_index=image_index,
+        image_options=ImageOptions(args.eager_images, args.image_sizes),
+        image_widths=args.image_widths,
+        minify=args.minify,
+        page_cache=page_cache,
+        link_assets=args.link_assets,
+        verify_assets=args.verify_assets,
+        fingerprint=args.fingerprint,
+    )
+    with profiling(build_profile.totals if build_profile else None):
+        with phase("asset_sync"):
+            asset_stats = sync_assets(
+                STATIC_DIR,
+                PUBLIC_DIR,
+                manifest,
+                hardlink=context.link_assets,
+                verify_hash=context.verify_assets,
+                fingerprint=context.fingerprint,
+                minify=context.minify,
+            )
+        with phase("images"):
+            image_stats = process_images(
+                manifest,
+                STATIC_DIR,
+                PUBLIC_DIR,
+                image_index,
+                context.image_widths,
+                jobs=context.jobs,
+            )
+        if not incremental:
+            # A clean build only keeps the assets it just synced, so
+            # unchanged ones are not copied again.
+            asset_outputs = {entry.output_path for entry in manifest.entries.values()}
+            pruned = prune_outputs(PUBLIC_DIR, asset_outputs | image_index.outputs())
+            print(f"Cleaned {len(pruned)} previous output(s)")
+        _print_asset_stats(asset_stats)
+        print(f"Images: {image_stats}")
+        errors = generate_pages_recursive(
+            CONTENT_DIR, TEMPLATE_PATH, PUBLIC_DIR, manifest, context
+        )
+        with phase("listings"):
+            write_listings(
+                metadata_index, manifest, args.base_url, args.feed_size, args.minify
+            )
+    if render_cache is not None:
+        print(f"Render cache: {render_cache.stats()}")
+        if args.render_cache:
+            render_cache.save(args.render_cache)
+    if page_cache is not None:
+        page_cache.evict()
+        print(f"Page cache: {page_cache.stats()}")
+
+    for output_path in manifest.remove_stale():
+        print(f"Removing stale output {output_path}")
+    manifest.save(MANIFEST_PATH)
+    check_links(link_index, manifest)
+    link_index.save(LINKS_PATH)
+    update_dependencies(dependency_graph, link_index, manifest)
+    dependency_graph.save(DEPENDENCIES_PATH)
+    save_metadata(metadata_index, manifest)
+    image_index.save(IMAGES_PATH)
+
+    # Runs without --compress too: compressed files left by an earlier build
+    # must not outlive the outputs they were made from.
+    compressed_index = CompressedIndex.load(COMPRESSED_PATH)
+    with profiling(build_profile.totals if build_profile else None):
+        with phase("compression"):
+            compressed = compress_public(
+                PUBLIC_DIR,
+                compressed_index,
+                args.compress_threshold,
+                compress=args.compress,
+            )
+    compressed_index.save(COMPRESSED_PATH)
+    if args.compress:
+        print(f"Compressed {len(compressed)} file(s)")
+
+    if build_profile is not None:
+        build_profile.write_report(args.profile)
+        build_profile.print_summary()
+        print(f"Profile report written to {args.profile}")
+
+    if args.watch:
+        _print_errors(errors)
+        compress_threshold = args.compress_threshold if args.compress else None
+        # The profile only covers the initial build.
+        watch(
+            manifest,
+            replace(context, build_profile=None),
+            base_url=args.base_url,
+            feed_size=args.feed_size,
+            compress_threshold=compress_threshold,
+        )
+    elif errors:
+        _print_errors(errors)
+        sys.exit(1)
+
+
+def _print_asset_stats(asset_stats: SyncStats):
+    print(f"Static files: {asset_stats}")
+    for output_path, before, after in asset_stats.minified:
+        print(format_savings(output_path, before, after))
+
+
+def _print_errors(errors: list[tuple[str, Exception]]):
+    if errors:
+        print(f"{len(errors)} page(s) failed to generate:")
+    for content_path, error in errors:
+        print(f"  {content_path}: {error}")
+
+
+def check_links(
+    link_index: LinkIndex, manifest: Manifest, sources: Iterable[str] | None = None
+):
+    # With sources, only the links of those pages are checked.
+    link_index.retain(manifest.entries)
+    broken_links = link_index.check(build_outputs(manifest), PUBLIC_DIR, sources)
+    if broken_links:
+        print(f"{len(broken_links)} broken link(s):")
+    for broken_link in broken_links:
+        print(f"  {broken_link.source}: {broken_link.kind} {broken_link.url}")
+
+
+def build_outputs(manifest: Manifest) -> list[str]:
+    # Pages, static files and index pages are in the manifest; the sitemap
+    # and the feed are written by every build.
+    outputs = [entry.output_path for entry in manifest.entries.values()]
+    return outputs + [join(PUBLIC_DIR, SITEMAP_NAME), join(PUBLIC_DIR, FEED_NAME)]
+
+
+def write_listings(
+    metadata_index: MetadataIndex,
+    manifest: Manifest,
+    base_url: str,
+    feed_size: int,
+    minify: bool = False,
+) -> list[str]:
+    # Built from the metadata collected while rendering; no page is re-read.
+    # Returns the files written.
+    metadata_index.retain(
+        source for source in manifest.entries if manifest.is_current(source)
+    )
+    template = load_template(
+        TEMPLATE_PATH, asset_url_map(manifest, STATIC_DIR, PUBLIC_DIR), minify
+    )
+    written = write_section_indexes(
+        metadata_index, PUBLIC_DIR, CONTENT_DIR, template, manifest
+    )
+    html_outputs = [
+        entry.output_path
+        for entry in manifest.entries.values()
+        if entry.output_path.endswith(".html")
+    ]
+    sitemap_parts = write_sitemap(
+        join(PUBLIC_DIR, SITEMAP_NAME),
+        metadata_index,
+        html_outputs,
+        PUBLIC_DIR,
+        base_url,
+    )
+    home_page = metadata_index.pages.get(join(CONTENT_DIR, "index.md"), {})
+    write_feed(
+        join(PUBLIC_DIR, FEED_NAME),
+        metadata_index,
+        PUBLIC_DIR,
+        base_url,
+        str(home_page.get("title", "Feed")),
+        feed_size,
+    )
+    sitemap = SITEMAP_NAME
+    if sitemap_parts:
+        sitemap = f"{SITEMAP_NAME} (index of {len(sitemap_parts)} parts)"
+    print(f"Wrote {len(written)} index page(s), {sitemap} and {FEED_NAME}")
+    sitemap_path = join(PUBLIC_DIR, SITEMAP_NAME)
+    return [*written, sitemap_path, *sitemap_parts, join(PUBLIC_DIR, FEED_NAME)]
+
+
+def save_metadata(metadata_index: MetadataIndex, manifest: Manifest):
+    metadata_index.retain(manifest.entries)
+    metadata_index.save(METADATA_PATH)
+
+
+def update_dependencies(
+    dependency_graph: DependencyGraph,
+    link_index: LinkIndex,
+    manifest: Manifest,
+    sources: Iterable[str] | None = None,
+):
+    # Every page consumes its markdown, the template with its includes and
+    # the static files it links to or shows, whose fingerprints and image
+    # dimensions end up in the page. A static file that does not exist yet
+    # counts too: creating it gives the page a new URL to link to. With
+    # sources, only those pages are recorded again.
+    dependencies = template_dependencies(TEMPLATE_PATH)
+    static_prefix = STATIC_DIR + "/"
+    static_sources = {}
+    page_outputs = set()
+    for source, entry in manifest.entries.items():
+        if source.startswith(static_prefix):
+            static_sources[normal_path(entry.output_path)] = source
+        else:
+            page_outputs.add(normal_path(entry.output_path))
+    for source in link_index.pages if sources is None else sources:
+        if source not in link_index.pages:
+            continue
+        output_path, links = link_index.pages[source]
+        inputs = [source, *dependencies]
+        for _, url in links:
+            target = resolve_link(url, output_path, PUBLIC_DIR)
+            if target is None:
+                continue
+            candidates = link_output_paths(target, PUBLIC_DIR)
+            static_source = next(
+                (static_sources[path] for path in candidates if path in static_sources),
+                None,
+            )
+            if static_source is not None:
+                inputs.append(static_source)
+            elif not any(path in page_outputs for path in candidates):
+                # Fingerprinted only once it exists, so named as linked.
+                inputs.append(join(STATIC_DIR, relpath(candidates[0], PUBLIC_DIR)))
+        dependency_graph.record(output_path, inputs)
+    if sources is not None:
+        return
+    page_outputs = {output_path for output_path, _ in link_index.pages.values()}
+    for output_path in dependency_graph.outputs:
+        if output_path not in page_outputs:
+            dependency_graph.remove(output_path)
+
+
+@dataclass
+class WatchState:
+    # What the outputs were last brought up to date with: the manifest
+    # entries and what the listings were written from. A rebuild that fails
+    # leaves it alone, so the next one still covers what that one changed.
+    entries: dict[str, ManifestEntry]
+    metadata_version: int
+    template_digest: str
+
+    @classmethod
+    def current(cls, manifest: Manifest, context: BuildContext) -> "WatchState":
+        return cls(
+            dict(manifest.entries),
+            context.metadata_index.version,
+            _template_digest(manifest, context.minify),
+        )
+
+
+def watch(
+    manifest: Manifest,
+    context: BuildContext,
+    base_url: str,
+    feed_size: int,
+    compress_threshold: int | None = None,
+):
+    compressed_index = CompressedIndex.load(COMPRESSED_PATH)
+    state = WatchState.current(manifest, context)
+    # Built now rather than on the first change.
+    context.link_index.linking_to([], PUBLIC_DIR)
+    dependencies = template_dependencies(TEMPLATE_PATH)
+    watcher = _create_watcher(dependencies)
+    failed_paths: set[str] = set()
+    try:
+        while True:
+            for changed_paths in watch_changes(watcher):
+                # Changes a failed rebuild did not get through are tried again.
+                changed_paths |= failed_paths
+                start = time.perf_counter()
+                try:
+                    errors = update_watched(
+                        changed_paths,
+                        manifest,
+                        context,
+                        state,
+                        compressed_index,
+                        base_url=base_url,
+                        feed_size=feed_size,
+                        compress_threshold=compress_threshold,
+                    )
+                except Exception as error:
+                    # A half-written include, a file deleted while it was
+                    # read: the next change set may well fix it.
+                    print(f"Rebuild failed: {type(error).__name__}: {error}")
+                    failed_paths = changed_paths
+                else:
+                    failed_paths = set()
+                    elapsed = time.perf_counter() - start
+                    print(
+                        f"Rebuilt {len(changed_paths)} change(s) in "
+                        f"{elapsed * 1000:.1f} ms"
+                    )
+                    _print_errors(errors)
+                if template_dependencies(TEMPLATE_PATH) != dependencies:
+                    break
+            # An include was added or removed: watch the new set of files.
+            watcher.close()
+            dependencies = template_dependencies(TEMPLATE_PATH)
+            watcher = _create_watcher(dependencies)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        watcher.close()
+        # Saved once on the way out rather than after every change.
+        manifest.save(MANIFEST_PATH)
+        context.link_index.save(LINKS_PATH)
+        context.dependency_graph.save(DEPENDENCIES_PATH)
+        save_metadata(context.metadata_index, manifest)
+        context.image_index.save(IMAGES_PATH)
+        compressed_index.save(COMPRESSED_PATH)
+
+
+def update_watched(
+    changed_paths: set[str],
+    manifest: Manifest,
+    context: BuildContext,
+    state: WatchState,
+    compressed_index: CompressedIndex,
+    base_url: str,
+    feed_size: int,
+    compress_threshold: int | None = None,
+) -> list[tuple[str, Exception]]:
+    # rebuild_changed, then only the follow-up work the rebuild calls for:
+    # links and dependencies of the pages it touched, listings when page
+    # metadata or the outputs they list changed, compression of the files
+    # it wrote.
+    errors = rebuild_changed(changed_paths, manifest, context)
+    context.metadata_index.retain(manifest.entries)
+    template_digest = state.template_digest
+    template_paths = set(template_dependencies(TEMPLATE_PATH))
+    if any(
+        path.startswith(STATIC_DIR + "/") or path in template_paths
+        for path in changed_paths
+    ):
+        template_digest = _template_digest(manifest, context.minify)
+    changed_sources, moved_outputs = _changed_entries(state.entries, manifest.entries)
+    written = set()
+    if (
+        context.metadata_index.version != state.metadata_version
+        or template_digest != state.template_digest
+        or any(path.endswith(".html") for path in moved_outputs)
+    ):
+        written.update(
+            write_listings(
+                context.metadata_index, manifest, base_url, feed_size, context.minify
+            )
+        )
+        changed_sources, moved_outputs = _changed_entries(
+            state.entries, manifest.entries
+        )
+
+    # Pages linking to an output that appeared or disappeared have a link
+    # that just broke or got fixed, and a dependency that changed.
+    link_index = context.link_index
+    link_index.retain(manifest.entries)
+    linked_sources = changed_sources | link_index.linking_to(moved_outputs, PUBLIC_DIR)
+    check_links(link_index, manifest, linked_sources)
+    for source in state.entries.keys() - manifest.entries.keys():
+        context.dependency_graph.remove(state.entries[source].output_path)
+    update_dependencies(context.dependency_graph, link_index, manifest, linked_sources)
+
+    written.update(manifest.entries[source].output_path for source in changed_sources)
+    compress_outputs(
+        written | moved_outputs,
+        compressed_index,
+        compress_threshold or 0,
+        compress=compress_threshold is not None,
+    )
+    state.entries = dict(manifest.entries)
+    state.metadata_version = context.metadata_index.version
+    state.template_digest = template_digest
+    return errors
+
+
+def _changed_entries(
+    previous_entries: dict[str, ManifestEntry], entries: dict[str, ManifestEntry]
+) -> tuple[set[str], set[str]]:
+    # The sources whose entry is new or changed, and the outputs that
+    # appeared or disappeared. An output another, unchanged source also
+    # produces may be counted, which only means its links are checked again.
+    # Entries the rebuild did not touch are the same objects as before.
+    changed_sources = {
+        source
+        for source, entry in entries.items()
+        if previous_entries.get(source) is not entry
+        and previous_entries.get(source) != entry
+    }
+    removed_sources = previous_entries.keys() - entries.keys()
+    previous_outputs = {
+        previous_entries[source].output_path
+        for source in changed_sources | removed_sources
+        if source in previous_entries
+    }
+    outputs = {entries[source].output_path for source in changed_sources}
+    return changed_sources, previous_outputs ^ outputs
+
+
+def _template_digest(manifest: Manifest, minify: bool) -> str:
+    asset_urls = asset_url_map(manifest, STATIC_DIR, PUBLIC_DIR)
+    return load_template(TEMPLATE_PATH, asset_urls, minify).digest
+
+
+def _create_watcher(dependencies: list[str]) -> InotifyWatcher | PollingWatcher:
+    watcher = create_watcher([CONTENT_DIR, STATIC_DIR, *dependencies])
+    print(
+        f"Watching {CONTENT_DIR}, {STATIC_DIR}/ and "
+        f"{', '.join(dependencies)} for changes"
+    )
+    return watcher
+
+
+def rebuild_changed(
+    changed_paths: set[str], manifest: Manifest, context: BuildContext
+) -> list[tuple[str, Exception]]:
+    static_paths = sorted(
+        path for path in changed_paths if path.startswith(STATIC_DIR + "/")
+    )
+    # Only static files change the fingerprints the template refers to.
+    template_digest = None
+    if static_paths:
+        template_digest = _template_digest(manifest, context.minify)
+    assets = []
+    for path in static_paths:
+        if isfile(path):
+            assets.append(path)
+        else:
+            _remove_outputs(manifest, path)
+    if assets:
+        asset_stats = sync_asset_paths(
+            assets,
+            STATIC_DIR,
+            PUBLIC_DIR,
+            manifest,
+            hardlink=context.link_assets,
+            verify_hash=context.verify_assets,
+            fingerprint=context.fingerprint,
+            minify=context.minify,
+        )
+        _print_asset_stats(asset_stats)
+    if static_paths and context.image_index is not None:
+        image_stats = process_images(
+            manifest,
+            STATIC_DIR,
+            PUBLIC_DIR,
+            context.image_index,
+            context.image_widths,
+            jobs=context.jobs,
+        )
+        print(f"Images: {image_stats}")
+
+    pages = {}
+    if static_paths and _template_digest(manifest, context.minify) != template_digest:
+        # A static file the template refers to got a new fingerprint. Pages
+        # that refer to one themselves are found through their dependencies.
+        return generate_pages_recursive(
+            CONTENT_DIR, TEMPLATE_PATH, PUBLIC_DIR, manifest, context
+        )
+    if context.dependency_graph is not None:
+        # Pages whose template, includes or referenced static files changed.
+        sources_by_output = {
+            entry.output_path: source for source, entry in manifest.entries.items()
+        }
+        for output_path in context.dependency_graph.dirty(changed_paths):
+            source = sources_by_output.get(output_path)
+            if source is not None and source.startswith(CONTENT_DIR):
+                if isfile(source):
+                    pages[source] = output_path
+    elif TEMPLATE_PATH in changed_paths:
+        return generate_pages_recursive(
+            CONTENT_DIR, TEMPLATE_PATH, PUBLIC_DIR, manifest, context
+        )
+
+    for path in sorted(changed_paths):
+        if not path.startswith(CONTENT_DIR):
+            continue
+        if isfile(path):
+            if path.endswith(".md"):
+                pages[path] = page_output_path(path, CONTENT_DIR, PUBLIC_DIR)
         else:
-            generate_pages_recursive(content_path, template_path, dest_dir_path)
+            _remove_outputs(manifest, path)
+    if not pages:
+        return []
+    return generate_pages(sorted(pages.items()), TEMPLATE_PATH, manifest, context)
+
+
+def _remove_outputs(manifest: Manifest, path: str):
+    for output_path in manifest.remove(path):
+        print(f"Removing stale output {output_path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rebuild outputs whose sources or template changed",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After building, rebuild changed pages and static files until stopped",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to render pages (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--render-cache-size",
+        type=int,
+        default=4096,
+        help="Maximum number of rendered blocks kept in memory (0 disables)",
+    )
+    parser.add_argument(
+        "--render-cache",
+        metavar="PATH",
+        help="Persist the render cache to this file between builds",
+    )
+    parser.add_argument(
+        "--page-cache",
+        metavar="DIR",
+        help="Reuse rendered pages from this directory, which builds may share",
+    )
+    parser.add_argument(
+        "--page-cache-size",
+        type=int,
+        default=512,
+        help="Size the page cache is trimmed to after a build, in MB",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_PATH,
+        metavar="PATH",
+        help=(
+            "Record per-phase timings and live memory block deltas (allocations "
+            f"minus frees) and per-page timings (report: {PROFILE_PATH})"
+        ),
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Write precompressed .gz (and .zst where available) siblings",
+    )
+    parser.add_argument(
+        "--compress-threshold",
+        type=int,
+        default=1024,
+        metavar="BYTES",
+        help="Only precompress files at least this large",
+    )
+    parser.add_argument(
+        "--base-url",
+        default="http://localhost:8888",
+        help=f"Absolute site URL used in {SITEMAP_NAME} and {FEED_NAME}",
+    )
+    parser.add_argument(
+        "--feed-size",
+        type=int,
+        default=20,
+        help="Number of most recent dated pages in the feed",
+    )
+    parser.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="Hardlink static files into public/ instead of copying them",
+    )
+    parser.add_argument(
+        "--verify-assets",
+        action="store_true",
+        help="Compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--image-widths",
+        type=int,
+        nargs="*",
+        default=[],
+        metavar="WIDTH",
+        help="Widths of downscaled PNG variants written next to each image",
+    )
+    parser.add_argument(
+        "--eager-images",
+        type=int,
+        default=1,
+        help="Number of images at the top of each page not loaded lazily",
+    )
+    parser.add_argument(
+        "--image-sizes",
+        default="100vw",
+        help="sizes attribute of images with downscaled variants",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Collapse insignificant whitespace in pages and CSS files",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Add a content hash to static file names so they can be cached forever",
+    )
+    args = parser.parse_args()
+    if args.jobs <= 0:
+        args.jobs = cpu_count() or 1
+    return args
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest: Manifest,
+    context: BuildContext | None = None,
+) -> list[tuple[str, Exception]]:
+    with phase("discovery"):
+        pages = discover_pages(dir_path_content, dest_dir_path)
+    return generate_pages(
+        pages, template_path, manifest, context, dir_path_content=dir_path_content
+    )
 
 
-def copy_to_public(dir):
-    items = listdir(dir)
+def generate_pages(
+    pages: list[tuple[str, str]],
+    template_path,
+    manifest: Manifest,
+    context: BuildContext | None = None,
+    dir_path_content=CONTENT_DIR,
+) -> list[tuple[str, Exception]]:
+    context = context or BuildContext()
+    asset_urls = asset_url_map(manifest, STATIC_DIR, PUBLIC_DIR)
+    template = load_template(template_path, asset_urls, context.minify)
+    image_index = context.image_index
+    images = image_index.by_url(PUBLIC_DIR) if image_index is not None else {}
+    image_options = context.image_options
+    minify = context.minify
+    # Loading options and minification end up in every page, so they count
+    # as template. The images a page shows are its dependencies.
+    template_hash = hashlib.sha256(
+        f"{template.digest}{image_options}{minify}".encode()
+    ).hexdigest()
+    served_urls = set(asset_urls.values())
 
-    for item in items:
-        new_path = join(dir, item)
-        if isfile(new_path):
-            print(f"Copying file {new_path}")
-            output_path = join("public", new_path.replace("static/", ""))
-            output_dir = dirname(output_path)
-            makedirs(output_dir, exist_ok=True)
-            shutil.copy(new_path, output_path)
+    def dependencies_hash(links: list[Link]) -> str:
+        return page_dependencies_hash(links, asset_urls, served_urls, images)
+
+    changed_pages = []
+    with phase("discovery"):
+        for content_path, output_path in pages:
+            # The links of the page as last rendered; a page that is new or
+            # was never indexed is rendered anyway.
+            links = []
+            if context.link_index is not None:
+                links = context.link_index.outbound(content_path)
+            entry = ManifestEntry(
+                source_hash=file_hash(content_path),
+                output_path=output_path,
+                template_hash=template_hash,
+                dependencies_hash=dependencies_hash(links),
+            )
+            if manifest.is_fresh(content_path, entry):
+                print(f"Skipping unchanged page {content_path}")
+                manifest.record(content_path, entry)
+            else:
+                changed_pages.append((content_path, entry))
+
+    def record_page(content_path: str, entry: ManifestEntry, page: CachedPage):
+        manifest.record(content_path, entry)
+        if context.link_index is not None:
+            context.link_index.record(content_path, entry.output_path, page.links)
+        if context.metadata_index is not None:
+            section = page_section(content_path, dir_path_content)
+            context.metadata_index.record(
+                content_path, entry.output_path, section, page.metadata
+            )
+
+    page_cache = context.page_cache
+    pending_pages = []
+    cache_keys = {}
+    with phase("page_cache"):
+        for content_path, entry in changed_pages:
+            if page_cache is None:
+                pending_pages.append((content_path, entry))
+                continue
+            key = PageCache.key(entry.source_hash, entry.template_hash)
+            page = page_cache.restore(
+                key,
+                entry.output_path,
+                lambda page: dependencies_hash(page.links) == page.dependencies_hash,
+            )
+            if page is None:
+                cache_keys[content_path] = key
+                pending_pages.append((content_path, entry))
+            else:
+                print(f"Restoring cached page {content_path} to {entry.output_path}")
+                entry = replace(entry, dependencies_hash=page.dependencies_hash)
+                record_page(content_path, entry, page)
+
+    errors = []
+    build_profile = context.build_profile
+    settings = RenderSettings(
+        template,
+        profile=build_profile is not None,
+        asset_urls=asset_urls,
+        images=images,
+        image_options=image_options,
+    )
+    results = _render_pages(
+        [(path, entry.output_path) for path, entry in pending_pages],
+        settings,
+        context.jobs,
+        context.render_cache,
+    )
+    for (content_path, entry), (result, error) in zip(pending_pages, results):
+        print(
+            f"Generating page from {content_path} to {entry.output_path} "
+            f"using {template_path}"
+        )
+        if error is None:
+            page = CachedPage(
+                result.links, result.metadata, dependencies_hash(result.links)
+            )
+            entry = replace(entry, dependencies_hash=page.dependencies_hash)
+            record_page(content_path, entry, page)
+            if page_cache is not None:
+                try:
+                    page_cache.store(cache_keys[content_path], entry.output_path, page)
+                except OSError as error:
+                    # The build itself succeeded; only sharing it failed.
+                    print(f"Could not cache page {content_path}: {error}")
+            if result.minified is not None:
+                print(format_savings(entry.output_path, *result.minified))
+            if build_profile is not None:
+                build_profile.add_page(content_path, result.seconds, result.phases)
         else:
-            print(f"Looking deeper into directoy {new_path}")
-            copy_to_public(new_path)
+            print(f"Failed to generate page {content_path}: {error}")
+            manifest.keep(content_path)
+            errors.append((content_path, error))
+    return errors
+
+
+def discover_pages(dir_path_content, dest_dir_path) -> list[tuple[str, str]]:
+    pages = []
+    for dir_path, dir_names, file_names in walk(dir_path_content):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(".md"):
+                content_path = join(dir_path, file_name)
+                output_path = page_output_path(
+                    content_path, dir_path_content, dest_dir_path
+                )
+                pages.append((content_path, output_path))
+    return pages
+
+
+def page_section(content_path, dir_path_content) -> str:
+    # The top-level content directory a page is in; "" for top-level pages.
+    relative_dir = dirname(relpath(content_path, dir_path_content))
+    return relative_dir.split(sep)[0]
+
+
+def page_output_path(content_path, dir_path_content, dest_dir_path) -> str:
+    relative_path = relpath(content_path, dir_path_content)
+    return join(dest_dir_path, relative_path[:-3] + ".html")
+
+
+def page_dependencies_hash(
+    links: list[Link],
+    asset_urls: dict[str, str],
+    served_urls: set[str],
+    images: dict[str, ImageInfo],
+) -> str:
+    # What a page takes from the static files it refers to, from its links
+    # as rendered: which of them are served at a fingerprinted URL, and the
+    # dimensions and variants of the images it shows. A file that changed
+    # changes the hash of the pages that refer to it and of no others.
+    dependencies = []
+    for kind, url in links:
+        path = url_path(url)
+        if path in served_urls:
+            dependencies.append((kind, url, "fingerprinted"))
+        elif path in asset_urls:
+            dependencies.append((kind, url, "renamed"))
+        if kind == "image" and url in images:
+            dependencies.append((kind, url, asdict(images[url])))
+    if not dependencies:
+        return ""
+    return hashlib.sha256(json.dumps(dependencies).encode()).hexdigest()
+
+
+@dataclass
+class PageResult:
+    cache_hits: int = 0
+    cache_misses: int = 0
+    new_cache_entries: list[tuple[CacheKey, CachedBlock]] = field(default_factory=list)
+    seconds: float = 0.0
+    phases: dict[str, PhaseTotals] = field(default_factory=dict)
+    links: list[Link] = field(default_factory=list)
+    metadata: PageMetadata = field(default_factory=dict)
+    # Unminified and written size of the page when minifying.
+    minified: tuple[int, int] | None = None
+
+
+@dataclass(frozen=True)
+class RenderSettings:
+    # What rendering a page needs besides the render cache; sent to each
+    # worker process once.
+    template: Template
+    profile: bool = False
+    asset_urls: dict[str, str] = field(default_factory=dict)
+    images: dict[str, ImageInfo] = field(default_factory=dict)
+    image_options: ImageOptions = field(default_factory=ImageOptions)
+
+
+def _build_page(
+    content_path,
+    output_path,
+    settings: RenderSettings,
+    render_cache: RenderCache | None,
+) -> PageResult:
+    result = PageResult()
+    template = settings.template
+    page_profiler = Profiler() if settings.profile else None
+    if render_cache is not None:
+        hits, misses = render_cache.hits, render_cache.misses
+
+    minify_stats = MinifyStats() if template.minified else None
+
+    start = time.perf_counter()
+    try:
+        with (
+            profiling(page_profiler),
+            collecting_links(result.links),
+            rewriting_asset_urls(settings.asset_urls),
+            using_images(settings.images, settings.image_options),
+            minifying(minify_stats),
+        ):
+            result.metadata = generate_page(
+                content_path, template, output_path, render_cache
+            )
+    finally:
+        if render_cache is not None:
+            result.cache_hits = render_cache.hits - hits
+            result.cache_misses = render_cache.misses - misses
+            result.new_cache_entries = render_cache.drain_new_entries()
+    result.seconds = time.perf_counter() - start
+    if minify_stats is not None:
+        size = getsize(output_path)
+        bytes_saved = template.bytes_saved + minify_stats.bytes_saved
+        result.minified = (size + bytes_saved, size)
+    if page_profiler is not None:
+        result.phases = page_profiler.phases
+    return result
+
+
+def _render_pages(
+    pages: list[tuple[str, str]],
+    settings: RenderSettings,
+    jobs,
+    render_cache: RenderCache | None,
+) -> Iterator[tuple[PageResult | None, Exception | None]]:
+    if jobs == 1 or len(pages) < 2:
+        for content_path, output_path in pages:
+            try:
+                result = _build_page(content_path, output_path, settings, render_cache)
+            except Exception as error:
+                yield None, error
+            else:
+                yield result, None
+        return
+
+    # Every worker keeps its own render cache, seeded from the parent's. The
+    # workers report their lookups and newly rendered blocks back so that the
+    # parent cache ends up with the statistics and entries of the whole build.
+    if render_cache is None:
+        cache_settings = None
+    else:
+        cache_settings = (render_cache.max_entries, render_cache.entries())
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(settings, cache_settings),
+    ) as executor:
+        futures = [
+            executor.submit(_build_page_in_worker, content_path, output_path)
+            for content_path, output_path in pages
+        ]
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                yield None, error
+                continue
+
+            result = future.result()
+            if render_cache is not None:
+                render_cache.hits += result.cache_hits
+                render_cache.misses += result.cache_misses
+                for key, block in result.new_cache_entries:
+                    render_cache.put(key, block)
+            yield result, None
+
+
+_worker_settings: RenderSettings | None = None
+_worker_render_cache: RenderCache | None = None
+
+
+def _init_worker(
+    settings: RenderSettings,
+    cache_settings: tuple[int, list[tuple[CacheKey, CachedBlock]]] | None,
+):
+    global _worker_settings, _worker_render_cache
+    _worker_settings = settings
+    if cache_settings is not None:
+        max_entries, entries = cache_settings
+        _worker_render_cache = RenderCache(max_entries)
+        for key, block in entries:
+            _worker_render_cache.put(key, block)
+        _worker_render_cache.drain_new_entries()
+
+
+def _build_page_in_worker(content_path, output_path) -> PageResult:
+    return _build_page(
+        content_path, output_path, _worker_settings, _worker_render_cache
+    )
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import hashlib
+import json
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from os import makedirs, remove
+from os.path import dirname, isfile
+
+from compress import remove_compressed
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    source_hash: str
+    output_path: str
+    template_hash: str | None = None
+    # What a page takes from the static files it refers to; see
+    # main.page_dependencies_hash.
+    dependencies_hash: str | None = None
+
+
+class Manifest:
+    def __init__(self, entries: dict[str, ManifestEntry] | None = None):
+        self.entries = entries if entries is not None else {}
+        self._seen: set[str] = set()
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        try:
+            with open(path) as file:
+                raw_entries = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+        entries = {
+            source: ManifestEntry(**entry) for source, entry in raw_entries.items()
+        }
+        return cls(entries)
+
+    def save(self, path: str):
+        makedirs(dirname(path), exist_ok=True)
+        raw_entries = {source: asdict(entry) for source, entry in self.entries.items()}
+        with open(path, mode="w") as file:
+            json.dump(raw_entries, file, indent=2, sort_keys=True)
+
+    def is_fresh(self, source: str, entry: ManifestEntry) -> bool:
+        return self.entries.get(source) == entry and isfile(entry.output_path)
+
+    def record(self, source: str, entry: ManifestEntry):
+        self.entries[source] = entry
+        self._seen.add(source)
+
+    def is_current(self, source: str) -> bool:
+        # Recorded or kept by this build, not left over from an earlier one.
+        return source in self._seen and source in self.entries
+
+    def keep(self, source: str):
+        if source in self.entries:
+            self._seen.add(source)
+
+    def remove(self, source: str) -> list[str]:
+        # A removed directory takes every source below it along.
+        prefix = source.rstrip("/") + "/"
+        sources = [
+            path for path in self.entries if path == source or path.startswith(prefix)
+        ]
+        return self.remove_entries(sources)
+
+    def remove_stale(self) -> list[str]:
+        stale_sources = [source for source in self.entries if source not in self._seen]
+        return self.remove_entries(stale_sources)
+
+    def remove_entries(self, sources: list[str]) -> list[str]:
+        removed_entries = [self.entries.pop(source) for source in sources]
+        # An output that another source now produces (a generated index page
+        # replaced by a real one) is left in place.
+        owned_outputs = {entry.output_path for entry in self.entries.values()}
+        removed_outputs = []
+        for entry in removed_entries:
+            output_path = entry.output_path
+            if output_path in owned_outputs:
+                continue
+            remove_compressed(output_path)
+            with suppress(FileNotFoundError):
+                remove(output_path)
+                removed_outputs.append(output_path)
+        return removed_outputs
+
+
+def file_hash(path: str) -> str:
+    with open(path, mode="rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
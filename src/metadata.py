@@ -0,0 +1,102 @@
+import json
+from collections.abc import Iterable
+from os import makedirs, replace
+from os.path import dirname
+
+from frontmatter import FrontMatterValue
+
+PageMetadata = dict[str, FrontMatterValue]
+
+
+class MetadataIndex:
+    def __init__(self, pages: dict[str, PageMetadata] | None = None):
+        # Source path -> front matter plus the title, output path and section.
+        # Change pages through record and retain, which keep the tag and
+        # section lookup tables in step.
+        self.pages = pages if pages is not None else {}
+        # Counts the changes to pages, so callers can tell whether listings
+        # built from them are still current.
+        self.version = 0
+        self._tags: dict[str, set[str]] = {}
+        self._sections: dict[str, set[str]] = {}
+        for source, metadata in self.pages.items():
+            self._add_lookups(source, metadata)
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataIndex":
+        try:
+            with open(path) as file:
+                return cls(json.load(file))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+
+    def save(self, path: str):
+        makedirs(dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as file:
+            json.dump(self.pages, file, indent=2, sort_keys=True)
+        replace(tmp_path, path)
+
+    def record(
+        self, source: str, output_path: str, section: str, metadata: PageMetadata
+    ):
+        page = {**metadata, "output_path": output_path, "section": section}
+        if self.pages.get(source) == page:
+            return
+        if source in self.pages:
+            self._remove_lookups(source, self.pages[source])
+        self.pages[source] = page
+        self._add_lookups(source, page)
+        self.version += 1
+
+    def retain(self, sources: Iterable[str]):
+        sources = set(sources)
+        for source in list(self.pages):
+            if source not in sources:
+                self._remove_lookups(source, self.pages.pop(source))
+                self.version += 1
+
+    def tags(self) -> dict[str, list[str]]:
+        return {tag: sorted(sources) for tag, sources in self._tags.items()}
+
+    def with_tag(self, tag: str) -> list[str]:
+        return sorted(self._tags.get(tag, ()))
+
+    def sections(self) -> dict[str, list[str]]:
+        return {section: sorted(sources) for section, sources in self._sections.items()}
+
+    def in_section(self, section: str) -> list[str]:
+        return sorted(self._sections.get(section, ()))
+
+    def by_date(self, newest_first: bool = True) -> list[str]:
+        # Dates are ISO 8601 strings, which sort chronologically as text.
+        dated = [
+            (str(metadata["date"]), source)
+            for source, metadata in self.pages.items()
+            if "date" in metadata
+        ]
+        dated.sort(reverse=newest_first)
+        return [source for _, source in dated]
+
+    def _add_lookups(self, source: str, metadata: PageMetadata):
+        for tag in _as_list(metadata.get("tags")):
+            self._tags.setdefault(tag, set()).add(source)
+        self._sections.setdefault(metadata["section"], set()).add(source)
+
+    def _remove_lookups(self, source: str, metadata: PageMetadata):
+        lookups = [(self._sections, metadata["section"])]
+        lookups += [(self._tags, tag) for tag in _as_list(metadata.get("tags"))]
+        for table, key in lookups:
+            sources = table.get(key)
+            if sources is not None:
+                sources.discard(source)
+                if not sources:
+                    del table[key]
+
+
+def _as_list(value: FrontMatterValue | None) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [str(value)]
@@ -0,0 +1,110 @@
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+# Elements whose whitespace is significant or that aren't HTML text; their
+# contents are written as is. Code blocks from _to_code are <pre><code>.
+_PRESERVED_PATTERN = re.compile(
+    r"<(pre|code|textarea|script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# Whitespace next to these tags never renders, unlike around inline ones
+# such as <a> or <b>.
+_BLOCK_TAG_PATTERN = re.compile(
+    r" ?(</?(?:!doctype|html|head|body|title|meta|link|base|div|p|ul|ol|li"
+    r"|h[1-6]|blockquote|main|header|footer|nav|section|article|aside|hr|br"
+    r"|table|thead|tbody|tfoot|tr|td|th)\b[^>]*>) ?",
+    re.IGNORECASE,
+)
+_CSS_TOKEN_PATTERN = re.compile(
+    r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/", re.DOTALL
+)
+_CSS_PUNCTUATION_PATTERN = re.compile(r" ?([{};,>]) ?")
+# Only the space after a colon: before one it starts a pseudo-class selector
+# (a :hover is not a:hover).
+_CSS_COLON_PATTERN = re.compile(r": ")
+
+
+@dataclass
+class MinifyStats:
+    bytes_saved: int = 0
+
+
+def minify_html(html: str) -> str:
+    # Collapses runs of whitespace to one space and drops the space around
+    # block-level tags. Only whitespace is removed, so every character saved
+    # is also a byte saved.
+    parts = []
+    position = 0
+    for match in _PRESERVED_PATTERN.finditer(html):
+        text = _collapse_html(html[position : match.start()])
+        if match.group(1).lower() == "pre":
+            text = text.rstrip(" ")
+        parts.append(text)
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_collapse_html(html[position:]))
+    return "".join(parts)
+
+
+def minify_css(css: str) -> str:
+    # Drops comments and insignificant whitespace; strings are kept as is.
+    parts = []
+    code = []
+    position = 0
+    for match in _CSS_TOKEN_PATTERN.finditer(css):
+        code.append(css[position : match.start()])
+        position = match.end()
+        if match.group(1) is None:
+            # A comment still separates the tokens around it.
+            code.append(" ")
+            continue
+        parts.append(_collapse_css("".join(code)))
+        parts.append(match.group(1))
+        code = []
+    code.append(css[position:])
+    parts.append(_collapse_css("".join(code)))
+    return "".join(parts).strip()
+
+
+def format_savings(path: str, before: int, after: int) -> str:
+    saved = before - after
+    percent = saved / before * 100 if before else 0.0
+    return f"Minified {path}: {before} -> {after} bytes ({percent:.1f}% saved)"
+
+
+_active_stats: MinifyStats | None = None
+
+
+def minify_output(html: str) -> str:
+    # Rendered page content, minified while a page is written with a
+    # minified template.
+    if _active_stats is None:
+        return html
+    minified = minify_html(html)
+    _active_stats.bytes_saved += len(html) - len(minified)
+    return minified
+
+
+@contextmanager
+def minifying(stats: MinifyStats | None) -> Iterator[None]:
+    global _active_stats
+    previous = _active_stats
+    _active_stats = stats
+    try:
+        yield
+    finally:
+        _active_stats = previous
+
+
+def _collapse_html(text: str) -> str:
+    text = _WHITESPACE_PATTERN.sub(" ", text)
+    return _BLOCK_TAG_PATTERN.sub(r"\1", text)
+
+
+def _collapse_css(code: str) -> str:
+    code = _WHITESPACE_PATTERN.sub(" ", code)
+    code = _CSS_PUNCTUATION_PATTERN.sub(r"\1", code)
+    code = _CSS_COLON_PATTERN.sub(":", code)
+    return code.replace(";}", "}")
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import shutil
+import time
+from collections.abc import Callable
+from contextlib import suppress
+from dataclasses import asdict, dataclass, field
+from os import makedirs, remove, replace, stat, utime, walk
+from os.path import dirname, join
+from tempfile import NamedTemporaryFile
+
+from compress import remove_compressed
+from links import Link
+from metadata import PageMetadata
+
+# Part of every key. Bump it whenever the same markdown and template render
+# to different HTML, so that shared caches never serve pages from an older
+# generator.
+GENERATOR_VERSION = "2"
+
+# Temporary files this old belong to a writer that died; live ones are
+# renamed within moments.
+_ABANDONED_TMP_SECONDS = 24 * 60 * 60
+
+
+@dataclass
+class CachedPage:
+    # What a build needs besides the HTML, stored ahead of it in the entry.
+    links: list[Link] = field(default_factory=list)
+    metadata: PageMetadata = field(default_factory=dict)
+    # What the page took from the static files it refers to when rendered.
+    dependencies_hash: str = ""
+
+
+class PageCache:
+    # Rendered pages addressed by the hash of everything they are rendered
+    # from. Each entry is one file, a line of JSON holding the CachedPage
+    # followed by the HTML, only ever added or removed whole with an atomic
+    # rename, so several builds (CI nodes sharing a directory) can use one
+    # cache at the same time.
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.size = 0
+
+    @staticmethod
+    def key(source_hash: str, template_hash: str) -> str:
+        # template_hash covers the template, its includes and every build
+        # option that changes the output.
+        material = f"{GENERATOR_VERSION}\0{source_hash}\0{template_hash}"
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def restore(
+        self,
+        key: str,
+        output_path: str,
+        is_current: Callable[[CachedPage], bool] | None = None,
+    ) -> CachedPage | None:
+        # The key leaves out the static files a page refers to, which only
+        # the entry knows; is_current checks them before the page is used.
+        # The HTML comes from the same open file as what was checked, even
+        # if another build replaces the entry meanwhile.
+        entry_path = self._path(key)
+        try:
+            with open(entry_path, mode="rb") as file:
+                raw_page = json.loads(file.readline())
+                links = [(kind, url) for kind, url in raw_page["links"]]
+                page = CachedPage(
+                    links, raw_page["metadata"], raw_page["dependencies_hash"]
+                )
+                if is_current is not None and not is_current(page):
+                    self.misses += 1
+                    return None
+                makedirs(dirname(output_path), exist_ok=True)
+                tmp_path = f"{output_path}.tmp"
+                with open(tmp_path, mode="wb") as output:
+                    shutil.copyfileobj(file, output)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, evicted meanwhile or unreadable: render the page.
+            self.misses += 1
+            return None
+        replace(tmp_path, output_path)
+        remove_compressed(output_path)
+        # Eviction removes the least recently used entries first.
+        with suppress(OSError):
+            utime(entry_path)
+        self.hits += 1
+        return page
+
+    def store(self, key: str, output_path: str, page: CachedPage):
+        entry_path = self._path(key)
+        makedirs(dirname(entry_path), exist_ok=True)
+        with NamedTemporaryFile(
+            mode="wb", dir=dirname(entry_path), suffix=".tmp", delete=False
+        ) as file:
+            # json.dumps escapes newlines, so the page is the first line.
+            file.write(json.dumps(asdict(page)).encode() + b"\n")
+            with open(output_path, mode="rb") as output:
+                shutil.copyfileobj(output, file)
+        replace(file.name, entry_path)
+        self.stored += 1
+
+    def evict(self):
+        # Removes the least recently used entries until the cache fits in
+        # max_bytes. Hits refresh the entry's mtime, so it is the time of its
+        # last use. Files of any other kind, such as entries from an older
+        # layout, count as entries too and age out.
+        entries = []
+        now = time.time()
+        for dir_path, _, file_names in walk(self.directory):
+            for file_name in file_names:
+                path = join(dir_path, file_name)
+                with suppress(FileNotFoundError):
+                    file_stat = stat(path)
+                    if file_name.endswith(".tmp"):
+                        if now - file_stat.st_mtime > _ABANDONED_TMP_SECONDS:
+                            remove(path)
+                    else:
+                        entries.append((file_stat.st_mtime, path, file_stat.st_size))
+
+        self.size = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if self.size <= self.max_bytes:
+                break
+            with suppress(FileNotFoundError):
+                remove(path)
+            self.size -= size
+            self.evicted += 1
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        return (
+            f"{self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+            f"{self.stored} stored, {self.evicted} evicted, "
+            f"{self.size}/{self.max_bytes} bytes"
+        )
+
+    def _path(self, key: str) -> str:
+        # Spread over subdirectories so none gets too large.
+        return join(self.directory, key[:2], f"{key}.page")
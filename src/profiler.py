@@ -0,0 +1,129 @@
+import json
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from os import makedirs
+from os.path import dirname
+
+# Phase totals are stored as [seconds, live block delta, calls]. The delta is
+# the change in sys.getallocatedblocks(): blocks allocated minus blocks freed,
+# negative for a phase that frees more than it allocates. CPython keeps no
+# count of allocations alone. Seconds and deltas are exclusive: whatever
+# happens inside a nested phase is only counted for the nested phase.
+PhaseTotals = list
+
+
+class Profiler:
+    def __init__(self):
+        self.phases: dict[str, PhaseTotals] = {}
+        self._stack: list[list] = []
+
+    def phase(self, name: str) -> "_Phase":
+        return _Phase(self, name)
+
+    def merge(self, phases: dict[str, PhaseTotals]):
+        for name, (seconds, block_delta, calls) in phases.items():
+            totals = self.phases.setdefault(name, [0.0, 0, 0])
+            totals[0] += seconds
+            totals[1] += block_delta
+            totals[2] += calls
+
+    def _enter(self):
+        self._stack.append([time.perf_counter(), sys.getallocatedblocks(), 0.0, 0])
+
+    def _exit(self, name: str):
+        start, start_blocks, child_seconds, child_block_delta = self._stack.pop()
+        seconds = time.perf_counter() - start
+        block_delta = sys.getallocatedblocks() - start_blocks
+        totals = self.phases.setdefault(name, [0.0, 0, 0])
+        totals[0] += seconds - child_seconds
+        totals[1] += block_delta - child_block_delta
+        totals[2] += 1
+        if self._stack:
+            self._stack[-1][2] += seconds
+            self._stack[-1][3] += block_delta
+
+
+class _Phase:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter()
+
+    def __exit__(self, *exc_info):
+        self.profiler._exit(self.name)
+
+
+class _NullPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+_active_profiler: Profiler | None = None
+
+
+def phase(name: str) -> _Phase | _NullPhase:
+    if _active_profiler is None:
+        return _NULL_PHASE
+    return _active_profiler.phase(name)
+
+
+@contextmanager
+def profiling(profiler: Profiler | None) -> Iterator[Profiler | None]:
+    global _active_profiler
+    previous_profiler = _active_profiler
+    _active_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _active_profiler = previous_profiler
+
+
+class BuildProfile:
+    def __init__(self):
+        self.totals = Profiler()
+        self.pages: list[dict] = []
+
+    def add_page(self, path: str, seconds: float, phases: dict[str, PhaseTotals]):
+        self.pages.append({"page": path, "seconds": seconds, "phases": phases})
+        self.totals.merge(phases)
+
+    def slowest_pages(self, top_n: int) -> list[dict]:
+        pages = sorted(self.pages, key=lambda page: page["seconds"], reverse=True)
+        return pages[:top_n]
+
+    def write_report(self, path: str, top_n: int = 10):
+        report = {
+            "phases": {
+                name: {
+                    "seconds": seconds,
+                    "live_block_delta": block_delta,
+                    "calls": calls,
+                }
+                for name, (seconds, block_delta, calls) in self.totals.phases.items()
+            },
+            "pages": self.pages,
+            "slowest_pages": self.slowest_pages(top_n),
+        }
+        makedirs(dirname(path) or ".", exist_ok=True)
+        with open(path, mode="w") as file:
+            json.dump(report, file, indent=2)
+
+    def print_summary(self, top_n: int = 10):
+        print("Phase                 seconds  live block delta      calls")
+        for name, (seconds, block_delta, calls) in sorted(
+            self.totals.phases.items(), key=lambda item: item[1][0], reverse=True
+        ):
+            print(f"{name:<18} {seconds:>10.4f} {block_delta:>17} {calls:>10}")
+        print(f"Slowest {top_n} pages:")
+        for page in self.slowest_pages(top_n):
+            print(f"{page['seconds']:>10.4f}s {page['page']}")
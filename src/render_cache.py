@@ -0,0 +1,94 @@
+import hashlib
+import json
+from collections import OrderedDict
+from os import makedirs, replace
+from os.path import dirname
+
+CacheKey = tuple[str, str]
+# Rendered HTML and the links found in the block.
+CachedBlock = tuple[str, list[tuple[str, str]]]
+
+# Bumped whenever rendering changes, so files from older builds are ignored.
+FORMAT_VERSION = 2
+
+
+class RenderCache:
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, CachedBlock] = OrderedDict()
+        self._new_keys: list[CacheKey] = []
+
+    @staticmethod
+    def key(block: str, block_type: str, context: str = "") -> CacheKey:
+        # The context covers anything else the rendering depends on, such as
+        # the fingerprinted asset URLs.
+        digest = hashlib.blake2b(block.encode(), digest_size=16)
+        digest.update(context.encode())
+        return digest.hexdigest(), block_type
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> CachedBlock | None:
+        block = self._entries.get(key)
+        if block is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return block
+
+    def put(self, key: CacheKey, block: CachedBlock):
+        if self.max_entries <= 0:
+            return
+        if key not in self._entries:
+            self._new_keys.append(key)
+        self._entries[key] = block
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def drain_new_entries(self) -> list[tuple[CacheKey, CachedBlock]]:
+        new_entries = [
+            (key, self._entries[key]) for key in self._new_keys if key in self._entries
+        ]
+        self._new_keys = []
+        return new_entries
+
+    def entries(self) -> list[tuple[CacheKey, CachedBlock]]:
+        return list(self._entries.items())
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        return (
+            f"{self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+            f"{len(self)}/{self.max_entries} entries"
+        )
+
+    def load(self, path: str):
+        try:
+            with open(path) as file:
+                raw_cache = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if not isinstance(raw_cache, dict):
+            return
+        if raw_cache.get("version") != FORMAT_VERSION:
+            return
+        for digest, block_type, block in raw_cache["entries"]:
+            self.put((digest, block_type), block)
+        self._new_keys = []
+
+    def save(self, path: str):
+        makedirs(dirname(path) or ".", exist_ok=True)
+        raw_entries = [
+            [digest, block_type, block]
+            for (digest, block_type), block in self.entries()
+        ]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as file:
+            json.dump({"version": FORMAT_VERSION, "entries": raw_entries}, file)
+        replace(tmp_path, path)
@@ -0,0 +1,112 @@
+import hashlib
+import re
+from collections.abc import Callable, Mapping
+from contextlib import suppress
+from os.path import dirname, join, normpath
+from typing import TextIO
+
+from assets import rewrite_asset_urls
+from minify import minify_html
+
+_PLACEHOLDER_PATTERN = re.compile(r"{{ *(\w+) *}}")
+_INCLUDE_PATTERN = re.compile(r"{{> *([^ }]+) *}}")
+
+
+class Template:
+    def __init__(self, source: str, dependencies: list[str] | None = None):
+        # Includes are already expanded, so the digest covers them too.
+        self.digest = hashlib.sha256(source.encode()).hexdigest()
+        # The files the source was read from: the template and its includes.
+        self.dependencies = dependencies if dependencies is not None else []
+        # Set by load_template; page content written into a minified
+        # template is minified as well.
+        self.minified = False
+        self.bytes_saved = 0
+        self.segments: list[str] = []
+        self.slots: list[tuple[int, str]] = []
+
+        position = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(source):
+            self.segments.append(source[position : match.start()])
+            self.slots.append((len(self.segments), match.group(1)))
+            self.segments.append(match.group(0))
+            position = match.end()
+        self.segments.append(source[position:])
+
+    @property
+    def variables(self) -> set[str]:
+        return {name for _, name in self.slots}
+
+    def render(self, variables: Mapping[str, str]) -> str:
+        parts = self.segments.copy()
+        for index, name in self.slots:
+            if name in variables:
+                parts[index] = variables[name]
+        return "".join(parts)
+
+    def write(
+        self, file: TextIO, variables: Mapping[str, str | Callable[[TextIO], None]]
+    ):
+        # Callable values write their own content straight into the file,
+        # which lets large values be streamed instead of built as strings.
+        position = 0
+        for index, name in self.slots:
+            file.write("".join(self.segments[position:index]))
+            value = variables.get(name, self.segments[index])
+            if callable(value):
+                value(file)
+            else:
+                file.write(value)
+            position = index + 1
+        file.write("".join(self.segments[position:]))
+
+
+def load_template(
+    path: str, asset_urls: Mapping[str, str] | None = None, minify: bool = False
+) -> Template:
+    # asset_urls maps static file URLs to their fingerprinted URLs. The
+    # digest covers the rewritten source, so only the fingerprints of files
+    # the template refers to change it.
+    dependencies = []
+    source = _expand_includes(path, dependencies, ())
+    if asset_urls:
+        source = rewrite_asset_urls(source, asset_urls)
+    bytes_saved = 0
+    if minify:
+        # Once per build instead of once per page.
+        minified_source = minify_html(source)
+        bytes_saved = len(source) - len(minified_source)
+        source = minified_source
+    template = Template(source, dependencies)
+    template.minified = minify
+    template.bytes_saved = bytes_saved
+    return template
+
+
+def template_dependencies(path: str) -> list[str]:
+    # The files load_template reads. An include that is missing, or that
+    # load_template would reject, is still listed, so that a watcher sees it
+    # being created or fixed.
+    dependencies: list[str] = []
+    with suppress(OSError, ValueError):
+        _expand_includes(path, dependencies, ())
+    return dependencies
+
+
+def _expand_includes(
+    path: str, dependencies: list[str], parents: tuple[str, ...]
+) -> str:
+    # {{> header.html }} is replaced by that file, relative to the file that
+    # includes it; included files may include others.
+    if path in parents:
+        raise ValueError(f"Template includes itself: {' -> '.join((*parents, path))}")
+    if path not in dependencies:
+        dependencies.append(path)
+    with open(path) as file:
+        source = file.read()
+
+    def include(match: re.Match) -> str:
+        included_path = normpath(join(dirname(path), match.group(1)))
+        return _expand_includes(included_path, dependencies, (*parents, path))
+
+    return _INCLUDE_PATTERN.sub(include, source)
@@ -0,0 +1,182 @@
+import io
+from os import listdir, makedirs, remove, stat, utime
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from assets import (
+    asset_url,
+    asset_url_map,
+    fingerprinted_path,
+    prune_outputs,
+    rewrite_asset_urls,
+    rewriting_asset_urls,
+    sync_assets,
+)
+from manifest import Manifest, file_hash
+from render_cache import RenderCache
+from utils import write_markdown_html
+
+
+class SyncAssetsTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.static = join(tmp_dir.name, "static")
+        self.public = join(tmp_dir.name, "public")
+        makedirs(join(self.static, "images"))
+        self._write(join(self.static, "index.css"), "body {}")
+        self._write(join(self.static, "images", "a.png"), "png")
+
+    def _write(self, path: str, text: str):
+        with open(path, mode="w") as file:
+            file.write(text)
+
+    def _read(self, path: str) -> str:
+        with open(path) as file:
+            return file.read()
+
+    def test_SyncAssets_EmptyPublic_CopyEveryFile(self):
+        stats = sync_assets(self.static, self.public, Manifest())
+
+        self.assertEqual((stats.copied, stats.unchanged), (2, 0))
+        self.assertEqual(self._read(join(self.public, "images", "a.png")), "png")
+
+    def test_SyncAssets_SecondRun_SkipUnchangedFiles(self):
+        manifest = Manifest()
+        sync_assets(self.static, self.public, manifest)
+        css_path = join(self.static, "index.css")
+        self._write(css_path, "body { margin: 0 }")
+
+        stats = sync_assets(self.static, self.public, manifest)
+
+        self.assertEqual((stats.copied, stats.unchanged), (1, 1))
+        self.assertEqual(
+            self._read(join(self.public, "index.css")), "body { margin: 0 }"
+        )
+
+    def test_SyncAssets_SameSizeAndMtime_VerifyHashCopiesChangedContent(self):
+        manifest = Manifest()
+        sync_assets(self.static, self.public, manifest)
+        css_path = join(self.static, "index.css")
+        source_stat = stat(css_path)
+        self._write(css_path, "body []")
+        utime(css_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+        stats = sync_assets(self.static, self.public, manifest)
+        self.assertEqual(stats.copied, 0)
+
+        stats = sync_assets(self.static, self.public, manifest, verify_hash=True)
+        self.assertEqual(stats.copied, 1)
+        self.assertEqual(self._read(join(self.public, "index.css")), "body []")
+
+    def test_SyncAssets_Hardlink_ShareSourceInode(self):
+        sync_assets(self.static, self.public, Manifest(), hardlink=True)
+
+        source_stat = stat(join(self.static, "index.css"))
+        output_stat = stat(join(self.public, "index.css"))
+        self.assertEqual(
+            (output_stat.st_dev, output_stat.st_ino),
+            (source_stat.st_dev, source_stat.st_ino),
+        )
+
+    def test_SyncAssets_SourceDeleted_RemoveStaleOutput(self):
+        manifest = Manifest()
+        sync_assets(self.static, self.public, manifest)
+        source = join(self.static, "images", "a.png")
+        orphan_output = join(self.public, "images", "a.png")
+
+        remove(source)
+        stats = sync_assets(self.static, self.public, manifest)
+
+        self.assertEqual(stats.removed, 1)
+        self.assertFalse(exists(orphan_output))
+        self.assertNotIn(source, manifest.entries)
+
+    def test_PruneOutputs_FileNotKept_RemoveFileAndEmptyDirectory(self):
+        sync_assets(self.static, self.public, Manifest())
+        kept = join(self.public, "index.css")
+
+        removed = prune_outputs(self.public, {kept})
+
+        self.assertEqual(removed, [join(self.public, "images", "a.png")])
+        self.assertTrue(exists(kept))
+        self.assertFalse(exists(join(self.public, "images")))
+
+    def test_SyncAssets_Fingerprint_WriteHashedNamesAndMapUrls(self):
+        manifest = Manifest()
+        sync_assets(self.static, self.public, manifest, fingerprint=True)
+
+        css_path = fingerprinted_path(
+            join(self.public, "index.css"), file_hash(join(self.static, "index.css"))
+        )
+        self.assertEqual(self._read(css_path), "body {}")
+        self.assertFalse(exists(join(self.public, "index.css")))
+        self.assertEqual(
+            asset_url_map(manifest, self.static, self.public)["/index.css"],
+            "/" + css_path.removeprefix(self.public + "/"),
+        )
+
+    def test_SyncAssets_FingerprintedFileChanged_RemovePreviousOutput(self):
+        manifest = Manifest()
+        sync_assets(self.static, self.public, manifest, fingerprint=True)
+        self._write(join(self.static, "index.css"), "body { margin: 0 }")
+
+        stats = sync_assets(self.static, self.public, manifest, fingerprint=True)
+
+        self.assertEqual((stats.copied, stats.removed), (1, 1))
+        css_files = [name for name in listdir(self.public) if name.endswith(".css")]
+        self.assertEqual(len(css_files), 1)
+        css_path = join(self.public, css_files[0])
+        self.assertEqual(self._read(css_path), "body { margin: 0 }")
+
+    def test_SyncAssets_MinifyHardlinkedOutput_LeaveSourceIntact(self):
+        manifest = Manifest()
+        sync_assets(self.static, self.public, manifest, hardlink=True)
+
+        stats = sync_assets(self.static, self.public, manifest, minify=True)
+
+        css_path = join(self.public, "index.css")
+        self.assertEqual(self._read(css_path), "body{}")
+        self.assertEqual(self._read(join(self.static, "index.css")), "body {}")
+        self.assertEqual(stats.minified, [(css_path, 7, 6)])
+        stats = sync_assets(self.static, self.public, manifest, minify=True)
+        self.assertEqual((stats.copied, stats.minified), (0, []))
+
+
+class AssetUrlTests(TestCase):
+    asset_urls = {"/index.css": "/index.0123456789.css"}
+
+    def test_RewriteAssetUrls_Attributes_RewriteKnownUrlsOnly(self):
+        html = (
+            '<link href="/index.css?v=1" rel="stylesheet">'
+            "<a href='/index.css#top'>x</a><img src=\"/other.png\">"
+        )
+        self.assertEqual(
+            rewrite_asset_urls(html, self.asset_urls),
+            '<link href="/index.0123456789.css?v=1" rel="stylesheet">'
+            "<a href='/index.0123456789.css#top'>x</a><img src=\"/other.png\">",
+        )
+
+    def test_WriteMarkdownHtml_OtherFileFingerprinted_ReuseCachedBlocks(self):
+        cache = RenderCache()
+        markdown = "[style](/index.css)\n\nplain text\n"
+        asset_url_maps = [
+            self.asset_urls,
+            {**self.asset_urls, "/other.png": "/other.abcdef0123.png"},
+            {"/index.css": "/index.abcdef0123.css"},
+        ]
+        pages = []
+        for asset_urls in asset_url_maps:
+            file = io.StringIO()
+            with rewriting_asset_urls(asset_urls):
+                write_markdown_html(io.StringIO(markdown), file, cache)
+            pages.append(file.getvalue())
+
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+        self.assertIn('href="/index.abcdef0123.css"', pages[2])
+
+    def test_AssetUrl_OutsideRewritingContext_ReturnUrlUnchanged(self):
+        with rewriting_asset_urls(self.asset_urls):
+            self.assertEqual(asset_url("/index.css"), "/index.0123456789.css")
+        self.assertEqual(asset_url("/index.css"), "/index.css")
@@ -0,0 +1,93 @@
+import gzip
+from os import remove, utime
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from compress import CompressedIndex, compress_outputs, compress_public
+
+
+class CompressPublicTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.public = tmp_dir.name
+        self.index = CompressedIndex()
+        self.page = join(self.public, "index.html")
+        self._write(self.page, "<p>hello</p>" * 200)
+        self._write(join(self.public, "small.css"), "p{}")
+        self._write(join(self.public, "archive.tar.gz"), "binary")
+
+    def _write(self, path: str, text: str):
+        with open(path, mode="w") as file:
+            file.write(text)
+
+    def _compress(self, compress: bool = True) -> list[str]:
+        return compress_public(self.public, self.index, 100, compress=compress)
+
+    def _read_gzip(self, path: str) -> str:
+        with gzip.open(path, mode="rt") as file:
+            return file.read()
+
+    def test_CompressPublic_LargeHtml_WriteGzipSibling(self):
+        compressed = self._compress()
+
+        self.assertIn(self.page + ".gz", compressed)
+        self.assertEqual(self._read_gzip(self.page + ".gz"), "<p>hello</p>" * 200)
+        self.assertFalse(exists(join(self.public, "small.css.gz")))
+
+    def test_CompressPublic_UpToDate_SkipFile(self):
+        self._compress()
+        self.assertEqual(self._compress(), [])
+
+    def test_CompressPublic_ReplacedWithOlderMtime_Recompress(self):
+        self._compress()
+        self._write(self.page, "<p>older</p>" * 200)
+        utime(self.page, (1, 1))
+
+        self.assertIn(self.page + ".gz", self._compress())
+        self.assertEqual(self._read_gzip(self.page + ".gz"), "<p>older</p>" * 200)
+
+        utime(self.page, (2, 2))
+        self.assertEqual(self._compress(), [])
+
+    def test_CompressPublic_SourceRemovedOrShrunk_RemoveSibling(self):
+        self._compress()
+        remove(self.page)
+        self.assertEqual(self._compress(), [])
+        self.assertFalse(exists(self.page + ".gz"))
+
+        self._write(self.page, "<p>hello</p>" * 200)
+        self._compress()
+        self._write(self.page, "<p></p>")
+        self._compress()
+        self.assertFalse(exists(self.page + ".gz"))
+
+    def test_CompressPublic_WithoutCompress_RemoveOnlyOutdatedSiblings(self):
+        self._write(join(self.public, "about.html"), "<p>about</p>" * 200)
+        self._compress()
+        self._write(self.page, "<p>edited</p>" * 200)
+
+        self.assertEqual(self._compress(compress=False), [])
+
+        self.assertFalse(exists(self.page + ".gz"))
+        about_gzip = join(self.public, "about.html.gz")
+        self.assertTrue(exists(about_gzip))
+        self.assertIn(about_gzip, self.index.sources)
+        self.assertNotIn(self.page + ".gz", self.index.sources)
+
+    def test_CompressPublic_CompressedStaticFile_KeepIt(self):
+        self._compress()
+        self.assertTrue(exists(join(self.public, "archive.tar.gz")))
+
+    def test_CompressOutputs_OnlyGivenPaths_CompressOrRemove(self):
+        about = join(self.public, "about.html")
+        self._write(about, "<p>about</p>" * 200)
+
+        self.assertIn(self.page + ".gz", compress_outputs([self.page], self.index, 100))
+        self.assertFalse(exists(about + ".gz"))
+
+        remove(self.page)
+        self.assertEqual(compress_outputs([self.page], self.index, 100), [])
+        self.assertFalse(exists(self.page + ".gz"))
+        self.assertEqual(self.index.sources, {})
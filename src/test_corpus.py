@@ -0,0 +1,29 @@
+import random
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from corpus import CorpusSettings, generate_corpus, generate_markdown
+from utils import extract_title, markdown_to_html_node
+
+
+class CorpusTests(TestCase):
+    def test_GenerateMarkdown_SameSeed_ReturnSameMarkdown(self):
+        settings = CorpusSettings(seed=3)
+        self.assertEqual(
+            generate_markdown(random.Random(3), settings),
+            generate_markdown(random.Random(3), settings),
+        )
+
+    def test_GenerateMarkdown_HighDensity_RenderWithoutErrors(self):
+        settings = CorpusSettings(blocks_per_page=200, inline_density=0.9)
+        markdown = generate_markdown(random.Random(0), settings)
+        extract_title(markdown)
+        markdown_to_html_node(markdown).to_html()
+
+    def test_GenerateCorpus_Settings_WritePagesInSections(self):
+        with TemporaryDirectory() as tmp_dir:
+            settings = CorpusSettings(pages=20, nesting_depth=0)
+            paths = generate_corpus(tmp_dir, settings)
+            self.assertEqual(len(paths), 20)
+            self.assertEqual(paths[0], join(tmp_dir, "page0.md"))
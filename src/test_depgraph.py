@@ -0,0 +1,43 @@
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from depgraph import DependencyGraph
+
+
+class DependencyGraphTests(TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.record("public/a.html", ["content/a.md", "template.html"])
+        self.graph.record(
+            "public/b.html", ["content/b.md", "template.html", "static/b.png"]
+        )
+
+    def test_Dirty_SharedInput_ReturnEveryDependent(self):
+        self.assertEqual(
+            self.graph.dirty(["template.html"]), {"public/a.html", "public/b.html"}
+        )
+
+    def test_Dirty_UnknownPath_ReturnEmpty(self):
+        self.assertEqual(self.graph.dirty(["content/c.md"]), set())
+
+    def test_Record_InputsChanged_DropOldEdges(self):
+        self.graph.record("public/b.html", ["content/b.md", "template.html"])
+        self.assertEqual(self.graph.dirty(["static/b.png"]), set())
+        self.assertEqual(self.graph.dirty(["content/b.md"]), {"public/b.html"})
+
+    def test_Remove_Output_DropFromReverseIndex(self):
+        self.graph.remove("public/a.html")
+        self.assertEqual(self.graph.dirty(["template.html"]), {"public/b.html"})
+        self.assertEqual(self.graph.outputs, ["public/b.html"])
+
+    def test_SaveAndLoad_RoundTrip_AnswerSameQueries(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "cache", "dependencies.json")
+            self.graph.save(path)
+            loaded = DependencyGraph.load(path)
+
+        self.assertEqual(
+            loaded.inputs("public/b.html"), self.graph.inputs("public/b.html")
+        )
+        self.assertEqual(loaded.dirty(["static/b.png"]), {"public/b.html"})
@@ -0,0 +1,50 @@
+import io
+from unittest import TestCase
+
+from frontmatter import parse_front_matter, read_front_matter
+
+
+class ParseFrontMatterTests(TestCase):
+    def test_ParseFrontMatter_ScalarsAndLists_ReturnTypedValues(self):
+        lines = [
+            'title: "Hello: world"',
+            "date: 2024-05-01",
+            "draft: false",
+            "weight: 3",
+            "tags: [tolkien, 'books']",
+            "# comment",
+            "authors:",
+            "  - Frodo",
+            "  - Sam",
+        ]
+        self.assertEqual(
+            parse_front_matter(lines),
+            {
+                "title": "Hello: world",
+                "date": "2024-05-01",
+                "draft": False,
+                "weight": 3,
+                "tags": ["tolkien", "books"],
+                "authors": ["Frodo", "Sam"],
+            },
+        )
+
+    def test_ParseFrontMatter_LineWithoutKey_RaiseValueError(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter(["just text"])
+
+
+class ReadFrontMatterTests(TestCase):
+    def test_ReadFrontMatter_FrontMatter_LeaveFileAtBody(self):
+        file = io.StringIO("---\ntitle: T\n---\n# Heading\n")
+        self.assertEqual(read_front_matter(file), {"title": "T"})
+        self.assertEqual(file.read(), "# Heading\n")
+
+    def test_ReadFrontMatter_NoFrontMatter_RewindFile(self):
+        file = io.StringIO("# Heading\n")
+        self.assertEqual(read_front_matter(file), {})
+        self.assertEqual(file.read(), "# Heading\n")
+
+    def test_ReadFrontMatter_NotClosed_RaiseValueError(self):
+        with self.assertRaises(ValueError):
+            read_front_matter(io.StringIO("---\ntitle: T\n# Heading\n"))
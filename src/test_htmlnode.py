@@ -1,6 +1,8 @@
+import io
+import sys
 from unittest import TestCase
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, Props, write_html
 
 
 class HtmlNodeTests(TestCase):
@@ -19,10 +21,48 @@ class HtmlNodeTests(TestCase):
         node = HTMLNode(props=props)
         self.assertEqual(node.props_to_html(), 'href="abc.com" class="xyd"')
 
+    def test_PropsToHtml_SpecialCharacters_EscapeValues(self):
+        node = HTMLNode(props={"href": '/a?b=1&c="2"', "alt": "<x>"})
+        self.assertEqual(
+            node.props_to_html(), 'href="/a?b=1&amp;c=&quot;2&quot;" alt="&lt;x&gt;"'
+        )
+
+    def test_PropsToHtml_PropsReassigned_ReturnNewAttributes(self):
+        node = LeafNode(tag="a", value="x", props={"href": "/old"})
+        self.assertEqual(node.to_html(), '<a href="/old">x</a>')
+        node.props = {"href": "/new"}
+        self.assertEqual(node.to_html(), '<a href="/new">x</a>')
+
+    def test_PropsToHtml_PropsMutatedInPlace_ReturnNewAttributes(self):
+        props = Props(href="/old")
+        node = LeafNode(tag="a", value="x", props=props)
+        self.assertEqual(node.to_html(), '<a href="/old">x</a>')
+        self.assertIs(node.props, props)
+
+        node.props["href"] = "/new"
+        self.assertEqual(node.to_html(), '<a href="/new">x</a>')
+        props.update(title="t")
+        self.assertEqual(node.to_html(), '<a href="/new" title="t">x</a>')
+        del props["title"]
+        self.assertEqual(node.to_html(), '<a href="/new">x</a>')
+
+    def test_PropsToHtml_PlainDictMutatedInPlace_ReturnNewAttributes(self):
+        props = {"href": "/old"}
+        node = LeafNode(tag="a", value="x", props=props)
+        self.assertEqual(node.to_html(), '<a href="/old">x</a>')
+        props["href"] = "/new"
+        self.assertEqual(node.to_html(), '<a href="/new">x</a>')
+
     def test_PropsToHtml_PropsNotProvided_ReturnEmpty(self):
         node = HTMLNode()
         self.assertEqual(node.props_to_html(), "")
 
+    def test_Slots_SubclassesHaveNoInstanceDict(self):
+        leaf = LeafNode(tag="b", value="a")
+        parent = ParentNode(tag="p", children=[leaf])
+        self.assertFalse(hasattr(leaf, "__dict__"))
+        self.assertFalse(hasattr(parent, "__dict__"))
+
 
 class LeafNodeTests(TestCase):
     def test_ToHtml_LeafNodesProvided_ReturnHTML(self):
@@ -92,3 +132,38 @@ class ParentNodeTests(TestCase):
         node = ParentNode(children=None)
         with self.assertRaises(ValueError):
             node.to_html()
+
+    def test_ToHtml_DeeperThanRecursionLimit_ReturnHTML(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode(value="x")
+        for _ in range(depth):
+            node = ParentNode(tag="b", children=[node])
+        self.assertEqual(node.to_html(), "<b>" * depth + "x" + "</b>" * depth)
+
+    def test_ToHtml_InvalidNestedChild_RaiseValueError(self):
+        node = ParentNode(tag="ul", children=[ParentNode(tag="li", children=None)])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+
+class WriteHtmlTests(TestCase):
+    def test_WriteHtml_NestedNodes_WriteSameAsToHtml(self):
+        node = ParentNode(
+            tag="ul",
+            children=[
+                ParentNode(
+                    tag="li",
+                    children=[LeafNode(tag="a", value="a", props={"href": "/a"})],
+                ),
+                ParentNode(tag="li", children=[]),
+                LeafNode(value="tail"),
+            ],
+            props={"class": "list"},
+        )
+        file = io.StringIO()
+        write_html(node, file)
+        self.assertEqual(file.getvalue(), node.to_html())
+        self.assertEqual(
+            file.getvalue(),
+            '<ul class="list"><li><a href="/a">a</a></li><li></li>tail</ul>',
+        )
@@ -0,0 +1,180 @@
+import io
+import struct
+import zlib
+from os import makedirs, remove
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from assets import sync_assets
+from images import (
+    ImageIndex,
+    ImageInfo,
+    ImageOptions,
+    image_size,
+    process_images,
+    using_images,
+    variant_path,
+)
+from manifest import Manifest
+from render_cache import RenderCache
+from textnode import TextNode, TextTypes
+from utils import text_node_to_html_node, write_markdown_html
+
+
+def _png(width: int, height: int) -> bytes:
+    # An RGB image whose rows use the Sub filter.
+    raw = b"".join(b"\x01" + bytes([10, 20, 30]) * width for _ in range(height))
+    chunks = [
+        (b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        (b"IDAT", zlib.compress(raw)),
+        (b"IEND", b""),
+    ]
+    return b"\x89PNG\r\n\x1a\n" + b"".join(
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+        for chunk_type, data in chunks
+    )
+
+
+class ImageSizeTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+
+    def _size(self, name: str, data: bytes) -> tuple[int, int] | None:
+        path = join(self.dir, name)
+        with open(path, mode="wb") as file:
+            file.write(data)
+        return image_size(path)
+
+    def test_ImageSize_Png_ReadHeader(self):
+        self.assertEqual(self._size("a.png", _png(7, 3)), (7, 3))
+
+    def test_ImageSize_Gif_ReadLogicalScreen(self):
+        data = b"GIF89a" + struct.pack("<HH", 640, 480) + b"\x00" * 10
+        self.assertEqual(self._size("a.gif", data), (640, 480))
+
+    def test_ImageSize_Jpeg_SkipSegmentsBeforeFrame(self):
+        app0 = b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF"
+        frame = b"\xff\xff\xc2" + struct.pack(">HBHH", 11, 8, 600, 800) + b"\x03"
+        self.assertEqual(self._size("a.jpg", b"\xff\xd8" + app0 + frame), (800, 600))
+
+    def test_ImageSize_UnknownFormat_ReturnNone(self):
+        self.assertIsNone(self._size("a.txt", b"not an image"))
+
+
+class ProcessImagesTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.static = join(tmp_dir.name, "static")
+        self.public = join(tmp_dir.name, "public")
+        makedirs(self.static)
+        self.source = join(self.static, "a.png")
+        with open(self.source, mode="wb") as file:
+            file.write(_png(8, 4))
+        self.manifest = Manifest()
+        sync_assets(self.static, self.public, self.manifest)
+        self.index = ImageIndex()
+
+    def _process(self, widths: list[int]):
+        return process_images(
+            self.manifest, self.static, self.public, self.index, widths
+        )
+
+    def test_ProcessImages_Widths_WriteSmallerPngVariants(self):
+        stats = self._process([4, 16])
+
+        variant = variant_path(join(self.public, "a.png"), 4)
+        self.assertEqual(stats.processed, 1)
+        self.assertEqual(image_size(variant), (4, 2))
+        self.assertEqual(
+            self.index.by_url(self.public),
+            {"/a.png": ImageInfo(8, 4, {4: "/a-4w.png"})},
+        )
+
+    def test_ProcessImages_Unchanged_SkipImage(self):
+        self._process([4])
+        stats = self._process([4])
+        self.assertEqual((stats.processed, stats.unchanged), (0, 1))
+
+    def test_ProcessImages_SourceDeleted_RemoveVariants(self):
+        self._process([4])
+        remove(self.source)
+        sync_assets(self.static, self.public, self.manifest)
+
+        stats = self._process([4])
+
+        self.assertEqual(stats.removed, 1)
+        self.assertFalse(exists(variant_path(join(self.public, "a.png"), 4)))
+        self.assertEqual(self.index.images, {})
+
+    def test_SaveAndLoad_RoundTrip_KeepVariantWidths(self):
+        self._process([4])
+        path = join(self.public, "..", "cache", "images.json")
+        self.index.save(path)
+        self.assertEqual(ImageIndex.load(path).images, self.index.images)
+
+
+class ImageAttributesTests(TestCase):
+    def test_TextNodeToHtmlNode_KnownImage_AddDimensions(self):
+        node = TextNode(text="alt", text_type=TextTypes.image, url="/a.png")
+        with using_images({"/a.png": ImageInfo(8, 4)}):
+            html = text_node_to_html_node(node).to_html()
+        self.assertEqual(
+            html, '<img src="/a.png" alt="alt" width="8" height="4"></img>'
+        )
+
+    def test_TextNodeToHtmlNode_AfterEagerImages_LoadLazily(self):
+        nodes = [
+            TextNode(text=str(index), text_type=TextTypes.image, url="/b.png")
+            for index in range(3)
+        ]
+        with using_images({}, ImageOptions(eager=2)):
+            props = [text_node_to_html_node(node).props for node in nodes]
+        self.assertEqual([p.get("loading") for p in props], [None, None, "lazy"])
+        self.assertEqual(props[2]["decoding"], "async")
+
+    def test_TextNodeToHtmlNode_Variants_AddSrcsetAndSizes(self):
+        node = TextNode(text="alt", text_type=TextTypes.image, url="/a.png")
+        info = ImageInfo(800, 400, {400: "/a-400w.png"})
+        with using_images({"/a.png": info}, ImageOptions(sizes="50vw")):
+            props = text_node_to_html_node(node).props
+        self.assertEqual(props["srcset"], "/a-400w.png 400w, /a.png 800w")
+        self.assertEqual(props["sizes"], "50vw")
+
+    def test_WriteMarkdownHtml_CachedImageBlock_CountTowardsEagerImages(self):
+        cache = RenderCache()
+        markdown = "![a](/a.png)\n\n![b](/b.png)\n"
+        pages = []
+        for _ in range(2):
+            file = io.StringIO()
+            with using_images({}):
+                write_markdown_html(io.StringIO(markdown), file, cache)
+            pages.append(file.getvalue())
+
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(pages[1], pages[0])
+        self.assertEqual(pages[0].count('loading="lazy"'), 1)
+
+    def test_WriteMarkdownHtml_OtherImageChanged_ReuseCachedBlocks(self):
+        cache = RenderCache()
+        markdown = "![a](/a.png)\n"
+        image_maps = [
+            {"/a.png": ImageInfo(8, 4)},
+            {"/a.png": ImageInfo(8, 4), "/b.png": ImageInfo(2, 2)},
+            {"/a.png": ImageInfo(16, 8), "/b.png": ImageInfo(2, 2)},
+        ]
+        pages = []
+        for images in image_maps:
+            file = io.StringIO()
+            with using_images(images):
+                write_markdown_html(io.StringIO(markdown), file, cache)
+            pages.append(file.getvalue())
+
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertIn('width="16"', pages[2])
@@ -0,0 +1,94 @@
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from links import BrokenLink, LinkIndex, collecting_links, resolve_link
+from utils import markdown_to_html_node
+
+
+class ResolveLinkTests(TestCase):
+    def test_ResolveLink_RelativeUrl_ResolveAgainstPage(self):
+        target = resolve_link(
+            "../images/a%20b.png?x=1", "public/blog/post.html", "public"
+        )
+        self.assertEqual(target, "/images/a b.png")
+
+    def test_ResolveLink_DirectoryUrl_KeepTrailingSlash(self):
+        target = resolve_link("/blog/", "public/index.html", "public")
+        self.assertEqual(target, "/blog/")
+        self.assertEqual(resolve_link("/", "public/a/index.html", "public"), "/")
+
+    def test_ResolveLink_ExternalOrFragment_ReturnNone(self):
+        for url in ("https://boot.dev", "//cdn.example/x.js", "mailto:a@b", "#top"):
+            self.assertIsNone(resolve_link(url, "public/index.html", "public"))
+
+
+class LinkIndexTests(TestCase):
+    def setUp(self):
+        self.index = LinkIndex()
+        self.index.record(
+            "content/index.md",
+            "public/index.html",
+            [("link", "/majesty"), ("link", "/missing"), ("image", "/a.png")],
+        )
+        self.index.record(
+            "content/majesty/index.md",
+            "public/majesty/index.html",
+            [("link", "/"), ("link", "https://boot.dev")],
+        )
+        self.outputs = ["public/index.html", "public/majesty/index.html"]
+
+    def test_Check_MissingTargets_ReturnBrokenLinks(self):
+        broken = self.index.check(self.outputs, "public")
+        self.assertEqual(
+            broken,
+            [
+                BrokenLink("content/index.md", "link", "/missing"),
+                BrokenLink("content/index.md", "image", "/a.png"),
+            ],
+        )
+
+    def test_Check_Sources_CheckOnlyThosePages(self):
+        broken = self.index.check([], "public", ["content/majesty/index.md"])
+        self.assertEqual(broken, [BrokenLink("content/majesty/index.md", "link", "/")])
+
+    def test_LinkingTo_RecordAndRetain_KeepInboundInStep(self):
+        self.assertEqual(
+            self.index.linking_to(["public/majesty/index.html"], "public"),
+            {"content/index.md"},
+        )
+        self.index.record("content/index.md", "public/index.html", [])
+        self.index.record("content/a.md", "public/a.html", [("link", "missing")])
+        self.index.retain(["content/index.md", "content/a.md"])
+
+        self.assertEqual(
+            self.index.linking_to(
+                ["public/majesty/index.html", "public/index.html"], "public"
+            ),
+            set(),
+        )
+        self.assertEqual(
+            self.index.linking_to(["public/missing"], "public"), {"content/a.md"}
+        )
+
+    def test_Inbound_InternalLinks_MapTargetToSources(self):
+        inbound = self.index.inbound("public")
+        self.assertEqual(inbound["/majesty"], ["content/index.md"])
+        self.assertEqual(inbound["/"], ["content/majesty/index.md"])
+        self.assertNotIn("https://boot.dev", inbound)
+
+    def test_Retain_SourceGone_DropPage(self):
+        self.index.retain(["content/majesty/index.md"])
+        self.assertEqual(list(self.index.pages), ["content/majesty/index.md"])
+
+    def test_SaveAndLoad_RoundTrip_KeepPages(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "cache", "links.json")
+            self.index.save(path)
+            self.assertEqual(LinkIndex.load(path).pages, self.index.pages)
+
+    def test_CollectingLinks_ParsePass_RecordLinksAndImages(self):
+        links = []
+        with collecting_links(links):
+            markdown_to_html_node("[a](/a) and ![b](/b.png)\n\n`[c](/c)`")
+        self.assertEqual(links, [("link", "/a"), ("image", "/b.png")])
@@ -0,0 +1,151 @@
+from os import listdir, makedirs
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from listings import output_url, write_feed, write_section_indexes, write_sitemap
+from manifest import Manifest, ManifestEntry
+from metadata import MetadataIndex
+from template import Template
+
+
+class ListingsTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.public = join(tmp_dir.name, "public")
+        makedirs(join(self.public, "blog", "2024"))
+        self.template = Template("<h1>{{ Title }}</h1>{{ Content }}")
+        self.index = MetadataIndex()
+        self._record("index.md", "index.html", {"title": "Home"})
+        self._record(
+            "blog/2024/one.md",
+            "blog/2024/one.html",
+            {"title": "One & only", "date": "2024-05-01", "description": "<b>"},
+        )
+        self._record(
+            "blog/two.md", "blog/two.html", {"title": "Two", "date": "2024-06-01"}
+        )
+        self._record("blog/three.md", "blog/three.html", {"title": "Three"})
+
+    def _record(self, source: str, output: str, metadata: dict):
+        output_path = join(self.public, output)
+        section = source.split("/")[0] if "/" in source else ""
+        self.index.record(join("content", source), output_path, section, metadata)
+
+    def _write_indexes(self, manifest: Manifest) -> list[str]:
+        return write_section_indexes(
+            self.index, self.public, "content/", self.template, manifest
+        )
+
+    def _read(self, path: str) -> str:
+        with open(path) as file:
+            return file.read()
+
+    def test_OutputUrl_IndexPage_ReturnDirectoryUrl(self):
+        home_url = output_url(join(self.public, "index.html"), self.public)
+        self.assertEqual(home_url, "/")
+        self.assertEqual(
+            output_url(join(self.public, "blog", "two.html"), self.public),
+            "/blog/two.html",
+        )
+
+    def test_WriteSectionIndexes_DirectoriesWithoutIndex_ListPagesAndSubdirs(self):
+        manifest = Manifest()
+        written = self._write_indexes(manifest)
+
+        blog_index = join(self.public, "blog", "index.html")
+        self.assertEqual(
+            written, [blog_index, join(self.public, "blog", "2024", "index.html")]
+        )
+        self.assertEqual(
+            self._read(blog_index),
+            '<h1>blog</h1><ul class="section-index">'
+            '<li><a href="/blog/2024/">2024/</a></li>'
+            '<li><a href="/blog/two.html">Two</a></li>'
+            '<li><a href="/blog/three.html">Three</a></li></ul>',
+        )
+        self.assertEqual(manifest.entries["content/blog/"].output_path, blog_index)
+
+    def test_WriteSectionIndexes_Unchanged_SkipWriting(self):
+        manifest = Manifest()
+        self._write_indexes(manifest)
+        written = self._write_indexes(manifest)
+        self.assertEqual(written, [])
+
+    def test_WriteSectionIndexes_RealIndexAdded_DropListingKeepPage(self):
+        manifest = Manifest()
+        self._write_indexes(manifest)
+        blog_index = join(self.public, "blog", "index.html")
+        self._record("blog/index.md", "blog/index.html", {"title": "Blog"})
+        manifest.record("content/blog/index.md", ManifestEntry("abc", blog_index))
+
+        self._write_indexes(manifest)
+
+        self.assertNotIn("content/blog/", manifest.entries)
+        self.assertTrue(exists(blog_index))
+
+    def test_WriteSitemap_Outputs_WriteUrlsWithLastmod(self):
+        path = join(self.public, "sitemap.xml")
+        outputs = [
+            join(self.public, "index.html"),
+            join(self.public, "blog", "two.html"),
+        ]
+        write_sitemap(path, self.index, outputs, self.public, "https://example.com/")
+
+        self.assertEqual(
+            self._read(path),
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            "<url><loc>https://example.com/blog/two.html</loc>"
+            "<lastmod>2024-06-01</lastmod></url>\n"
+            "<url><loc>https://example.com/</loc></url>\n"
+            "</urlset>\n",
+        )
+
+    def test_WriteSitemap_OverLimits_WriteIndexOfParts(self):
+        path = join(self.public, "sitemap.xml")
+        outputs = [join(self.public, f"{index}.html") for index in range(5)]
+
+        parts = write_sitemap(
+            path, self.index, outputs, self.public, "https://example.com", max_urls=2
+        )
+
+        self.assertEqual(
+            parts, [join(self.public, f"sitemap-{index}.xml") for index in (1, 2, 3)]
+        )
+        self.assertEqual(
+            self._read(path),
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            "<sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap>\n"
+            "<sitemap><loc>https://example.com/sitemap-2.xml</loc></sitemap>\n"
+            "<sitemap><loc>https://example.com/sitemap-3.xml</loc></sitemap>\n"
+            "</sitemapindex>\n",
+        )
+        self.assertEqual([self._read(part).count("<url>") for part in parts], [2, 2, 1])
+        self.assertIn("<loc>https://example.com/4.html</loc>", self._read(parts[2]))
+
+        # One URL per part by size; then few enough pages for one file.
+        parts = write_sitemap(
+            path, self.index, outputs[:3], self.public, "https://example.com", 3, 150
+        )
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(write_sitemap(path, self.index, outputs, self.public, ""), [])
+        self.assertEqual(self._read(path).count("<url>"), 5)
+        self.assertEqual(sorted(listdir(self.public)), ["blog", "sitemap.xml"])
+
+    def test_WriteFeed_Limit_WriteNewestDatedPages(self):
+        path = join(self.public, "rss.xml")
+        write_feed(path, self.index, self.public, "https://example.com", "Site", 1)
+        feed = self._read(path)
+
+        self.assertIn("<title>Two</title>", feed)
+        self.assertIn("<pubDate>Sat, 01 Jun 2024 00:00:00 +0000</pubDate>", feed)
+        self.assertNotIn("One", feed)
+
+        write_feed(path, self.index, self.public, "https://example.com", "Site")
+        feed = self._read(path)
+        self.assertLess(feed.index("<title>Two</title>"), feed.index("One &amp; only"))
+        self.assertIn("<description>&lt;b&gt;</description>", feed)
+        self.assertNotIn("Three", feed)
@@ -0,0 +1,311 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from os import chdir, getcwd, makedirs, remove
+from os.path import exists, isfile, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from assets import asset_url_map
+from compress import CompressedIndex
+from depgraph import DependencyGraph
+from images import ImageInfo
+from links import LinkIndex
+from main import (
+    CONTENT_DIR,
+    PUBLIC_DIR,
+    STATIC_DIR,
+    TEMPLATE_PATH,
+    BuildContext,
+    WatchState,
+    build_outputs,
+    discover_pages,
+    generate_pages_recursive,
+    page_dependencies_hash,
+    rebuild_changed,
+    update_dependencies,
+    update_watched,
+    write_listings,
+)
+from manifest import Manifest
+from metadata import MetadataIndex
+from page_cache import PageCache
+
+
+class BuildOutputsTests(TestCase):
+    def test_BuildOutputs_LinksToSitemapAndFeed_NotBroken(self):
+        link_index = LinkIndex()
+        link_index.record(
+            "content/a.md",
+            join(PUBLIC_DIR, "a.html"),
+            [("link", "/rss.xml"), ("link", "/sitemap.xml")],
+        )
+        self.assertEqual(link_index.check(build_outputs(Manifest()), PUBLIC_DIR), [])
+
+
+class PageDependenciesHashTests(TestCase):
+    asset_urls = {"/a.css": "/a.0123456789.css", "/b.css": "/b.0123456789.css"}
+    links = [("link", "/a.0123456789.css"), ("link", "/page.html")]
+
+    def _hash(self, links, asset_urls: dict[str, str], images=None) -> str:
+        return page_dependencies_hash(
+            links, asset_urls, set(asset_urls.values()), images or {}
+        )
+
+    def test_PageDependenciesHash_OtherFileFingerprinted_KeepHash(self):
+        new_asset_urls = {**self.asset_urls, "/b.css": "/b.abcdef0123.css"}
+        self.assertEqual(
+            self._hash(self.links, new_asset_urls),
+            self._hash(self.links, self.asset_urls),
+        )
+        self.assertEqual(self._hash([("link", "/page.html")], self.asset_urls), "")
+
+    def test_PageDependenciesHash_LinkedFileFingerprinted_ChangeHash(self):
+        new_asset_urls = {**self.asset_urls, "/a.css": "/a.abcdef0123.css"}
+        self.assertNotEqual(
+            self._hash(self.links, new_asset_urls),
+            self._hash(self.links, self.asset_urls),
+        )
+        plain_links = [("link", "/c.css")]
+        self.assertNotEqual(
+            self._hash(plain_links, {"/c.css": "/c.0123456789.css"}),
+            self._hash(plain_links, {}),
+        )
+
+    def test_PageDependenciesHash_ShownImageResized_ChangeHash(self):
+        links = [("image", "/a.png")]
+        images = {"/a.png": ImageInfo(8, 4), "/b.png": ImageInfo(8, 4)}
+        digest = self._hash(links, {}, images)
+
+        other_image_resized = {**images, "/b.png": ImageInfo(16, 8)}
+        self.assertEqual(self._hash(links, {}, other_image_resized), digest)
+        shown_image_resized = {**images, "/a.png": ImageInfo(16, 8)}
+        self.assertNotEqual(self._hash(links, {}, shown_image_resized), digest)
+
+
+class GeneratePagesTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.content = join(tmp_dir.name, "content")
+        self.public = join(tmp_dir.name, "public")
+        self.template = join(tmp_dir.name, "template.html")
+        makedirs(join(self.content, "b"))
+        self._write(join(self.content, "a.md"), "# A")
+        self._write(join(self.content, "b", "index.md"), "# B")
+        self._write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+
+    def _write(self, path: str, text: str):
+        with open(path, mode="w") as file:
+            file.write(text)
+
+    def test_DiscoverPages_NestedContent_ReturnSortedPairs(self):
+        pages = discover_pages(self.content, self.public)
+        self.assertEqual(
+            pages,
+            [
+                (join(self.content, "a.md"), join(self.public, "a.html")),
+                (
+                    join(self.content, "b", "index.md"),
+                    join(self.public, "b", "index.html"),
+                ),
+            ],
+        )
+
+    def test_GeneratePagesRecursive_Parallel_WriteAllPages(self):
+        errors = generate_pages_recursive(
+            self.content, self.template, self.public, Manifest(), BuildContext(jobs=2)
+        )
+        self.assertEqual(errors, [])
+        self.assertTrue(isfile(join(self.public, "a.html")))
+        self.assertTrue(isfile(join(self.public, "b", "index.html")))
+
+    def test_GeneratePagesRecursive_Parallel_IndexLinksOfEveryPage(self):
+        self._write(join(self.content, "a.md"), "# A\n\n[B](/b/)")
+        link_index = LinkIndex()
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            Manifest(),
+            BuildContext(jobs=2, link_index=link_index),
+        )
+        a_links = link_index.outbound(join(self.content, "a.md"))
+        b_links = link_index.outbound(join(self.content, "b", "index.md"))
+        self.assertEqual(a_links, [("link", "/b/")])
+        self.assertEqual(b_links, [])
+
+    def test_GeneratePagesRecursive_FrontMatter_IndexAndFillTemplate(self):
+        self._write(
+            join(self.content, "b", "index.md"),
+            "---\ntitle: Front\ntags: [x]\n---\n# B",
+        )
+        self._write(self.template, "<h1>{{ Title }}</h1>{{ tags }}{{ Content }}")
+        metadata_index = MetadataIndex()
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            Manifest(),
+            BuildContext(jobs=2, metadata_index=metadata_index),
+        )
+
+        b_source = join(self.content, "b", "index.md")
+        self.assertEqual(metadata_index.pages[b_source]["title"], "Front")
+        self.assertEqual(metadata_index.in_section("b"), [b_source])
+        self.assertEqual(metadata_index.pages[join(self.content, "a.md")]["title"], "A")
+        with open(join(self.public, "b", "index.html")) as file:
+            self.assertEqual(file.read(), "<h1>Front</h1>x<div><h1>B</h1></div>")
+
+    def test_GeneratePagesRecursive_PageWithoutHeader_CollectError(self):
+        self._write(join(self.content, "a.md"), "no header")
+        for jobs in (1, 2):
+            errors = generate_pages_recursive(
+                self.content,
+                self.template,
+                self.public,
+                Manifest(),
+                BuildContext(jobs=jobs),
+            )
+            failed_paths = [path for path, _ in errors]
+            self.assertEqual(failed_paths, [join(self.content, "a.md")])
+            self.assertTrue(isfile(join(self.public, "b", "index.html")))
+
+    def test_GeneratePagesRecursive_PageCache_RestorePagesOfFreshBuild(self):
+        self._write(join(self.content, "a.md"), "# A\n\n[B](/b/)")
+        page_cache = PageCache(join(self.public, "..", "page-cache"))
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            Manifest(),
+            BuildContext(page_cache=page_cache),
+        )
+        fresh_public = join(self.public, "..", "fresh")
+        link_index = LinkIndex()
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            fresh_public,
+            Manifest(),
+            BuildContext(jobs=2, link_index=link_index, page_cache=page_cache),
+        )
+
+        self.assertEqual((page_cache.stored, page_cache.hits), (2, 2))
+        self.assertEqual(
+            link_index.outbound(join(self.content, "a.md")), [("link", "/b/")]
+        )
+        with open(join(fresh_public, "b", "index.html")) as file:
+            self.assertEqual(file.read(), "<h1>B</h1><div><h1>B</h1></div>")
+
+
+class SiteTestCase(TestCase):
+    # Runs in a site directory laid out like the real one, since the build
+    # reads its inputs and writes its indexes at fixed relative paths.
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(chdir, getcwd())
+        chdir(tmp_dir.name)
+        makedirs("content")
+        makedirs("static")
+        self._write("template.html", "{{ Content }}")
+        self.manifest = Manifest()
+        self.context = BuildContext(
+            link_index=LinkIndex(),
+            metadata_index=MetadataIndex(),
+            dependency_graph=DependencyGraph(),
+            fingerprint=True,
+        )
+
+    def _write(self, path: str, text: str):
+        with open(path, mode="w") as file:
+            file.write(text)
+
+    def _read(self, path: str) -> str:
+        with open(path) as file:
+            return file.read()
+
+    def _build(self):
+        generate_pages_recursive(
+            CONTENT_DIR, TEMPLATE_PATH, PUBLIC_DIR, self.manifest, self.context
+        )
+        update_dependencies(
+            self.context.dependency_graph, self.context.link_index, self.manifest
+        )
+
+
+class RebuildChangedTests(SiteTestCase):
+    def test_RebuildChanged_LinkedStaticFileCreated_RenderLinkingPages(self):
+        self._write("content/a.md", "# A\n\n[style](/new.css)")
+        self._write("content/b.md", "# B")
+        self._build()
+
+        self._write("static/new.css", "p {}")
+        errors = rebuild_changed({"static/new.css"}, self.manifest, self.context)
+
+        self.assertEqual(errors, [])
+        asset_url = asset_url_map(self.manifest, STATIC_DIR, PUBLIC_DIR)["/new.css"]
+        self.assertIn(f'href="{asset_url}"', self._read("public/a.html"))
+        self.assertEqual(self.manifest.entries["content/b.md"].dependencies_hash, "")
+
+
+class UpdateWatchedTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self._write("content/a.md", "# A\n\n[b](/b.html)")
+        self._write("content/b.md", "# B")
+        self._build()
+        write_listings(self.context.metadata_index, self.manifest, "/", 10)
+        self.state = WatchState.current(self.manifest, self.context)
+
+    def _update(self, changed_paths: set[str]) -> str:
+        with redirect_stdout(StringIO()) as output:
+            errors = update_watched(
+                changed_paths,
+                self.manifest,
+                self.context,
+                self.state,
+                CompressedIndex(),
+                base_url="/",
+                feed_size=10,
+            )
+        self.assertEqual(errors, [])
+        return output.getvalue()
+
+    def test_UpdateWatched_MetadataUnchanged_KeepListings(self):
+        remove("public/sitemap.xml")
+        self._write("content/b.md", "# B\n\nMore text.")
+        self._update({"content/b.md"})
+        self.assertIn("More text.", self._read("public/b.html"))
+        self.assertFalse(exists("public/sitemap.xml"))
+
+        self._write("content/b.md", "# Renamed")
+        self._update({"content/b.md"})
+        self.assertIn("Renamed", self._read("public/index.html"))
+        self.assertTrue(exists("public/sitemap.xml"))
+
+    def test_UpdateWatched_LinkedPageRemoved_CheckLinkingPage(self):
+        remove("content/b.md")
+        output = self._update({"content/b.md"})
+
+        self.assertIn("content/a.md: link /b.html", output)
+        self.assertNotIn("public/b.html", self.context.dependency_graph.outputs)
+
+    def test_UpdateWatched_RebuildFailed_NextRebuildCoversIt(self):
+        self._write("template.html", "{{> header.html }}{{ Content }}")
+        with redirect_stdout(StringIO()):
+            with self.assertRaises(FileNotFoundError):
+                update_watched(
+                    {"template.html"},
+                    self.manifest,
+                    self.context,
+                    self.state,
+                    CompressedIndex(),
+                    base_url="/",
+                    feed_size=10,
+                )
+
+        self._write("header.html", "<header>")
+        self._update({"header.html", "template.html"})
+        self.assertEqual(self._read("public/b.html"), "<header><div><h1>B</h1></div>")
+        self.assertTrue(self._read("public/index.html").startswith("<header>"))
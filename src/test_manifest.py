@@ -0,0 +1,82 @@
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from manifest import Manifest, ManifestEntry, file_hash
+
+
+class ManifestTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_path = join(self.tmp_dir.name, "index.html")
+        with open(self.output_path, mode="w") as file:
+            file.write("<p>a</p>")
+
+    def test_IsFresh_SameEntryAndOutputExists_ReturnTrue(self):
+        entry = ManifestEntry("abc", self.output_path, "tmpl")
+        manifest = Manifest({"index.md": entry})
+        self.assertTrue(manifest.is_fresh("index.md", entry))
+
+    def test_IsFresh_TemplateChanged_ReturnFalse(self):
+        manifest = Manifest({"index.md": ManifestEntry("abc", self.output_path, "a")})
+        entry = ManifestEntry("abc", self.output_path, "b")
+        self.assertFalse(manifest.is_fresh("index.md", entry))
+
+    def test_IsFresh_OutputMissing_ReturnFalse(self):
+        entry = ManifestEntry("abc", join(self.tmp_dir.name, "gone.html"))
+        manifest = Manifest({"index.md": entry})
+        self.assertFalse(manifest.is_fresh("index.md", entry))
+
+    def test_RemoveStale_SourceNotRecorded_RemoveOutput(self):
+        kept_entry = ManifestEntry("abc", self.output_path)
+        stale_output = join(self.tmp_dir.name, "stale.html")
+        open(stale_output, mode="w").close()
+        manifest = Manifest(
+            {"kept.md": kept_entry, "stale.md": ManifestEntry("def", stale_output)}
+        )
+        manifest.record("kept.md", kept_entry)
+
+        removed = manifest.remove_stale()
+
+        self.assertEqual(removed, [stale_output])
+        self.assertFalse(exists(stale_output))
+        self.assertTrue(exists(self.output_path))
+        self.assertEqual(list(manifest.entries), ["kept.md"])
+
+    def test_RemoveStale_OutputOwnedByOtherSource_KeepOutput(self):
+        entry = ManifestEntry("abc", self.output_path)
+        manifest = Manifest({"content/": entry, "content/index.md": entry})
+        manifest.record("content/index.md", entry)
+
+        self.assertEqual(manifest.remove_stale(), [])
+        self.assertTrue(exists(self.output_path))
+        self.assertFalse(manifest.is_current("content/"))
+        self.assertTrue(manifest.is_current("content/index.md"))
+
+    def test_Remove_Directory_RemoveOutputsBelowIt(self):
+        nested_output = join(self.tmp_dir.name, "nested.html")
+        open(nested_output, mode="w").close()
+        manifest = Manifest(
+            {
+                "content/a/index.md": ManifestEntry("abc", nested_output),
+                "content/ab.md": ManifestEntry("def", self.output_path),
+            }
+        )
+
+        removed = manifest.remove("content/a")
+
+        self.assertEqual(removed, [nested_output])
+        self.assertEqual(list(manifest.entries), ["content/ab.md"])
+
+    def test_SaveAndLoad_RoundTrip_ReturnSameEntries(self):
+        path = join(self.tmp_dir.name, "cache", "manifest.json")
+        manifest = Manifest()
+        manifest.record("a.md", ManifestEntry(file_hash(self.output_path), "a", "t"))
+        manifest.save(path)
+
+        self.assertEqual(Manifest.load(path).entries, manifest.entries)
+
+    def test_Load_MissingFile_ReturnEmptyManifest(self):
+        manifest = Manifest.load(join(self.tmp_dir.name, "missing.json"))
+        self.assertEqual(manifest.entries, {})
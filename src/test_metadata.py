@@ -0,0 +1,74 @@
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from metadata import MetadataIndex
+
+
+class MetadataIndexTests(TestCase):
+    def setUp(self):
+        self.index = MetadataIndex()
+        self.index.record(
+            "content/blog/a.md",
+            "public/blog/a.html",
+            "blog",
+            {"title": "A", "date": "2024-01-02", "tags": ["tolkien", "books"]},
+        )
+        self.index.record(
+            "content/blog/b.md",
+            "public/blog/b.html",
+            "blog",
+            {"title": "B", "date": "2024-03-01", "tags": "tolkien"},
+        )
+        self.index.record("content/index.md", "public/index.html", "", {"title": "H"})
+
+    def test_Tags_ListAndSingleTag_MapTagToPages(self):
+        self.assertEqual(
+            self.index.tags(),
+            {
+                "tolkien": ["content/blog/a.md", "content/blog/b.md"],
+                "books": ["content/blog/a.md"],
+            },
+        )
+        self.assertEqual(self.index.with_tag("missing"), [])
+
+    def test_InSection_ReturnPagesOfSection(self):
+        self.assertEqual(
+            self.index.in_section("blog"), ["content/blog/a.md", "content/blog/b.md"]
+        )
+        self.assertEqual(self.index.in_section(""), ["content/index.md"])
+
+    def test_RecordAndRetain_ChangedPages_UpdateTagsAndSections(self):
+        self.index.record(
+            "content/blog/a.md", "public/a.html", "", {"title": "A", "tags": "new"}
+        )
+        self.index.retain(["content/blog/a.md", "content/index.md"])
+
+        self.assertEqual(self.index.tags(), {"new": ["content/blog/a.md"]})
+        self.assertEqual(self.index.in_section("blog"), [])
+        self.assertEqual(
+            self.index.sections(), {"": ["content/blog/a.md", "content/index.md"]}
+        )
+
+    def test_Version_OnlyChangedPages_CountChange(self):
+        version = self.index.version
+        self.index.record("content/index.md", "public/index.html", "", {"title": "H"})
+        self.index.retain(self.index.pages)
+        self.assertEqual(self.index.version, version)
+
+        self.index.record("content/index.md", "public/index.html", "", {"title": "I"})
+        self.index.retain(["content/index.md"])
+        self.assertEqual(self.index.version, version + 3)
+
+    def test_ByDate_NewestFirst_SkipUndatedPages(self):
+        self.assertEqual(
+            self.index.by_date(), ["content/blog/b.md", "content/blog/a.md"]
+        )
+
+    def test_SaveAndLoad_RoundTrip_KeepPages(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "cache", "metadata.json")
+            self.index.save(path)
+            loaded = MetadataIndex.load(path)
+        self.assertEqual(loaded.pages, self.index.pages)
+        self.assertEqual(loaded.tags(), self.index.tags())
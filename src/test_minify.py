@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from minify import MinifyStats, minify_css, minify_html, minify_output, minifying
+
+
+class MinifyHtmlTests(TestCase):
+    def test_MinifyHtml_Indentation_DropWhitespaceAroundBlockTags(self):
+        html = "<html>\n  <head>\n    <title> {{ Title }} </title>\n  </head>\n</html>"
+        self.assertEqual(
+            minify_html(html), "<html><head><title>{{ Title }}</title></head></html>"
+        )
+
+    def test_MinifyHtml_InlineTags_KeepSingleSpace(self):
+        self.assertEqual(minify_html("<p>a  <b>b</b>\n  c</p>"), "<p>a <b>b</b> c</p>")
+
+    def test_MinifyHtml_CodeBlocks_KeepContentAsIs(self):
+        html = "<p>x</p>\n<pre><code>a\n    b</code></pre>\n<p>y <code>c  d</code></p>"
+        self.assertEqual(
+            minify_html(html),
+            "<p>x</p><pre><code>a\n    b</code></pre><p>y <code>c  d</code></p>",
+        )
+
+    def test_MinifyOutput_Minifying_CountBytesSaved(self):
+        stats = MinifyStats()
+        with minifying(stats):
+            html = minify_output("<p>a   b</p>")
+        self.assertEqual((html, stats.bytes_saved), ("<p>a b</p>", 2))
+        self.assertEqual(minify_output("<p>a   b</p>"), "<p>a   b</p>")
+
+
+class MinifyCssTests(TestCase):
+    def test_MinifyCss_Rules_DropCommentsAndWhitespace(self):
+        css = "/* theme */\nbody {\n  color: red;\n  margin: 0 auto;\n}\na > b, i {}"
+        self.assertEqual(minify_css(css), "body{color:red;margin:0 auto}a>b,i{}")
+
+    def test_MinifyCss_Strings_KeepAsIs(self):
+        css = 'a::before { content: "a  /* b */ ;  }"; }'
+        self.assertEqual(minify_css(css), 'a::before{content:"a  /* b */ ;  }"}')
+
+    def test_MinifyCss_PseudoClassAfterSpace_KeepSpace(self):
+        self.assertEqual(minify_css("div :hover {}"), "div :hover{}")
@@ -0,0 +1,77 @@
+from os import makedirs, utime
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from page_cache import CachedPage, PageCache
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+        self.cache = PageCache(join(self.dir, "cache"))
+        makedirs(join(self.dir, "public"))
+        self.output = join(self.dir, "public", "a.html")
+        self._write(self.output, "<p>a</p>")
+
+    def _write(self, path: str, text: str):
+        with open(path, mode="w") as file:
+            file.write(text)
+
+    def _read(self, path: str) -> str:
+        with open(path) as file:
+            return file.read()
+
+    def test_Key_DifferentTemplate_ReturnDifferentKey(self):
+        self.assertNotEqual(PageCache.key("s", "t1"), PageCache.key("s", "t2"))
+        self.assertEqual(PageCache.key("s", "t1"), PageCache.key("s", "t1"))
+
+    def test_Restore_StoredPage_CopyHtmlAndReturnSidecar(self):
+        page = CachedPage([("link", "/b/")], {"title": "A", "tags": ["x"]})
+        self.cache.store("ab12", self.output, page)
+        restored_path = join(self.dir, "public", "copy", "a.html")
+
+        restored = self.cache.restore("ab12", restored_path)
+
+        self.assertEqual(restored, page)
+        self.assertEqual(self._read(restored_path), "<p>a</p>")
+        self.assertEqual((self.cache.hits, self.cache.stored), (1, 1))
+
+    def test_Restore_MissingEntry_CountMiss(self):
+        self.assertIsNone(self.cache.restore("cd34", self.output))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        self.assertEqual(self._read(self.output), "<p>a</p>")
+
+    def test_Restore_EntryReplacedWhileChecked_CopyCheckedHtml(self):
+        self.cache.store("ab12", self.output, CachedPage(dependencies_hash="x"))
+        other_output = join(self.dir, "public", "b.html")
+        self._write(other_output, "<p>b</p>")
+
+        def is_current(page: CachedPage) -> bool:
+            # Another build stores its own render under the same key.
+            self.cache.store("ab12", other_output, CachedPage(dependencies_hash="y"))
+            return page.dependencies_hash == "x"
+
+        restored_path = join(self.dir, "public", "copy", "a.html")
+        restored = self.cache.restore("ab12", restored_path, is_current)
+
+        self.assertEqual(restored, CachedPage(dependencies_hash="x"))
+        self.assertEqual(self._read(restored_path), "<p>a</p>")
+        restored = self.cache.restore("ab12", restored_path)
+        self.assertEqual(restored, CachedPage(dependencies_hash="y"))
+        self.assertEqual(self._read(restored_path), "<p>b</p>")
+
+    def test_Evict_OverMaxBytes_RemoveLeastRecentlyUsed(self):
+        self.cache.store("aa11", self.output, CachedPage())
+        self.cache.store("bb22", self.output, CachedPage())
+        old_path = join(self.cache.directory, "aa", "aa11.page")
+        utime(old_path, (1, 1))
+
+        cache = PageCache(self.cache.directory, max_bytes=100)
+        cache.evict()
+
+        self.assertEqual(cache.evicted, 1)
+        self.assertFalse(exists(old_path))
+        self.assertIsNotNone(cache.restore("bb22", self.output))
@@ -0,0 +1,56 @@
+import json
+import time
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from profiler import BuildProfile, Profiler, phase, profiling
+
+
+class ProfilerTests(TestCase):
+    def test_Phase_NoActiveProfiler_DoNothing(self):
+        with phase("read"):
+            pass
+
+    def test_Phase_Nested_RecordExclusiveTimes(self):
+        profiler = Profiler()
+        with profiling(profiler):
+            with phase("outer"):
+                with phase("inner"):
+                    time.sleep(0.02)
+        outer_seconds, _, outer_calls = profiler.phases["outer"]
+        inner_seconds, _, inner_calls = profiler.phases["inner"]
+        self.assertGreaterEqual(inner_seconds, 0.02)
+        self.assertLess(outer_seconds, 0.01)
+        self.assertEqual((outer_calls, inner_calls), (1, 1))
+
+    def test_Profiling_Exit_RestorePreviousProfiler(self):
+        outer, inner = Profiler(), Profiler()
+        with profiling(outer):
+            with profiling(inner):
+                with phase("a"):
+                    pass
+            with phase("b"):
+                pass
+        self.assertEqual(list(inner.phases), ["a"])
+        self.assertEqual(list(outer.phases), ["b"])
+
+
+class BuildProfileTests(TestCase):
+    def test_WriteReport_Pages_ReportTotalsAndSlowestPages(self):
+        build_profile = BuildProfile()
+        build_profile.add_page("fast.md", 0.1, {"read": [0.1, 5, 1]})
+        build_profile.add_page("slow.md", 0.3, {"read": [0.2, 1, 1]})
+
+        with TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "profile.json")
+            build_profile.write_report(path, top_n=1)
+            with open(path) as file:
+                report = json.load(file)
+
+        self.assertEqual(report["phases"]["read"]["calls"], 2)
+        self.assertEqual(report["phases"]["read"]["live_block_delta"], 6)
+        self.assertAlmostEqual(report["phases"]["read"]["seconds"], 0.3)
+        self.assertEqual(
+            [page["page"] for page in report["slowest_pages"]], ["slow.md"]
+        )
@@ -0,0 +1,81 @@
+import io
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from links import collecting_links
+from render_cache import RenderCache
+from utils import write_markdown_html
+
+
+class RenderCacheTests(TestCase):
+    def test_Get_MissThenHit_CountLookups(self):
+        cache = RenderCache()
+        key = RenderCache.key("# a", "heading")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "<h1>a</h1>")
+        self.assertEqual(cache.get(key), "<h1>a</h1>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_Key_SameTextOtherType_ReturnDifferentKey(self):
+        self.assertNotEqual(
+            RenderCache.key("a", "paragraph"), RenderCache.key("a", "quote")
+        )
+
+    def test_Put_OverCapacity_EvictLeastRecentlyUsed(self):
+        cache = RenderCache(max_entries=2)
+        cache.put(("a", "p"), "A")
+        cache.put(("b", "p"), "B")
+        cache.get(("a", "p"))
+        cache.put(("c", "p"), "C")
+        self.assertEqual([key for key, _ in cache.entries()], [("a", "p"), ("c", "p")])
+
+    def test_DrainNewEntries_ReturnEntriesAddedSinceLastDrain(self):
+        cache = RenderCache()
+        cache.put(("a", "p"), "A")
+        self.assertEqual(cache.drain_new_entries(), [(("a", "p"), "A")])
+        cache.put(("a", "p"), "A")
+        self.assertEqual(cache.drain_new_entries(), [])
+
+    def test_SaveAndLoad_RoundTrip_KeepEntries(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "render_cache.json")
+            cache = RenderCache()
+            cache.put(("a", "p"), "A")
+            cache.save(path)
+
+            loaded = RenderCache()
+            loaded.load(path)
+            self.assertEqual(loaded.entries(), [(("a", "p"), "A")])
+            self.assertEqual(loaded.drain_new_entries(), [])
+
+    def test_WriteMarkdownHtml_RepeatedBlocks_ReuseCachedHtml(self):
+        cache = RenderCache()
+        markdown = "Shared *footer*\n\n# Title\n\nShared *footer*\n"
+        cached_file = io.StringIO()
+        write_markdown_html(io.StringIO(markdown), cached_file, cache)
+        plain_file = io.StringIO()
+        write_markdown_html(io.StringIO(markdown), plain_file)
+
+        self.assertEqual(cached_file.getvalue(), plain_file.getvalue())
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_WriteMarkdownHtml_CachedBlock_ReportLinksAgain(self):
+        cache = RenderCache()
+        markdown = "See [home](/)\n\nSee [home](/)\n"
+        links = []
+        with collecting_links(links):
+            write_markdown_html(io.StringIO(markdown), io.StringIO(), cache)
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(links, [("link", "/"), ("link", "/")])
+
+    def test_Load_OlderFormat_IgnoreEntries(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "render_cache.json")
+            with open(path, mode="w") as file:
+                file.write('[["a", "p", "A"]]')
+
+            cache = RenderCache()
+            cache.load(path)
+            self.assertEqual(cache.entries(), [])
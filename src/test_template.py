@@ -0,0 +1,124 @@
+import io
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from template import Template, load_template, template_dependencies
+
+
+class TemplateTests(TestCase):
+    def test_Render_TitleAndContent_ReplacePlaceholders(self):
+        template = Template("<title> {{ Title }} </title><p>{{ Content }}</p>")
+        page = template.render({"Title": "Hi", "Content": "<b>x</b>"})
+        self.assertEqual(page, "<title> Hi </title><p><b>x</b></p>")
+
+    def test_Render_RepeatedAndCustomVariables_ReplaceEveryOccurrence(self):
+        template = Template("{{Author}}|{{ Title }}|{{ Author }}")
+        page = template.render({"Title": "T", "Author": "Tolkien"})
+        self.assertEqual(page, "Tolkien|T|Tolkien")
+
+    def test_Render_MissingVariable_KeepPlaceholder(self):
+        template = Template("<p>{{ Content }}</p>{{ Footer }}")
+        self.assertEqual(template.render({"Content": "a"}), "<p>a</p>{{ Footer }}")
+
+    def test_Render_ValueContainsPlaceholder_DoNotRescan(self):
+        template = Template("{{ Content }}{{ Title }}")
+        page = template.render({"Content": "{{ Title }}", "Title": "T"})
+        self.assertEqual(page, "{{ Title }}T")
+
+    def test_Variables_ReturnPlaceholderNames(self):
+        template = Template("{{ Title }}{{ Content }}{{ Title }}")
+        self.assertEqual(template.variables, {"Title", "Content"})
+
+    def test_Digest_DifferentSource_ReturnDifferentDigest(self):
+        self.assertNotEqual(Template("a").digest, Template("b").digest)
+
+    def test_Write_CallableValue_StreamIntoFile(self):
+        template = Template("<p>{{ Content }}</p>{{ Title }}{{ Footer }}")
+        file = io.StringIO()
+        template.write(
+            file, {"Title": "T", "Content": lambda output: output.write("streamed")}
+        )
+        self.assertEqual(file.getvalue(), "<p>streamed</p>T{{ Footer }}")
+
+
+class LoadTemplateTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+        makedirs(join(self.dir, "partials"))
+
+    def _write(self, path: str, text: str):
+        with open(join(self.dir, path), mode="w") as file:
+            file.write(text)
+
+    def test_LoadTemplate_NestedIncludes_ExpandAndRecordDependencies(self):
+        self._write("template.html", "{{> partials/head.html }}{{ Content }}")
+        self._write("partials/head.html", "<title>{{ Title }}</title>{{> meta.html}}")
+        self._write("partials/meta.html", "<meta>")
+
+        template = load_template(join(self.dir, "template.html"))
+
+        self.assertEqual(
+            template.render({"Title": "T", "Content": "c"}), "<title>T</title><meta>c"
+        )
+        self.assertEqual(
+            template.dependencies,
+            [
+                join(self.dir, "template.html"),
+                join(self.dir, "partials", "head.html"),
+                join(self.dir, "partials", "meta.html"),
+            ],
+        )
+
+    def test_TemplateDependencies_MissingInclude_ListIt(self):
+        self._write("template.html", "{{> nav.html }}{{> partials/head.html }}")
+
+        self.assertEqual(
+            template_dependencies(join(self.dir, "template.html")),
+            [join(self.dir, "template.html"), join(self.dir, "nav.html")],
+        )
+
+    def test_LoadTemplate_IncludeChanged_ChangeDigest(self):
+        self._write("template.html", "{{> partials/foot.html }}")
+        self._write("partials/foot.html", "a")
+        digest = load_template(join(self.dir, "template.html")).digest
+        self._write("partials/foot.html", "b")
+        new_digest = load_template(join(self.dir, "template.html")).digest
+        self.assertNotEqual(new_digest, digest)
+
+    def test_LoadTemplate_IncludeCycle_RaiseValueError(self):
+        self._write("template.html", "{{> partials/a.html }}")
+        self._write("partials/a.html", "{{> ../template.html }}")
+        with self.assertRaises(ValueError):
+            load_template(join(self.dir, "template.html"))
+
+    def test_LoadTemplate_AssetUrls_RewriteSourceAndChangeDigest(self):
+        path = join(self.dir, "template.html")
+        self._write(path, '<link href="/index.css">{{ Content }}')
+        digest = load_template(path).digest
+
+        template = load_template(path, {"/index.css": "/index.0123456789.css"})
+
+        self.assertEqual(
+            template.render({"Content": "c"}), '<link href="/index.0123456789.css">c'
+        )
+        self.assertNotEqual(template.digest, digest)
+        other_asset_urls = {
+            "/index.css": "/index.0123456789.css",
+            "/other.png": "/other.abcdef0123.png",
+        }
+        self.assertEqual(load_template(path, other_asset_urls).digest, template.digest)
+
+    def test_LoadTemplate_Minify_CollapseWhitespaceAndCountBytes(self):
+        path = join(self.dir, "template.html")
+        self._write(path, "<body>\n    <article>{{ Content }}</article>\n</body>\n")
+
+        template = load_template(path, minify=True)
+
+        self.assertEqual(
+            template.render({"Content": "c"}), "<body><article>c</article></body>"
+        )
+        self.assertEqual((template.minified, template.bytes_saved), (True, 7))
@@ -25,6 +25,10 @@ class TextNodeTests(unittest.TestCase):
         node = TextNode(text="A", text_type=TextTypes.bold, url="haha")
         self.assertEqual(node.url, "haha")
 
+    def test_Slots_NoInstanceDict(self):
+        node = TextNode(text="A", text_type=TextTypes.bold)
+        self.assertFalse(hasattr(node, "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
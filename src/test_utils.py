@@ -1,3 +1,4 @@
+import io
 from unittest import TestCase
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -7,6 +8,7 @@ from utils import (
     block_to_block_type,
     extract_markdown_images,
     extract_markdown_links,
+    iter_markdown_blocks,
     markdown_block_to_html_node,
     markdown_to_blocks,
     markdown_to_html_node,
@@ -15,6 +17,7 @@ from utils import (
     split_nodes_link,
     text_node_to_html_node,
     text_to_text_nodes,
+    write_markdown_html,
 )
 
 
@@ -71,6 +74,26 @@ class MarkdownToBlocksTests(TestCase):
         ]
         self.assertEqual(string_blocks, expected_blocks)
 
+    def test_MarkDownToBlocks_BlankLinesInCodeFence_KeepCodeBlock(self):
+        text = "# Title\n\n```\na = 1\n\n\nb = 2\n```\n\n\n\nafter"
+        string_blocks = markdown_to_blocks(text)
+        self.assertEqual(
+            string_blocks, ["# Title", "```\na = 1\n\n\nb = 2\n```", "after"]
+        )
+
+
+class IterMarkdownBlocksTests(TestCase):
+    def test_IterMarkdownBlocks_FileLines_YieldBlocks(self):
+        file = io.StringIO("  first\nblock  \n\n\n\n* a\n* b\n\n   \n")
+        self.assertEqual(list(iter_markdown_blocks(file)), ["first\nblock", "* a\n* b"])
+
+
+class WriteMarkdownHtmlTests(TestCase):
+    def test_WriteMarkdownHtml_BigMarkdown_WriteSameAsTree(self):
+        file = io.StringIO()
+        write_markdown_html(io.StringIO(markdown), file)
+        self.assertEqual(file.getvalue(), markdown_to_html_node(markdown).to_html())
+
 
 class TextNodeToHTMLNodeTests(TestCase):
     def test_TextNodeToHTMLNode_TextNode_ReturnHTMLNode(self):
@@ -262,6 +285,29 @@ class TextToTextNodes(TestCase):
         ]
         self.assertEqual(nodes, expected_nodes)
 
+    def test_TextToTextNodes_MatchesSplitPipeline(self):
+        texts = [
+            "",
+            "plain",
+            "**bold** then *italic*\non a new line `code` end",
+            "*it* **bo**`co`![a](b)[c](d)",
+            "`**not bold**` and **bold**",
+            "![image](www.a.c) and [link](www.b.c) and ![](empty.png)",
+            "empty ** ** markers and ``",
+        ]
+        for text in texts:
+            node = TextNode(text=text, text_type=TextTypes.text)
+            nodes = split_nodes_delimiter([node], "`", TextTypes.code)
+            nodes = split_nodes_delimiter(nodes, "**", TextTypes.bold)
+            nodes = split_nodes_delimiter(nodes, "*", TextTypes.italic)
+            nodes = split_nodes_link(split_nodes_image(nodes))
+            self.assertEqual(text_to_text_nodes(text), nodes, text)
+
+    def test_TextToTextNodes_UnmatchedDelimiter_RaiseException(self):
+        for text in ("a *b", "a `b", "**a*", "a ** b"):
+            with self.assertRaises(Exception):
+                text_to_text_nodes(text)
+
 
 class BlockToBlockTypeTests(TestCase):
     def test_BlockToBlockType_Headings_ParseItCorrectly(self):
@@ -317,6 +363,31 @@ class BlockToBlockTypeTests(TestCase):
         block_type = block_to_block_type("ANYTHING\n\n\nABC")
         self.assertEqual(block_type, BlockTypes.paragraph)
 
+    def test_BlockToBlockType_CodeEdgeCases_ParseItCorrectly(self):
+        self.assertEqual(block_to_block_type("``````"), BlockTypes.code)
+        self.assertEqual(block_to_block_type("```a\n\nb```\n"), BlockTypes.code)
+        self.assertEqual(block_to_block_type("`````"), BlockTypes.paragraph)
+        self.assertEqual(block_to_block_type("```a```\n\n"), BlockTypes.paragraph)
+        self.assertEqual(
+            block_to_block_type("```\n" + "x = 1\n" * 10_000 + "```"),
+            BlockTypes.code,
+        )
+
+    def test_BlockToBlockType_MixedListMarkers_ReturnParagraph(self):
+        block_type = block_to_block_type("* a\n- b")
+        self.assertEqual(block_type, BlockTypes.paragraph)
+
+    def test_BlockToBlockType_LongOrderedList_ReturnOrderedList(self):
+        block = "\n".join(f"{index}. item" for index in range(1, 13))
+        self.assertEqual(block_to_block_type(block), BlockTypes.ordered_list)
+
+    def test_BlockToBlockType_QuoteOfListItems_ReturnQuote(self):
+        block_type = block_to_block_type(">* a\n>* b")
+        self.assertEqual(block_type, BlockTypes.quote)
+
+    def test_BlockToBlockType_EmptyBlock_ReturnParagraph(self):
+        self.assertEqual(block_to_block_type(""), BlockTypes.paragraph)
+
 
 class MarkdownBlockToHtmlNodeTests(TestCase):
     def test_MarkdownBlockToHtmlNode_Headings_ReturnHTMLNodes(self):
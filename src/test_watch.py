@@ -0,0 +1,93 @@
+import sys
+from os import makedirs, remove
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+from watch import InotifyWatcher, PollingWatcher, watch_changes
+
+
+class WatcherTests:
+    def create_watcher(self, paths: list[str]):
+        raise NotImplementedError()
+
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.content = join(tmp_dir.name, "content")
+        self.template = join(tmp_dir.name, "template.html")
+        self.other = join(tmp_dir.name, "other.txt")
+        makedirs(self.content)
+        self._write(join(self.content, "a.md"), "# A")
+        self._write(self.template, "{{ Content }}")
+        self.watcher = self.create_watcher([self.content, self.template])
+        self.addCleanup(self.watcher.close)
+
+    def _write(self, path: str, text: str):
+        with open(path, mode="w") as file:
+            file.write(text)
+
+    def test_ReadChanges_NothingChanged_ReturnEmptySet(self):
+        self.assertEqual(self.watcher.read_changes(timeout=0.05), set())
+
+    def test_ReadChanges_FilesCreatedModifiedAndDeleted_ReturnPaths(self):
+        self._write(join(self.content, "b.md"), "# B")
+        self._write(self.template, "<p>{{ Content }}</p>")
+        remove(join(self.content, "a.md"))
+        self._write(self.other, "not watched")
+
+        changes = self._collect_changes()
+
+        self.assertEqual(
+            changes,
+            {join(self.content, "b.md"), join(self.content, "a.md"), self.template},
+        )
+
+    def test_ReadChanges_NewDirectory_ReturnFilesInside(self):
+        makedirs(join(self.content, "new"))
+        self._write(join(self.content, "new", "c.md"), "# C")
+
+        changes = self._collect_changes()
+
+        self.assertIn(join(self.content, "new", "c.md"), changes)
+
+    def test_WatchChanges_Burst_YieldOnce(self):
+        for index in range(5):
+            self._write(join(self.content, f"{index}.md"), "# X")
+
+        changes = next(watch_changes(self.watcher, debounce=0.3))
+
+        self.assertEqual(
+            {join(self.content, f"{index}.md") for index in range(5)}, changes
+        )
+
+    def _collect_changes(self) -> set[str]:
+        changes = self.watcher.read_changes(timeout=1)
+        while more_changes := self.watcher.read_changes(timeout=0.3):
+            changes |= more_changes
+        return changes
+
+
+class WatchChangesTests(TestCase):
+    def test_WatchChanges_OnlyFilteredEvents_KeepWaiting(self):
+        class FakeWatcher:
+            def __init__(self):
+                self.reads = [set(), set(), {"content/a.md"}, set()]
+
+            def read_changes(self, timeout: float | None) -> set[str]:
+                return self.reads.pop(0)
+
+        changes = next(watch_changes(FakeWatcher(), debounce=0))
+
+        self.assertEqual(changes, {"content/a.md"})
+
+
+class PollingWatcherTests(WatcherTests, TestCase):
+    def create_watcher(self, paths: list[str]):
+        return PollingWatcher(paths, interval=0.01)
+
+
+@skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class InotifyWatcherTests(WatcherTests, TestCase):
+    def create_watcher(self, paths: list[str]):
+        return InotifyWatcher(paths)
@@ -11,6 +11,9 @@ class TextTypes(StrEnum):
 
 
 class TextNode:
+    # Pages allocate one node per inline span; slots drop the per-instance dict.
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, *, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
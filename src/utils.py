@@ -1,11 +1,21 @@
 import re
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from enum import StrEnum
-from os import makedirs
+from functools import partial
+from os import makedirs, remove, replace
 from os.path import dirname
-from typing import cast
-
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from typing import TextIO, cast
+
+from assets import asset_url
+from compress import remove_compressed
+from frontmatter import FrontMatterValue, read_front_matter
+from htmlnode import HTMLNode, LeafNode, ParentNode, Props
+from images import image_attributes, image_render_context, skip_images
+from links import Link, collecting_links, record_link, record_links
+from minify import minify_output
+from profiler import phase
+from render_cache import RenderCache
+from template import Template
 from textnode import TextNode, TextTypes
 
 
@@ -21,11 +31,35 @@ def extract_markdown_links(text: str) -> tuple[str, str]:
     return matches
 
 
+_CODE_FENCE = "```"
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
-    split_markdown = markdown.split("\n\n")
-    stripped_markdown = [string.strip() for string in split_markdown]
-    output_string_blocks = [string for string in stripped_markdown if string != ""]
-    return output_string_blocks
+    return list(iter_markdown_blocks(markdown.split("\n")))
+
+
+def iter_markdown_blocks(lines: Iterable[str]) -> Iterator[str]:
+    # Consumes lines one at a time (a file object works) and yields each
+    # block as soon as the blank line ending it is seen. Blank lines inside
+    # a fenced code block do not end the block.
+    block_lines = []
+    in_code_fence = False
+    for line in lines:
+        line = line.removesuffix("\n")
+        if line == "" and not in_code_fence:
+            yield from _join_block(block_lines)
+            block_lines = []
+            continue
+        if line.count(_CODE_FENCE) % 2 == 1:
+            in_code_fence = not in_code_fence
+        block_lines.append(line)
+    yield from _join_block(block_lines)
+
+
+def _join_block(block_lines: list[str]) -> Iterator[str]:
+    block = "\n".join(block_lines).strip()
+    if block != "":
+        yield block
 
 
 def text_node_to_html_node(node: TextNode) -> LeafNode:
@@ -39,11 +73,14 @@ def text_node_to_html_node(node: TextNode) -> LeafNode:
         case TextTypes.code:
             return LeafNode(tag="code", value=node.text)
         case TextTypes.link:
-            return LeafNode(tag="a", value=node.text, props={"href": node.url})
+            url = asset_url(node.url)
+            record_link("link", url)
+            return LeafNode(tag="a", value=node.text, props=Props(href=url))
         case TextTypes.image:
-            return LeafNode(
-                tag="img", value="", props={"src": node.url, "alt": node.text}
-            )
+            url = asset_url(node.url)
+            record_link("image", url)
+            props = Props(src=url, alt=node.text, **image_attributes(url))
+            return LeafNode(tag="img", value="", props=props)
         case _:
             raise Exception("TextNode text_type is invalid")
 
@@ -57,51 +94,44 @@ class BlockTypes(StrEnum):
     ordered_list = "ordered_list"
 
 
+_HEADING_PATTERN = re.compile(r"#{1,6} ")
+
+
 def block_to_block_type(markdown_text: str) -> BlockTypes:
-    is_heading = re.match(r"^(\#{1,6} )", markdown_text)
-    if is_heading:
+    if _HEADING_PATTERN.match(markdown_text):
         return BlockTypes.heading
 
-    is_code_block = re.match(r"(^```(.|\n)*```$)", markdown_text)
-    if is_code_block:
+    if _is_code(markdown_text):
         return BlockTypes.code
 
-    if _is_quote(markdown_text):
+    # Checks every line-based block type in one pass over the lines and stops
+    # as soon as no candidate is left.
+    is_quote = is_star_list = is_dash_list = is_ordered_list = True
+    for index, line in enumerate(markdown_text.split("\n")):
+        is_quote = is_quote and line.startswith(">")
+        is_star_list = is_star_list and line.startswith("* ")
+        is_dash_list = is_dash_list and line.startswith("- ")
+        is_ordered_list = is_ordered_list and line.startswith(f"{index + 1}. ")
+        if not (is_quote or is_star_list or is_dash_list or is_ordered_list):
+            return BlockTypes.paragraph
+
+    if is_quote:
         return BlockTypes.quote
-
-    if _is_unordered_list(markdown_text):
+    if is_star_list or is_dash_list:
         return BlockTypes.unordered_list
-
-    if _is_ordered_list(markdown_text):
-        return BlockTypes.ordered_list
-
-    return BlockTypes.paragraph
-
-
-def _is_quote(markdown: str) -> bool:
-    return _starts_with_str_on_every_line(markdown, ">")
-
-
-def _is_unordered_list(markdown: str) -> bool:
-    return _starts_with_str_on_every_line(
-        markdown, "* "
-    ) or _starts_with_str_on_every_line(markdown, "- ")
-
-
-def _starts_with_str_on_every_line(markdown: str, starting_str: str) -> bool:
-    lines = markdown.split("\n")
-    for line in lines:
-        if not line.startswith(starting_str):
-            return False
-    return True
-
-
-def _is_ordered_list(markdown) -> bool:
-    lines = markdown.split("\n")
-    for index, line in enumerate(lines):
-        if not line.startswith(f"{index + 1}. "):
-            return False
-    return True
+    return BlockTypes.ordered_list
+
+
+def _is_code(markdown: str) -> bool:
+    # Same as matching ^```(.|\n)*```$ but without the backtracking: "$" may
+    # also match right before a single trailing newline.
+    if markdown.endswith("\n"):
+        markdown = markdown[:-1]
+    return (
+        len(markdown) >= 2 * len(_CODE_FENCE)
+        and markdown.startswith(_CODE_FENCE)
+        and markdown.endswith(_CODE_FENCE)
+    )
 
 
 def markdown_block_to_html_node(
@@ -169,7 +199,8 @@ def _to_list(markdown_block: str, tag: str) -> HTMLNode:
 
 
 def get_children_from_text(text: str) -> list[HTMLNode]:
-    text_nodes = text_to_text_nodes(text)
+    with phase("inline_parsing"):
+        text_nodes = text_to_text_nodes(text)
     return [text_node_to_html_node(node) for node in text_nodes]
 
 
@@ -242,16 +273,62 @@ def _image_and_link_splitter(
     return nodes
 
 
+_INLINE_PATTERN = re.compile(
+    r"`(?P<code>[^`]*)`"
+    r"|\*\*(?P<bold>(?s:.*?))\*\*"
+    r"|\*(?P<italic>[^*]+)\*"
+    r"|!\[(?P<image_text>.*?)\]\((?P<image_url>.*?)\)"
+    r"|(?<![!])\[(?P<link_text>.*?)\]\((?P<link_url>.*?)\)"
+)
+
+
+# URLs of the links and images in a block, as matched by _INLINE_PATTERN; a
+# match inside a code span is a harmless extra.
+_BLOCK_URL_PATTERN = re.compile(r"\]\((.*?)\)")
+
+
 def text_to_text_nodes(text) -> list[TextNode]:
-    node = TextNode(text=text, text_type=TextTypes.text)
-    nodes = split_nodes_delimiter([node], "`", TextTypes.code)
-    nodes = split_nodes_delimiter(nodes, "**", TextTypes.bold)
-    nodes = split_nodes_delimiter(nodes, "*", TextTypes.italic)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    # Single pass over the text: every inline token is found by one master
+    # regex, leftmost first, instead of re-splitting once per delimiter.
+    nodes = []
+    position = 0
+    for token in _INLINE_PATTERN.finditer(text):
+        _append_plain_text(nodes, text[position : token.start()])
+        position = token.end()
+
+        match token.lastgroup:
+            case "image_url":
+                nodes.append(
+                    TextNode(
+                        text=token["image_text"],
+                        text_type=TextTypes.image,
+                        url=token["image_url"],
+                    )
+                )
+            case "link_url":
+                nodes.append(
+                    TextNode(
+                        text=token["link_text"],
+                        text_type=TextTypes.link,
+                        url=token["link_url"],
+                    )
+                )
+            case token_type:
+                if token[token_type] != "":
+                    text_type = TextTypes[token_type]
+                    nodes.append(TextNode(text=token[token_type], text_type=text_type))
+    _append_plain_text(nodes, text[position:])
     return nodes
 
 
+def _append_plain_text(nodes: list[TextNode], text: str):
+    if text == "":
+        return
+    if "`" in text or "*" in text:
+        raise Exception("Mismatching amount of delimiters")
+    nodes.append(TextNode(text=text, text_type=TextTypes.text))
+
+
 def markdown_to_html_node(markdown: str) -> ParentNode:
     text_blocks = markdown_to_blocks(markdown)
     blocks_and_types = []
@@ -265,33 +342,101 @@ def markdown_to_html_node(markdown: str) -> ParentNode:
     return ParentNode(tag="div", children=children)
 
 
-def extract_title(markdown: str) -> str:
-    lines = markdown.split("\n")
-    for line in lines:
-        if line.startswith("# "):
-            return line[2:]
-    raise Exception("No header found")
-
+def write_markdown_html(
+    lines: Iterable[str], file: TextIO, render_cache: RenderCache | None = None
+):
+    # Renders and writes one block at a time, so neither the whole document
+    # nor the whole node tree is held in memory.
+    file.write("<div>")
+    blocks = iter_markdown_blocks(lines)
+    while True:
+        with phase("block_split"):
+            block = next(blocks, None)
+        if block is None:
+            break
+        with phase("classification"):
+            block_type = block_to_block_type(block)
+
+        cached = None
+        if render_cache is not None:
+            # The URLs the block's links and images are served at: a new
+            # fingerprint of a file the block refers to is a different key,
+            # one of any other file is not.
+            urls = _BLOCK_URL_PATTERN.findall(block) if "](" in block else []
+            served_urls = [asset_url(url) for url in urls]
+            context = "\0".join(served_urls)
+            if "![" in block:
+                # Only blocks with images depend on which image comes first
+                # and on the dimensions of the images they show.
+                context += image_render_context(served_urls)
+            key = RenderCache.key(block, block_type, context)
+            cached = render_cache.get(key)
+        if cached is None:
+            # Links are cached with the HTML so a hit still reports them.
+            links: list[Link] = []
+            with phase("tree_build"), collecting_links(links):
+                node = markdown_block_to_html_node(block, block_type)
+            with phase("to_html"):
+                html = node.to_html()
+            if render_cache is not None:
+                render_cache.put(key, (html, links))
+        else:
+            html, links = cached
+            skip_images(sum(kind == "image" for kind, _ in links))
+        record_links(links)
+        with phase("write"):
+            file.write(minify_output(html))
+    file.write("</div>")
 
-def generate_page(from_path: str, template_path: str, dest_path: str):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    markdown_content = ""
-    with open(from_path) as file:
-        markdown_content = file.read()
 
-    template_content = ""
-    with open(template_path) as file:
-        template_content = file.read()
+def extract_title(markdown: str) -> str:
+    return extract_title_from_lines(markdown.split("\n"))
 
-    node = markdown_to_html_node(markdown_content)
-    html = node.to_html()
 
-    title = extract_title(markdown_content)
+def extract_title_from_lines(lines: Iterable[str]) -> str:
+    for line in lines:
+        if line.startswith("# "):
+            return line[2:].removesuffix("\n")
+    raise Exception("No header found")
 
-    template_content = template_content.replace("{{ Title }}", title)
-    template_content = template_content.replace("{{ Content }}", html)
 
+def generate_page(
+    from_path: str,
+    template: Template,
+    dest_path: str,
+    render_cache: RenderCache | None = None,
+) -> dict[str, FrontMatterValue]:
     dir_path = dirname(dest_path)
     makedirs(dir_path, exist_ok=True)
-    with open(dest_path, mode="w") as file:
-        file.write(template_content)
+    tmp_path = f"{dest_path}.tmp"
+
+    with open(from_path) as file:
+        with phase("read"):
+            metadata = read_front_matter(file)
+            if "title" in metadata:
+                metadata["title"] = str(metadata["title"])
+            else:
+                # Without a front matter title, the first heading is used.
+                body_start = file.tell()
+                metadata["title"] = extract_title_from_lines(file)
+                file.seek(body_start)
+        # Front matter values are available to the template by key.
+        variables: dict[str, str | Callable[[TextIO], None]] = {
+            key: ", ".join(value) if isinstance(value, list) else str(value)
+            for key, value in metadata.items()
+        }
+        variables["Title"] = metadata["title"]
+        variables["Content"] = partial(
+            write_markdown_html, file, render_cache=render_cache
+        )
+        try:
+            with open(tmp_path, mode="w") as output:
+                with phase("template_fill"):
+                    template.write(output, variables)
+        except BaseException:
+            remove(tmp_path)
+            raise
+    with phase("write"):
+        replace(tmp_path, dest_path)
+        remove_compressed(dest_path)
+    return metadata
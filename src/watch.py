@@ -0,0 +1,186 @@
+import ctypes
+import ctypes.util
+import select
+import struct
+import sys
+import time
+from collections.abc import Iterator
+from os import close, read, scandir, stat, walk
+from os.path import basename, dirname, isdir, join
+
+# inotify(7) constants from <sys/inotify.h>.
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    def __init__(self, paths: list[str], interval: float = 0.2):
+        self.paths = paths
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def read_changes(self, timeout: float | None) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changes = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changes:
+                return changes
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for path in self.paths:
+            if isdir(path):
+                self._scan_dir(path, snapshot)
+                continue
+            try:
+                stat_result = stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat_result.st_mtime_ns, stat_result.st_size)
+        return snapshot
+
+    def _scan_dir(self, dir_path: str, snapshot: dict[str, tuple[int, int]]):
+        try:
+            entries = list(scandir(dir_path))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            path = join(dir_path, entry.name)
+            if entry.is_dir():
+                self._scan_dir(path, snapshot)
+            else:
+                stat_result = entry.stat()
+                snapshot[path] = (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+class InotifyWatcher:
+    def __init__(self, paths: list[str]):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, str] = {}
+        # Single files are watched through their directory and filtered by name.
+        self._files: dict[str, set[str]] = {}
+
+        for path in paths:
+            if isdir(path):
+                self._watch_tree(path)
+            else:
+                dir_path = dirname(path)
+                self._files.setdefault(dir_path, set()).add(basename(path))
+                self._watch_dir(dir_path)
+
+    def read_changes(self, timeout: float | None) -> set[str]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changes = set()
+        while True:
+            try:
+                data = read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changes
+            changes |= self._parse_events(data)
+
+    def close(self):
+        close(self._fd)
+
+    def _parse_events(self, data: bytes) -> set[str]:
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0").decode()
+            offset += length
+
+            dir_path = self._dirs.get(wd)
+            if dir_path is None:
+                continue
+            if mask & _IN_IGNORED:
+                del self._dirs[wd]
+                continue
+            if not name:
+                continue
+            if dir_path in self._files and name not in self._files[dir_path]:
+                continue
+
+            path = join(dir_path, name)
+            changes.add(path)
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                # Files created before the new watch was added produce no
+                # events of their own, so report everything already there.
+                self._watch_tree(path)
+                for new_dir, _, file_names in walk(path):
+                    changes.update(join(new_dir, file_name) for file_name in file_names)
+        return changes
+
+    def _watch_tree(self, root: str):
+        for dir_path, _, _ in walk(root):
+            self._watch_dir(dir_path)
+
+    def _watch_dir(self, dir_path: str):
+        wd = self._libc.inotify_add_watch(
+            self._fd, (dir_path or ".").encode(), _WATCH_MASK
+        )
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {dir_path}")
+        self._dirs[wd] = dir_path
+
+
+def create_watcher(paths: list[str]) -> InotifyWatcher | PollingWatcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths)
+
+
+def watch_changes(
+    watcher: InotifyWatcher | PollingWatcher, debounce: float = 0.05
+) -> Iterator[set[str]]:
+    # A burst of events (an editor saving, a git checkout) is collected until
+    # nothing has changed for the debounce interval, then reported at once.
+    # Events that were all filtered out (swap files next to template.html)
+    # leave nothing to rebuild and are not reported.
+    while True:
+        changes = watcher.read_changes(timeout=None)
+        while more_changes := watcher.read_changes(timeout=debounce):
+            changes |= more_changes
+        if changes:
+            yield changes
@@ -0,0 +1,187 @@
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+from os import makedirs, utime
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from server import CachingRequestHandler, FileCache
+
+
+class FileCacheTests(TestCase):
+    def test_Put_OverMaxBytes_EvictLeastRecentlyUsed(self):
+        cache = FileCache(max_bytes=10, max_file_size=5)
+        cache.put("a", "1", b"aaaa")
+        cache.put("b", "1", b"bbbb")
+        cache.get("a", "1")
+        cache.put("c", "1", b"cccc")
+
+        self.assertIsNone(cache.get("b", "1"))
+        self.assertEqual(cache.get("a", "1"), b"aaaa")
+        self.assertEqual(cache.get("c", "1"), b"cccc")
+
+    def test_Put_LargeFile_NotCached(self):
+        cache = FileCache(max_bytes=10, max_file_size=5)
+        cache.put("a", "1", b"aaaaaa")
+        self.assertIsNone(cache.get("a", "1"))
+
+    def test_Get_DifferentEtag_ReturnNone(self):
+        cache = FileCache()
+        cache.put("a", "1", b"a")
+        self.assertIsNone(cache.get("a", "2"))
+
+
+class CachingRequestHandlerTests(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+        makedirs(join(self.dir, "docs"))
+        self.body = b"0123456789" * 10
+        self._write("index.html", self.body)
+        self._write("docs/index.html", b"docs")
+
+        file_cache = FileCache(max_bytes=150, max_file_size=100)
+        self.file_cache = file_cache
+        directory = self.dir
+
+        class Handler(CachingRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+            def log_message(self, format, *args):
+                pass
+
+        Handler.file_cache = file_cache
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(
+            target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.port = server.server_address[1]
+
+    def _write(self, name: str, data: bytes, mtime: int | None = None):
+        path = join(self.dir, name)
+        with open(path, mode="wb") as file:
+            file.write(data)
+        if mtime is not None:
+            utime(path, (mtime, mtime))
+
+    def _get(self, path: str, headers: dict[str, str] | None = None):
+        connection = HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+
+    def test_Get_File_ReturnBodyWithValidators(self):
+        response, body = self._get("/index.html")
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.body)
+        self.assertEqual(response.getheader("Content-Length"), "100")
+        self.assertIsNotNone(response.getheader("ETag"))
+        self.assertIsNotNone(response.getheader("Last-Modified"))
+        self.assertIsNone(response.getheader("Cache-Control"))
+
+    def test_Get_Directory_ServeIndex(self):
+        response, body = self._get("/docs/")
+        self.assertEqual((response.status, body), (200, b"docs"))
+
+    def test_Get_MatchingEtagOrUnmodified_ReturnNotModified(self):
+        response, _ = self._get("/index.html")
+        etag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+
+        response, body = self._get("/index.html", {"If-None-Match": f"W/{etag}"})
+        self.assertEqual((response.status, body), (304, b""))
+        self.assertEqual(response.getheader("ETag"), etag)
+
+        response, _ = self._get("/index.html", {"If-Modified-Since": last_modified})
+        self.assertEqual(response.status, 304)
+
+        response, _ = self._get("/index.html", {"If-None-Match": '"other"'})
+        self.assertEqual(response.status, 200)
+
+    def test_Get_Range_ReturnPartialContent(self):
+        response, body = self._get("/index.html", {"Range": "bytes=2-5"})
+        self.assertEqual((response.status, body), (206, b"2345"))
+        self.assertEqual(response.getheader("Content-Range"), "bytes 2-5/100")
+
+        response, body = self._get("/index.html", {"Range": "bytes=-3"})
+        self.assertEqual((response.status, body), (206, b"789"))
+
+    def test_Get_IfRangeOutdated_ReturnWholeFile(self):
+        headers = {"Range": "bytes=2-5", "If-Range": '"other"'}
+        response, body = self._get("/index.html", headers)
+        self.assertEqual((response.status, body), (200, self.body))
+
+    def test_Get_RangeOutsideFile_ReturnNotSatisfiable(self):
+        response, body = self._get("/index.html", {"Range": "bytes=100-"})
+        self.assertEqual((response.status, body), (416, b""))
+        self.assertEqual(response.getheader("Content-Range"), "bytes */100")
+
+    def test_Get_LargerThanCacheableFile_SendFromDisk(self):
+        large_body = bytes(range(256)) * 4
+        self._write("large.bin", large_body)
+
+        response, body = self._get("/large.bin")
+        self.assertEqual(body, large_body)
+        response, body = self._get("/large.bin", {"Range": "bytes=1000-"})
+        self.assertEqual(body, large_body[1000:])
+        self.assertNotIn(join(self.dir, "large.bin"), self.file_cache._entries)
+
+    def test_Get_ManyFiles_KeepCacheWithinMaxBytes(self):
+        for index in range(5):
+            self._write(f"{index}.txt", b"x" * 60)
+            self._get(f"/{index}.txt")
+        self.assertLessEqual(self.file_cache._size, self.file_cache.max_bytes)
+        self.assertEqual(len(self.file_cache._entries), 2)
+
+    def test_Get_Fingerprinted_ReturnImmutableCacheControl(self):
+        self._write("style.0123456789.css", b"p{}")
+        response, _ = self._get("/style.0123456789.css")
+        self.assertEqual(
+            response.getheader("Cache-Control"), "public, max-age=31536000, immutable"
+        )
+
+    def test_Get_PageNamedLikeFingerprint_NoCacheControl(self):
+        self._write("release.2024010112.html", b"release")
+        response, _ = self._get("/release.2024010112.html")
+        self.assertIsNone(response.getheader("Cache-Control"))
+
+    def test_Get_AcceptEncoding_ServePreferredAcceptedEncoding(self):
+        self._write("index.html.gz", b"gzip body")
+        self._write("index.html.zst", b"zstd body")
+
+        cases = [
+            ("gzip, zstd", "zstd", b"zstd body"),
+            ("gzip, zstd;q=0", "gzip", b"gzip body"),
+            ("zstd;q=0, *", "gzip", b"gzip body"),
+            ("gzip;q=1, zstd;q=0.5", "gzip", b"gzip body"),
+            ("gzip;q=0.5, zstd;q=0.5", "zstd", b"zstd body"),
+            ("gzip;q=0.5, identity", None, self.body),
+            ("gzip;q=0", None, self.body),
+            ("", None, self.body),
+        ]
+        for accept_encoding, encoding, expected_body in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                headers = {"Accept-Encoding": accept_encoding}
+                response, body = self._get("/index.html", headers)
+                self.assertEqual(response.getheader("Content-Encoding"), encoding)
+                self.assertEqual(body, expected_body)
+                self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+
+    def test_Get_CompressedWithoutPlainFile_ReturnNotFound(self):
+        self._write("gone.html.gz", b"gzip body")
+        response, _ = self._get("/gone.html", {"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status, 404)
+
+    def test_Get_CompressedOlderThanPlainFile_ServePlainFile(self):
+        self._write("index.html.gz", b"gzip body", mtime=1)
+        response, body = self._get("/index.html", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, self.body)
@@ -0,0 +1,4 @@
+python src/main.py --incremental
+python server.py --dir public &
+trap 'kill $!' EXIT
+python src/main.py --watch